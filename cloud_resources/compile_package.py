@@ -0,0 +1,137 @@
+import argparse
+import compileall
+import json
+import os
+import py_compile
+import subprocess
+import sys
+
+DEFAULT_RUNTIME = "python3.11"
+PACKAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lambda_package")
+
+# Imported in a fresh interpreter after compilation. Every source file the
+# import system has to compile is recorded; on a read-only /var/task each of
+# those would be recompiled (and thrown away) on every cold start.
+COLD_START_PROBE = """
+import importlib._bootstrap_external as bootstrap
+import json
+import sys
+
+compiled = []
+_source_to_code = bootstrap.SourceLoader.source_to_code
+
+def source_to_code(self, data, path, *args, **kwargs):
+    compiled.append(path)
+    return _source_to_code(self, data, path, *args, **kwargs)
+
+bootstrap.SourceLoader.source_to_code = source_to_code
+
+import boto3
+import lambda_function
+import slack_actions
+
+boto3.client('ec2', region_name='us-east-1')
+boto3.client('cloudwatch', region_name='us-east-1')
+
+print(json.dumps([path for path in compiled if path.startswith(sys.argv[1])]))
+"""
+
+
+def runtime_cache_tag(runtime):
+    """Translate a Lambda runtime name (python3.11) into a bytecode cache tag (cpython-311)."""
+    version = runtime.replace("python", "").replace(".", "")
+    return f"cpython-{version}"
+
+
+def check_interpreter(runtime):
+    """Bytecode is interpreter specific, so the tree must be compiled by the runtime's own version."""
+    expected = runtime_cache_tag(runtime)
+    actual = sys.implementation.cache_tag
+    if actual != expected:
+        raise SystemExit(
+            f"Lambda runtime is {runtime} ({expected}) but this interpreter is {actual}. "
+            f"Run this script with {runtime}."
+        )
+    return expected
+
+
+def remove_mismatched_caches(package_dir, cache_tag):
+    """Delete bytecode built for a different interpreter and reject foreign extension modules."""
+    removed = []
+    mismatched = []
+    for root, dirs, files in os.walk(package_dir):
+        for filename in files:
+            path = os.path.join(root, filename)
+            if filename.endswith(".pyc") and os.path.basename(root) == "__pycache__":
+                if f".{cache_tag}." not in filename:
+                    os.remove(path)
+                    removed.append(path)
+            elif filename.endswith(".so") and ".cpython-" in filename:
+                if f".{cache_tag}-" not in filename or "-linux-" not in filename:
+                    mismatched.append(path)
+        if os.path.basename(root) == "__pycache__" and not os.listdir(root):
+            os.rmdir(root)
+    if mismatched:
+        # Native modules cannot be rebuilt here; pip must install the Linux wheels.
+        listing = "\n".join(f"  {path}" for path in mismatched)
+        raise SystemExit(f"Extension modules built for another interpreter or platform:\n{listing}")
+    return removed
+
+
+def compile_tree(package_dir):
+    """Byte-compile every module in the package for the running interpreter."""
+    # Zip archives store mtimes at two-second, local-time resolution, so
+    # timestamp-validated .pyc files are treated as stale once deployed.
+    # Unchecked-hash .pyc files are loaded without looking at the source.
+    success = compileall.compile_dir(
+        package_dir,
+        quiet=1,
+        workers=0,
+        invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH,
+    )
+    if not success:
+        raise SystemExit("Byte-compilation failed.")
+
+
+def verify_cold_start(package_dir):
+    """Import the handler in a fresh interpreter and fail if anything under the package was compiled."""
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": package_dir,
+        "PYTHONDONTWRITEBYTECODE": "1",
+        "SLACK_WEBHOOK_URL": env.get("SLACK_WEBHOOK_URL", "https://hooks.slack.com/services/cold-start-check"),
+    })
+    result = subprocess.run(
+        [sys.executable, "-c", COLD_START_PROBE, package_dir],
+        cwd=package_dir,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"Cold-start import check failed:\n{result.stderr}")
+
+    compiled = json.loads(result.stdout.strip().splitlines()[-1])
+    if compiled:
+        listing = "\n".join(f"  {path}" for path in compiled)
+        raise SystemExit(f"{len(compiled)} modules were compiled at import:\n{listing}")
+    print("Cold-start check passed: no modules compiled at import.")
+
+
+def main():
+    """Prepare lambda_package bytecode for the Lambda runtime."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("package_dir", nargs="?", default=PACKAGE_DIR)
+    parser.add_argument("--runtime", default=DEFAULT_RUNTIME)
+    args = parser.parse_args()
+
+    package_dir = os.path.abspath(args.package_dir)
+    cache_tag = check_interpreter(args.runtime)
+    removed = remove_mismatched_caches(package_dir, cache_tag)
+    print(f"Removed {len(removed)} files built for another interpreter.")
+    compile_tree(package_dir)
+    verify_cold_start(package_dir)
+
+
+if __name__ == "__main__":
+    main()
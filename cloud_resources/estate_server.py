@@ -0,0 +1,455 @@
+import argparse
+import base64
+import fnmatch
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+from xml.sax.saxutils import escape
+from synthetic_estate import cpu_utilization, generate_estate
+
+EC2_NAMESPACE = "http://ec2.amazonaws.com/doc/2016-11-15/"
+CLOUDWATCH_NAMESPACE = "http://monitoring.amazonaws.com/doc/2010-08-01/"
+# CloudWatch returns at most this many datapoints per GetMetricStatistics call
+MAX_DATAPOINTS = 1440
+
+
+def _xml(tag, value):
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        value = str(value).lower()
+    return f"<{tag}>{escape(str(value))}</{tag}>"
+
+
+def _tag_set(tags):
+    items = "".join(f"<item>{_xml('key', key)}{_xml('value', value)}</item>" for key, value in tags.items())
+    return f"<tagSet>{items}</tagSet>"
+
+
+def _parse_time(value):
+    if value.replace('.', '', 1).isdigit():
+        return datetime.fromtimestamp(float(value), timezone.utc)
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def _indexed(params, prefix):
+    """Values of Prefix.1, Prefix.2, ... in index order."""
+    values = {}
+    for key, value in params.items():
+        if key.startswith(prefix + '.') and key[len(prefix) + 1:].isdigit():
+            values[int(key[len(prefix) + 1:])] = value
+    return [values[index] for index in sorted(values)]
+
+
+def _filters(params):
+    """EC2 Filter.N.Name / Filter.N.Value.M parameters as {name: [patterns]}."""
+    filters = {}
+    for key, name in params.items():
+        if key.startswith('Filter.') and key.endswith('.Name'):
+            filters[name] = _indexed(params, key[:-len('.Name')] + '.Value')
+    return filters
+
+
+INSTANCE_FIELDS = {
+    'instance-id': lambda instance: instance['InstanceId'],
+    'instance-state-name': lambda instance: instance['State'],
+    'instance-type': lambda instance: instance['InstanceType'],
+    'availability-zone': lambda instance: instance['AvailabilityZone'],
+    'monitoring-state': lambda instance: instance['Monitoring'],
+}
+VOLUME_FIELDS = {
+    'volume-id': lambda volume: volume['VolumeId'],
+    'status': lambda volume: volume['State'],
+    'volume-type': lambda volume: volume['VolumeType'],
+    'availability-zone': lambda volume: volume['AvailabilityZone'],
+    'attachment.instance-id': lambda volume: volume['InstanceId'],
+}
+SNAPSHOT_FIELDS = {
+    'snapshot-id': lambda snapshot: snapshot['SnapshotId'],
+    'volume-id': lambda snapshot: snapshot['VolumeId'],
+    'storage-tier': lambda snapshot: snapshot['StorageTier'],
+}
+
+
+def _matches(resource, filters, fields):
+    for name, patterns in filters.items():
+        if name.startswith('tag:'):
+            value = resource.get('Tags', {}).get(name[4:])
+        elif name in fields:
+            value = fields[name](resource)
+        else:
+            raise ApiError(400, 'InvalidParameterValue', f"The filter '{name}' is invalid")
+        if value is None or not any(fnmatch.fnmatchcase(value, pattern) for pattern in patterns):
+            return False
+    return True
+
+
+class ApiError(Exception):
+    def __init__(self, status, code, message):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.message = message
+
+
+class TokenBucket:
+    """Request-rate limit per API: rate tokens per second, up to burst."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class LatencyModel:
+    """Per-call delay: a base, a cost per returned item, and log-normal jitter."""
+
+    def __init__(self, base_ms=0, per_item_ms=0, jitter=0, seed=0):
+        self.base_ms = base_ms
+        self.per_item_ms = per_item_ms
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self, items):
+        milliseconds = self.base_ms + self.per_item_ms * items
+        if self.jitter:
+            with self._lock:
+                milliseconds *= self._rng.lognormvariate(0, self.jitter)
+        return milliseconds / 1000
+
+
+class EstateBackend:
+    """The EC2 and CloudWatch operations the scanners use, served from a synthetic estate."""
+
+    def __init__(self, estate):
+        self.estate = estate
+        self.account_id = estate['account_id']
+        self._lock = threading.Lock()
+        self.instances = {}
+        self.reservation_of = {}
+        for reservation in estate['reservations']:
+            for instance in reservation['Instances']:
+                self.instances[instance['InstanceId']] = instance
+                self.reservation_of[instance['InstanceId']] = reservation
+        self.volumes = {volume['VolumeId']: volume for volume in estate['volumes']}
+        self.snapshots = {snapshot['SnapshotId']: snapshot for snapshot in estate['snapshots']}
+
+    @staticmethod
+    def _page(items, params):
+        """Slice of items for MaxResults/NextToken; without MaxResults everything is returned, as EC2 does."""
+        start = int(base64.b64decode(params['NextToken'])) if params.get('NextToken') else 0
+        if 'MaxResults' not in params:
+            return items[start:], None
+        end = start + max(5, min(1000, int(params['MaxResults'])))
+        next_token = base64.b64encode(str(end).encode()).decode() if end < len(items) else None
+        return items[start:end], next_token
+
+    def _select(self, table, id_param, params, fields):
+        ids = _indexed(params, id_param)
+        filters = _filters(params)
+        if ids:
+            missing = [resource_id for resource_id in ids if resource_id not in table]
+            if missing:
+                raise ApiError(400, 'InvalidID.NotFound', f"The ID '{missing[0]}' does not exist")
+            candidates = [table[resource_id] for resource_id in ids]
+        else:
+            exact_ids = [value for value in filters.get(id_param[:-2].lower() + '-id', []) if '*' not in value and '?' not in value]
+            if exact_ids and len(exact_ids) == len(filters.get(id_param[:-2].lower() + '-id', [])):
+                # Batched lookups by ID avoid scanning the whole estate
+                candidates = [table[resource_id] for resource_id in exact_ids if resource_id in table]
+            else:
+                candidates = table.values()
+        return [resource for resource in candidates if _matches(resource, filters, fields)]
+
+    def describe_instances(self, params):
+        with self._lock:
+            instances = self._select(self.instances, 'InstanceId', params, INSTANCE_FIELDS)
+        # EC2 groups the matching instances by reservation, in launch order
+        grouped = {}
+        for instance in instances:
+            reservation = self.reservation_of[instance['InstanceId']]
+            grouped.setdefault(reservation['ReservationId'], (reservation, []))[1].append(instance)
+        page, next_token = self._page(list(grouped.values()), params)
+        body = "".join(
+            f"<item>{_xml('reservationId', reservation['ReservationId'])}{_xml('ownerId', self.account_id)}"
+            f"<groupSet/><instancesSet>{''.join(self._instance_xml(instance) for instance in members)}</instancesSet></item>"
+            for reservation, members in page
+        )
+        return f"<reservationSet>{body}</reservationSet>{_xml('nextToken', next_token)}", sum(len(members) for _, members in page)
+
+    @staticmethod
+    def _instance_xml(instance):
+        state_codes = {'pending': 0, 'running': 16, 'stopping': 64, 'stopped': 80, 'terminated': 48}
+        return (
+            f"<item>{_xml('instanceId', instance['InstanceId'])}{_xml('imageId', 'ami-0123456789abcdef0')}"
+            f"<instanceState>{_xml('code', state_codes[instance['State']])}{_xml('name', instance['State'])}</instanceState>"
+            f"{_xml('instanceType', instance['InstanceType'])}{_xml('launchTime', instance['LaunchTime'])}"
+            f"<placement>{_xml('availabilityZone', instance['AvailabilityZone'])}{_xml('tenancy', 'default')}</placement>"
+            f"<monitoring>{_xml('state', instance['Monitoring'])}</monitoring>"
+            f"{_tag_set(instance['Tags'])}</item>"
+        )
+
+    def describe_volumes(self, params):
+        with self._lock:
+            volumes = self._select(self.volumes, 'VolumeId', params, VOLUME_FIELDS)
+        page, next_token = self._page(volumes, params)
+        body = "".join(self._volume_xml(volume) for volume in page)
+        return f"<volumeSet>{body}</volumeSet>{_xml('nextToken', next_token)}", len(page)
+
+    @staticmethod
+    def _volume_xml(volume):
+        attachment = ""
+        if volume['InstanceId']:
+            attachment = (
+                f"<item>{_xml('volumeId', volume['VolumeId'])}{_xml('instanceId', volume['InstanceId'])}"
+                f"{_xml('device', '/dev/xvdf')}{_xml('status', 'attached')}{_xml('attachTime', volume['CreateTime'])}"
+                f"{_xml('deleteOnTermination', False)}</item>"
+            )
+        return (
+            f"<item>{_xml('volumeId', volume['VolumeId'])}{_xml('size', volume['Size'])}<snapshotId/>"
+            f"{_xml('availabilityZone', volume['AvailabilityZone'])}{_xml('status', volume['State'])}"
+            f"{_xml('createTime', volume['CreateTime'])}<attachmentSet>{attachment}</attachmentSet>"
+            f"{_xml('volumeType', volume['VolumeType'])}{_xml('iops', volume['Iops'])}{_xml('encrypted', False)}"
+            f"{_tag_set(volume['Tags'])}</item>"
+        )
+
+    def describe_snapshots(self, params):
+        with self._lock:
+            snapshots = self._select(self.snapshots, 'SnapshotId', params, SNAPSHOT_FIELDS)
+        page, next_token = self._page(snapshots, params)
+        body = "".join(
+            f"<item>{_xml('snapshotId', snapshot['SnapshotId'])}{_xml('volumeId', snapshot['VolumeId'])}"
+            f"{_xml('status', 'completed')}{_xml('startTime', snapshot['StartTime'])}{_xml('progress', '100%')}"
+            f"{_xml('ownerId', self.account_id)}{_xml('volumeSize', snapshot['VolumeSize'])}"
+            f"{_xml('description', snapshot['Description'])}{_xml('encrypted', False)}"
+            f"{_xml('storageTier', snapshot['StorageTier'])}</item>"
+            for snapshot in page
+        )
+        return f"<snapshotSet>{body}</snapshotSet>{_xml('nextToken', next_token)}", len(page)
+
+    def _check_dry_run(self, params):
+        if params.get('DryRun') == 'true':
+            raise ApiError(412, 'DryRunOperation', "Request would have succeeded, but DryRun flag is set.")
+
+    def stop_instances(self, params):
+        self._check_dry_run(params)
+        items = []
+        with self._lock:
+            for instance_id in _indexed(params, 'InstanceId'):
+                if instance_id not in self.instances:
+                    raise ApiError(400, 'InvalidInstanceID.NotFound', f"The instance ID '{instance_id}' does not exist")
+                instance = self.instances[instance_id]
+                previous, instance['State'] = instance['State'], 'stopped'
+                items.append(
+                    f"<item>{_xml('instanceId', instance_id)}<currentState>{_xml('code', 80)}{_xml('name', 'stopped')}</currentState>"
+                    f"<previousState>{_xml('name', previous)}</previousState></item>"
+                )
+        return f"<instancesSet>{''.join(items)}</instancesSet>", len(items)
+
+    def delete_volume(self, params):
+        self._check_dry_run(params)
+        with self._lock:
+            volume = self.volumes.get(params.get('VolumeId'))
+            if volume is None:
+                raise ApiError(400, 'InvalidVolume.NotFound', f"The volume '{params.get('VolumeId')}' does not exist.")
+            if volume['State'] != 'available':
+                raise ApiError(400, 'VolumeInUse', f"Volume {volume['VolumeId']} is currently attached")
+            del self.volumes[volume['VolumeId']]
+        return _xml('return', True), 1
+
+    def get_metric_statistics(self, params):
+        if params.get('Namespace') != 'AWS/EC2' or params.get('MetricName') != 'CPUUtilization':
+            return "<Datapoints/>", 0
+        dimensions = {
+            params.get(f"Dimensions.member.{index}.Name"): params.get(f"Dimensions.member.{index}.Value")
+            for index in range(1, 11)
+        }
+        instance = self.instances.get(dimensions.get('InstanceId'))
+        start, end = _parse_time(params['StartTime']), _parse_time(params['EndTime'])
+        period = int(params['Period'])
+        periods = int((end - start).total_seconds() // period)
+        if periods > MAX_DATAPOINTS:
+            raise ApiError(400, 'InvalidParameterCombination',
+                           f"You have requested up to {periods} datapoints, which exceeds the limit of {MAX_DATAPOINTS}.")
+        if instance is None or instance['State'] != 'running' or instance['Monitoring'] == 'disabled':
+            return "<Datapoints/>", 0
+
+        statistics = _indexed(params, 'Statistics.member')
+        samples = period // 60
+        points = []
+        for index in range(periods):
+            moment = start + timedelta(seconds=index * period)
+            value = cpu_utilization(instance['Cpu'], instance['InstanceId'], moment)
+            values = {
+                'Average': value, 'Maximum': min(100.0, value * 1.5), 'Minimum': value * 0.5,
+                'Sum': value * samples, 'SampleCount': samples,
+            }
+            fields = "".join(_xml(statistic, round(values[statistic], 4)) for statistic in statistics if statistic in values)
+            points.append(f"<member>{_xml('Timestamp', moment.strftime('%Y-%m-%dT%H:%M:%SZ'))}{fields}{_xml('Unit', 'Percent')}</member>")
+        return f"<Datapoints>{''.join(points)}</Datapoints>{_xml('Label', 'CPUUtilization')}", len(points)
+
+
+EC2_ACTIONS = {
+    'DescribeInstances': EstateBackend.describe_instances,
+    'DescribeVolumes': EstateBackend.describe_volumes,
+    'DescribeSnapshots': EstateBackend.describe_snapshots,
+    'StopInstances': EstateBackend.stop_instances,
+    'DeleteVolume': EstateBackend.delete_volume,
+}
+CLOUDWATCH_ACTIONS = {
+    'GetMetricStatistics': EstateBackend.get_metric_statistics,
+}
+
+
+class EstateRequestHandler(BaseHTTPRequestHandler):
+    """Speaks the EC2 and CloudWatch Query protocols; the API is picked from the Action parameter."""
+
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; with Nagle on, keep-alive calls stall on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length', 0))
+        params = dict(parse_qsl(self.rfile.read(length).decode('utf-8'), keep_blank_values=True))
+        action = params.get('Action', '')
+        request_id = str(uuid.uuid4())
+        api = 'ec2' if action in EC2_ACTIONS else 'cloudwatch' if action in CLOUDWATCH_ACTIONS else None
+        with server.stats_lock:
+            server.stats[action] = server.stats.get(action, 0) + 1
+
+        try:
+            if api is None:
+                raise ApiError(400, 'InvalidAction', f"The action {action} is not valid for this web service.")
+            bucket = server.throttles.get(api)
+            if bucket and not bucket.take():
+                with server.stats_lock:
+                    server.stats['Throttled'] = server.stats.get('Throttled', 0) + 1
+                if api == 'ec2':
+                    raise ApiError(503, 'RequestLimitExceeded', "Request limit exceeded.")
+                raise ApiError(400, 'Throttling', "Rate exceeded")
+            handler = EC2_ACTIONS.get(action) or CLOUDWATCH_ACTIONS[action]
+            result, items = handler(server.backend, params)
+        except ApiError as e:
+            self._send_error(api, e, request_id)
+            return
+
+        time.sleep(server.latency.delay(items))
+        if api == 'ec2':
+            body = f'<{action}Response xmlns="{EC2_NAMESPACE}">{_xml("requestId", request_id)}{result}</{action}Response>'
+        else:
+            body = (
+                f'<{action}Response xmlns="{CLOUDWATCH_NAMESPACE}"><{action}Result>{result}</{action}Result>'
+                f'<ResponseMetadata>{_xml("RequestId", request_id)}</ResponseMetadata></{action}Response>'
+            )
+        self._send(200, body)
+
+    def _send_error(self, api, error, request_id):
+        if api == 'ec2' or api is None:
+            body = (
+                f"<Response><Errors><Error>{_xml('Code', error.code)}{_xml('Message', error.message)}</Error></Errors>"
+                f"{_xml('RequestID', request_id)}</Response>"
+            )
+        else:
+            body = (
+                f'<ErrorResponse xmlns="{CLOUDWATCH_NAMESPACE}"><Error>{_xml("Type", "Sender")}{_xml("Code", error.code)}'
+                f'{_xml("Message", error.message)}</Error>{_xml("RequestId", request_id)}</ErrorResponse>'
+            )
+        self._send(error.status, body)
+
+    def _send(self, status, body):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/xml;charset=UTF-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def create_server(estate, host='127.0.0.1', port=0, latency=None, throttles=None, verbose=False):
+    """HTTP server for the estate; serve_forever() it and point clients at its endpoint_url."""
+    server = ThreadingHTTPServer((host, port), EstateRequestHandler)
+    server.daemon_threads = True
+    server.backend = EstateBackend(estate)
+    server.latency = latency or LatencyModel()
+    server.throttles = throttles or {}
+    server.verbose = verbose
+    server.stats = {}
+    server.stats_lock = threading.Lock()
+    server.endpoint_url = f"http://{server.server_address[0]}:{server.server_address[1]}"
+    return server
+
+
+def main():
+    """Serve a synthetic estate over the EC2 and CloudWatch Query protocols.
+
+    Point the scanners at it with AWS_ENDPOINT_URL, for example:
+      python estate_server.py --instances 100000 --port 4566 &
+      AWS_ENDPOINT_URL=http://127.0.0.1:4566 AWS_ACCESS_KEY_ID=x AWS_SECRET_ACCESS_KEY=x \\
+        python lambda_src/cassette.py record load.jsonl.gz
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--estate', help="JSON written by synthetic_estate.py; generated from the counts below if omitted")
+    parser.add_argument('--instances', type=int, default=1000)
+    parser.add_argument('--volumes', type=int)
+    parser.add_argument('--snapshots', type=int)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=4566)
+    parser.add_argument('--latency-ms', type=float, default=0, help="Base latency per call")
+    parser.add_argument('--per-item-ms', type=float, default=0, help="Extra latency per returned item")
+    parser.add_argument('--jitter', type=float, default=0, help="Log-normal sigma applied to the latency")
+    parser.add_argument('--ec2-rate', type=float, help="EC2 requests per second before RequestLimitExceeded")
+    parser.add_argument('--cloudwatch-rate', type=float, help="CloudWatch requests per second before Throttling")
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    if args.estate:
+        with open(args.estate) as estate_file:
+            estate = json.load(estate_file)
+    else:
+        estate = generate_estate(args.instances, args.volumes, args.snapshots, args.seed)
+    throttles = {}
+    if args.ec2_rate:
+        throttles['ec2'] = TokenBucket(args.ec2_rate, max(1, math.ceil(args.ec2_rate)))
+    if args.cloudwatch_rate:
+        throttles['cloudwatch'] = TokenBucket(args.cloudwatch_rate, max(1, math.ceil(args.cloudwatch_rate)))
+    server = create_server(
+        estate, args.host, args.port,
+        LatencyModel(args.latency_ms, args.per_item_ms, args.jitter, args.seed), throttles, args.verbose,
+    )
+    print(f"Serving {len(server.backend.instances)} instances, {len(server.backend.volumes)} volumes and "
+          f"{len(server.backend.snapshots)} snapshots at {server.endpoint_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Requests: {json.dumps(server.stats, sort_keys=True)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+# Content-addressed dry-run findings snapshots
+resource "aws_s3_bucket" "findings" {
+  bucket_prefix = "cloud-cleanup-findings-"
+}
+
+resource "aws_s3_bucket_public_access_block" "findings" {
+  bucket                  = aws_s3_bucket.findings.id
+  block_public_acls       = true
+  block_public_policy     = true
+  ignore_public_acls      = true
+  restrict_public_buckets = true
+}
+
+resource "aws_iam_role_policy" "lambda_findings_access" {
+  name = "lambda-findings-access"
+  role = aws_iam_role.lambda_execution_role.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect   = "Allow"
+        Action   = ["s3:GetObject", "s3:PutObject"]
+        Resource = "${aws_s3_bucket.findings.arn}/*"
+      },
+      {
+        Effect   = "Allow"
+        Action   = ["s3:ListBucket"]
+        Resource = aws_s3_bucket.findings.arn
+      }
+    ]
+  })
+}
@@ -43,9 +43,45 @@ resource "aws_iam_policy" "cloud_cleanup_policy" {
           "ec2:StopInstances",
           "ec2:DescribeVolumes",
           "ec2:DeleteVolume",
-          "cloudwatch:GetMetricStatistics"
+          "ec2:DescribeAddresses",
+          "ec2:DescribeNatGateways",
+          "ec2:DescribeNetworkInterfaces",
+          "ec2:DescribeSecurityGroups",
+          "ec2:DescribeImages",
+          "ec2:DescribeLaunchTemplates",
+          "ec2:DescribeLaunchTemplateVersions",
+          "autoscaling:DescribeLaunchConfigurations",
+          "elasticloadbalancing:DescribeLoadBalancers",
+          "elasticloadbalancing:DescribeTargetGroups",
+          "elasticloadbalancing:DescribeTargetHealth",
+          "rds:DescribeDBInstances",
+          "rds:DescribeDBClusters",
+          "s3:ListAllMyBuckets",
+          "s3:GetBucketLocation",
+          "s3:ListBucketMultipartUploads",
+          "s3:ListMultipartUploadParts",
+          "s3:GetLifecycleConfiguration",
+          "logs:DescribeLogGroups",
+          "lambda:ListFunctions",
+          "lambda:ListVersionsByFunction",
+          "lambda:ListAliases",
+          "dynamodb:ListTables",
+          "dynamodb:DescribeTable",
+          "cloudwatch:GetMetricStatistics",
+          "cloudwatch:GetMetricData",
+          "cloudwatch:PutMetricData"
         ],
         Resource = "*"
+      },
+      {
+        Effect   = "Allow",
+        Action   = ["s3:GetObject", "s3:PutObject"],
+        Resource = "${aws_s3_bucket.findings.arn}/*"
+      },
+      {
+        Effect   = "Allow",
+        Action   = ["s3:ListBucket"],
+        Resource = aws_s3_bucket.findings.arn
       }
     ]
   })
@@ -0,0 +1,32 @@
+# Leases that stop Slack retries and double-clicks from starting duplicate cleanups
+resource "aws_dynamodb_table" "cleanup_idempotency" {
+  name         = "cloud-cleanup-idempotency"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "idempotency_key"
+
+  attribute {
+    name = "idempotency_key"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+}
+
+resource "aws_iam_role_policy" "lambda_idempotency_access" {
+  name = "lambda-idempotency-access"
+  role = aws_iam_role.lambda_execution_role.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect   = "Allow"
+        Action   = ["dynamodb:PutItem", "dynamodb:GetItem", "dynamodb:UpdateItem", "dynamodb:DeleteItem"]
+        Resource = aws_dynamodb_table.cleanup_idempotency.arn
+      }
+    ]
+  })
+}
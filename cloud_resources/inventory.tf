@@ -0,0 +1,131 @@
+# Event-driven EC2 inventory: EventBridge -> SQS -> materialized DynamoDB table
+resource "aws_sqs_queue" "inventory_events" {
+  name                      = "cloud-cleanup-inventory-events"
+  message_retention_seconds = 1209600
+}
+
+resource "aws_cloudwatch_event_rule" "ec2_state_change" {
+  name        = "cloud-cleanup-ec2-state-change"
+  description = "EC2 instance state changes for the cleanup inventory"
+  event_pattern = jsonencode({
+    source      = ["aws.ec2"]
+    detail-type = ["EC2 Instance State-change Notification"]
+  })
+}
+
+resource "aws_cloudwatch_event_rule" "ec2_api_calls" {
+  name        = "cloud-cleanup-ec2-api-calls"
+  description = "CloudTrail EC2 calls that change instances or volumes"
+  event_pattern = jsonencode({
+    source      = ["aws.ec2"]
+    detail-type = ["AWS API Call via CloudTrail"]
+    detail = {
+      eventName = [
+        "RunInstances", "StartInstances", "StopInstances", "TerminateInstances",
+        "MonitorInstances", "UnmonitorInstances",
+        "CreateVolume", "DeleteVolume", "AttachVolume", "DetachVolume"
+      ]
+    }
+  })
+}
+
+resource "aws_cloudwatch_event_target" "ec2_state_change" {
+  rule = aws_cloudwatch_event_rule.ec2_state_change.name
+  arn  = aws_sqs_queue.inventory_events.arn
+}
+
+resource "aws_cloudwatch_event_target" "ec2_api_calls" {
+  rule = aws_cloudwatch_event_rule.ec2_api_calls.name
+  arn  = aws_sqs_queue.inventory_events.arn
+}
+
+resource "aws_sqs_queue_policy" "inventory_events" {
+  queue_url = aws_sqs_queue.inventory_events.id
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect    = "Allow"
+        Principal = { Service = "events.amazonaws.com" }
+        Action    = "sqs:SendMessage"
+        Resource  = aws_sqs_queue.inventory_events.arn
+        Condition = {
+          ArnEquals = {
+            "aws:SourceArn" = [
+              aws_cloudwatch_event_rule.ec2_state_change.arn,
+              aws_cloudwatch_event_rule.ec2_api_calls.arn
+            ]
+          }
+        }
+      }
+    ]
+  })
+}
+
+resource "aws_dynamodb_table" "inventory" {
+  name         = "cloud-cleanup-inventory"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "resource_id"
+
+  attribute {
+    name = "resource_id"
+    type = "S"
+  }
+
+  attribute {
+    name = "dirty_type"
+    type = "S"
+  }
+
+  attribute {
+    name = "finding_type"
+    type = "S"
+  }
+
+  # Sparse: only resources changed since they were last evaluated
+  global_secondary_index {
+    name            = "dirty-index"
+    hash_key        = "dirty_type"
+    projection_type = "KEYS_ONLY"
+  }
+
+  # Sparse: only resources whose current verdict is a finding
+  global_secondary_index {
+    name               = "finding-index"
+    hash_key           = "finding_type"
+    projection_type    = "INCLUDE"
+    non_key_attributes = ["reason"]
+  }
+}
+
+resource "aws_iam_policy" "inventory_access" {
+  name = "cloud-cleanup-inventory-access"
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect   = "Allow"
+        Action   = ["sqs:ReceiveMessage", "sqs:DeleteMessage"]
+        Resource = aws_sqs_queue.inventory_events.arn
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:GetItem", "dynamodb:PutItem", "dynamodb:UpdateItem",
+          "dynamodb:DeleteItem", "dynamodb:Query", "dynamodb:Scan"
+        ]
+        Resource = [aws_dynamodb_table.inventory.arn, "${aws_dynamodb_table.inventory.arn}/index/*"]
+      }
+    ]
+  })
+}
+
+resource "aws_iam_role_policy_attachment" "github_inventory_access" {
+  role       = aws_iam_role.github_actions_role.name
+  policy_arn = aws_iam_policy.inventory_access.arn
+}
+
+resource "aws_iam_role_policy_attachment" "lambda_inventory_access" {
+  role       = aws_iam_role.lambda_execution_role.name
+  policy_arn = aws_iam_policy.inventory_access.arn
+}
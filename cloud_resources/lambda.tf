@@ -1,3 +1,7 @@
+locals {
+  lambda_runtime = "python3.11"
+}
+
 resource "time_sleep" "wait_for_cluster" {
   create_duration = "30s"
 }
@@ -8,7 +12,10 @@ resource "null_resource" "package_lambda" {
       rm -rf ${path.module}/lambda_package
       mkdir -p ${path.module}/lambda_package
       cp -r ${path.module}/lambda_src/* ${path.module}/lambda_package/
-      pip install -r ${path.module}/lambda_src/requirements.txt -t ${path.module}/lambda_package
+      pip install -r ${path.module}/lambda_src/requirements.txt -t ${path.module}/lambda_package \
+        --platform manylinux2014_x86_64 --implementation cp \
+        --python-version ${trimprefix(local.lambda_runtime, "python")} --only-binary=:all:
+      ${local.lambda_runtime} ${path.module}/compile_package.py ${path.module}/lambda_package --runtime ${local.lambda_runtime}
     EOT
   }
 
@@ -37,13 +44,20 @@ resource "aws_lambda_function" "slack_interaction_handler" {
   function_name    = "CloudCleanupLambda"
   role             = aws_iam_role.lambda_execution_role.arn
   handler          = "lambda_function.lambda_handler"
-  runtime          = "python3.11"
+  runtime          = local.lambda_runtime
   filename         = data.archive_file.lambda_function_zip.output_path
   source_code_hash = data.archive_file.lambda_function_zip.output_base64sha256
+  timeout          = 900
 
   environment {
     variables = {
-      SLACK_WEBHOOK_URL = var.slack_webhook_url
+      SLACK_WEBHOOK_URL    = var.slack_webhook_url
+      SLACK_SIGNING_SECRET = var.slack_signing_secret
+      FINDINGS_BUCKET      = aws_s3_bucket.findings.bucket
+      IDEMPOTENCY_TABLE    = aws_dynamodb_table.cleanup_idempotency.name
+      SCAN_REGIONS         = join(",", var.scan_regions)
+      SCAN_ACCOUNT_ROLES   = join(",", var.scan_account_roles)
+      ENABLED_DETECTORS    = join(",", var.enabled_detectors)
     }
   }
 }
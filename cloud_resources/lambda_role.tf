@@ -30,3 +30,56 @@ resource "aws_iam_role_policy_attachment" "lambda_cloudwatch_access" {
   role       = aws_iam_role.lambda_execution_role.name
   policy_arn = "arn:aws:iam::aws:policy/CloudWatchReadOnlyAccess"
 }
+
+# CloudWatch KPI publishing, limited to the cleanup namespace
+resource "aws_iam_role_policy" "lambda_metrics_publish" {
+  name = "lambda-metrics-publish"
+  role = aws_iam_role.lambda_execution_role.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect    = "Allow"
+        Action    = ["cloudwatch:PutMetricData"]
+        Resource  = "*"
+        Condition = { StringEquals = { "cloudwatch:namespace" = "CloudCleanup" } }
+      }
+    ]
+  })
+}
+
+# Read access for the region-wide detectors and the remediations of approved findings
+resource "aws_iam_role_policy" "lambda_detectors" {
+  name = "lambda-detectors"
+  role = aws_iam_role.lambda_execution_role.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "rds:DescribeDBInstances",
+          "rds:DescribeDBClusters",
+          "rds:StopDBInstance",
+          "rds:StopDBCluster",
+          "s3:ListAllMyBuckets",
+          "s3:GetBucketLocation",
+          "s3:ListBucketMultipartUploads",
+          "s3:ListMultipartUploadParts",
+          "s3:GetLifecycleConfiguration",
+          "s3:AbortMultipartUpload",
+          "logs:DescribeLogGroups",
+          "logs:PutRetentionPolicy",
+          "lambda:ListFunctions",
+          "lambda:ListVersionsByFunction",
+          "lambda:ListAliases",
+          "dynamodb:ListTables",
+          "dynamodb:DescribeTable"
+        ]
+        Resource = "*"
+      }
+    ]
+  })
+}
@@ -0,0 +1,218 @@
+import argparse
+import base64
+import gzip
+import json
+import threading
+import time
+from urllib.parse import parse_qsl, urlsplit
+import boto3
+from botocore.awsrequest import AWSResponse
+
+CASSETTE_VERSION = 1
+# Request parameters that differ between otherwise identical runs, such as metric time windows
+VOLATILE_PARAMS = {'StartTime', 'EndTime', 'Timestamp', 'ClientToken', 'StartDate', 'EndDate'}
+# Response headers worth keeping; the rest (dates, request IDs) only bloat the cassette
+KEPT_HEADERS = {'content-type', 'x-amzn-query-mode'}
+
+
+class CassetteMiss(Exception):
+    """Raised when replay meets a request the cassette has no response for."""
+
+
+def _param_name(key):
+    # Query keys look like Filter.1.Value.2; JSON bodies are matched by their top-level keys
+    return key.split('.')[0]
+
+
+def request_key(operation_name, request):
+    """Match key for a request: operation, path and its non-volatile parameters."""
+    url = urlsplit(request.url)
+    body = request.body or b''
+    if hasattr(body, 'read'):
+        body = b''
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    content_type = request.headers.get('Content-Type', b'')
+    if isinstance(content_type, bytes):
+        content_type = content_type.decode('latin-1')
+
+    if 'json' in content_type:
+        try:
+            params = json.loads(body or b'{}')
+            params = {key: value for key, value in params.items() if key not in VOLATILE_PARAMS}
+            normalized = json.dumps(params, sort_keys=True, separators=(',', ':'))
+        except ValueError:
+            normalized = body.decode('utf-8', 'replace')
+    else:
+        pairs = parse_qsl(body.decode('utf-8', 'replace'), keep_blank_values=True) + parse_qsl(url.query, keep_blank_values=True)
+        normalized = '&'.join(f"{key}={value}" for key, value in sorted(pairs) if _param_name(key) not in VOLATILE_PARAMS)
+    return f"{operation_name} {request.method} {url.path} {normalized}"
+
+
+class _ReplayBody:
+    def __init__(self, body):
+        self._body = body
+
+    def stream(self, *args, **kwargs):
+        yield self._body
+
+
+def _operation_events(client):
+    service_id = client.meta.service_model.service_id.hyphenize()
+    return f"before-send.{service_id}", f"before-call.{service_id}"
+
+
+class CassetteRecorder:
+    """Captures the request/response pairs of real API calls into a cassette."""
+
+    def __init__(self, region=None):
+        self.region = region
+        self.entries = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def attach(self, client):
+        """Record every call the client makes; returns the client."""
+        # botocore has no public accessor for a client's HTTP session
+        http_session = client._endpoint.http_session
+        service_name = client.meta.service_model.service_name
+        send_event, call_event = _operation_events(client)
+
+        def remember_operation(model, **kwargs):
+            self._local.operation_name = model.name
+
+        def send(request, **kwargs):
+            started = time.monotonic()
+            response = http_session.send(request)
+            elapsed = time.monotonic() - started
+            entry = {
+                'service': service_name,
+                'key': request_key(self._local.operation_name, request),
+                'status': response.status_code,
+                'headers': {name: value for name, value in response.headers.items() if name.lower() in KEPT_HEADERS},
+                'body': base64.b64encode(response.content).decode('ascii'),
+                'elapsed': round(elapsed, 4),
+            }
+            with self._lock:
+                self.entries.append(entry)
+            return response
+
+        client.meta.events.register(call_event, remember_operation)
+        client.meta.events.register(send_event, send)
+        return client
+
+    def save(self, path):
+        """Write the cassette as gzip-compressed JSON lines."""
+        with gzip.open(path, 'wt', encoding='utf-8') as cassette:
+            cassette.write(json.dumps({'version': CASSETTE_VERSION, 'region': self.region}) + '\n')
+            for entry in self.entries:
+                cassette.write(json.dumps(entry, separators=(',', ':')) + '\n')
+        print(f"Recorded {len(self.entries)} responses to {path}")
+
+
+class CassettePlayer:
+    """Serves recorded responses instead of calling AWS.
+
+    latency is None for no delay, 'recorded' to replay each call's original
+    latency (times latency_scale), or a fixed number of seconds per call.
+    Repeated identical requests get their recorded responses in order; once
+    those run out the last one is served again.
+    """
+
+    def __init__(self, path, latency=None, latency_scale=1.0):
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self._responses = {}
+        self._served = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        with gzip.open(path, 'rt', encoding='utf-8') as cassette:
+            header = json.loads(cassette.readline())
+            if header.get('version') != CASSETTE_VERSION:
+                raise ValueError(f"Unsupported cassette version {header.get('version')} in {path}")
+            self.region = header.get('region')
+            for line in cassette:
+                entry = json.loads(line)
+                self._responses.setdefault((entry['service'], entry['key']), []).append(entry)
+
+    def _next_entry(self, service_name, key):
+        with self._lock:
+            entries = self._responses.get((service_name, key))
+            if not entries:
+                raise CassetteMiss(f"No recorded response for {service_name} {key}")
+            index = self._served.get((service_name, key), 0)
+            self._served[(service_name, key)] = index + 1
+            return entries[min(index, len(entries) - 1)]
+
+    def _delay(self, entry):
+        if self.latency == 'recorded':
+            return entry['elapsed'] * self.latency_scale
+        return self.latency or 0
+
+    def attach(self, client):
+        """Serve all of the client's calls from the cassette; returns the client."""
+        service_name = client.meta.service_model.service_name
+        send_event, call_event = _operation_events(client)
+
+        def remember_operation(model, **kwargs):
+            self._local.operation_name = model.name
+
+        def send(request, **kwargs):
+            entry = self._next_entry(service_name, request_key(self._local.operation_name, request))
+            delay = self._delay(entry)
+            if delay:
+                time.sleep(delay)
+            body = base64.b64decode(entry['body'])
+            return AWSResponse(request.url, entry['status'], entry['headers'], _ReplayBody(body))
+
+        client.meta.events.register(call_event, remember_operation)
+        client.meta.events.register(send_event, send)
+        return client
+
+    def client(self, service_name, **client_kwargs):
+        """A client for the cassette's region whose calls never leave the process."""
+        client_kwargs.setdefault('region_name', self.region or 'us-east-1')
+        # Requests are still signed, so any credentials will do
+        client_kwargs.setdefault('aws_access_key_id', 'replay')
+        client_kwargs.setdefault('aws_secret_access_key', 'replay')
+        return self.attach(boto3.client(service_name, **client_kwargs))
+
+
+def main():
+    from cloud_cleanup import cleanup_resources
+
+    parser = argparse.ArgumentParser(description="Record a dry run into a cassette, or replay one to profile cleanup_resources offline.")
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    record_parser = subcommands.add_parser('record', help="Run a real dry run and record its API traffic")
+    record_parser.add_argument('cassette')
+    record_parser.add_argument('--region', default=boto3.session.Session().region_name or 'us-east-1')
+    replay_parser = subcommands.add_parser('replay', help="Run cleanup_resources against a cassette")
+    replay_parser.add_argument('cassette')
+    replay_parser.add_argument('--latency', default=None, help="'recorded' or seconds per call")
+    replay_parser.add_argument('--latency-scale', type=float, default=1.0)
+    replay_parser.add_argument('--repeat', type=int, default=1)
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        recorder = CassetteRecorder(args.region)
+        ec2_client = recorder.attach(boto3.client('ec2', region_name=args.region))
+        cloudwatch_client = recorder.attach(boto3.client('cloudwatch', region_name=args.region))
+        cleanup_resources(ec2_client, cloudwatch_client, dry_run=True)
+        recorder.save(args.cassette)
+        return
+
+    latency = args.latency
+    if latency not in (None, 'recorded'):
+        latency = float(latency)
+    for run in range(1, args.repeat + 1):
+        player = CassettePlayer(args.cassette, latency, args.latency_scale)
+        started = time.perf_counter()
+        idle_instances, _, unattached_volumes, _ = cleanup_resources(
+            player.client('ec2'), player.client('cloudwatch'), dry_run=True
+        )
+        elapsed = time.perf_counter() - started
+        print(f"Run {run}: {len(idle_instances)} idle instances, {len(unattached_volumes)} unattached volumes in {elapsed:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
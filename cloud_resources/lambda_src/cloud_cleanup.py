@@ -2,34 +2,74 @@ import boto3
 import csv
 import os
 import json
-import requests
+import time
 from datetime import datetime, timedelta
+from delta import compute_delta, format_delta_text, save_index
+from detectors import ENABLED_DETECTORS, run_detectors
+from findings_store import build_snapshot, detector_findings, get_findings_store, save_snapshot, snapshot_savings, unpack_snapshot
+from inventory import get_inventory
+from metrics import MetricsPublisher, METRICS_FLUSH_TIMEOUT_SECONDS, record_run_metrics
+from projection import create_projected_client
+from streaming import describe_by_ids, stream_items
+from sharding import SCAN_REGIONS, id_suffix_filter, run_sharded_scan
+from slack_dispatch import SLACK_TEAM_CHANNELS, get_webhook_client, notify_teams
+from slack_report import build_findings_blocks, get_slack_client, upload_report
+from transport import create_client, log_pool_stats, share_http_pool
 
 # CPU utilization threshold (percentage)
 CPU_THRESHOLD = 5
 LAMBDA_FUNCTION_NAME = "CloudCleanupLambda"
 AWS_REGION = "us-east-1"
 SLACK_WEBHOOK_URL = os.getenv('SLACK_WEBHOOK_URL')
+# "sharded" fans the scan out across Lambda workers instead of scanning in-process
+SCAN_MODE = os.getenv('SCAN_MODE', 'local')
+# Parse only the describe fields the scanners read
+RESPONSE_PROJECTION = os.getenv('RESPONSE_PROJECTION', 'False').lower() == 'true'
+# Parse describe pages incrementally and scan items as they arrive
+STREAMING_PARSE = os.getenv('STREAMING_PARSE', 'False').lower() == 'true'
+SCAN_PROJECTIONS = {
+    'DescribeInstances': [
+        'Reservations.Instances.InstanceId',
+        'Reservations.Instances.State.Name',
+        'Reservations.Instances.Monitoring.State',
+    ],
+    'DescribeVolumes': ['Volumes.VolumeId', 'Volumes.State'],
+}
 
-def find_idle_instances(ec2_client, cloudwatch_client):
-    """Find running instances that are either idle (monitoring disabled) or underutilized."""
-    instances = ec2_client.describe_instances(
-        Filters=[{'Name': 'instance-state-name', 'Values': ['running']}]
-    )
+def instance_idle_reason(cloudwatch_client, instance):
+    """Reason a described instance counts as idle, or None if it is in use or not running."""
+    if instance.get('State', {}).get('Name', 'running') != 'running':
+        return None
+    if 'Monitoring' in instance and instance['Monitoring']['State'] == 'disabled':
+        return "Monitoring is disabled"
+    avg_cpu = get_instance_cpu_utilization(cloudwatch_client, instance['InstanceId'])
+    if avg_cpu < CPU_THRESHOLD:
+        return f"Low CPU utilization: {avg_cpu:.2f}%"
+    return None
+
+def find_idle_instances(ec2_client, cloudwatch_client, inventory=None, id_suffixes=None):
+    """Find running instances that are either idle (monitoring disabled) or underutilized.
+
+    With an inventory service, only instances changed since the last run are
+    described and evaluated; everything else comes from the resource table.
+    """
+    if inventory is not None:
+        return inventory.refresh('instance', lambda instance: instance_idle_reason(cloudwatch_client, instance))
+
+    filters = [{'Name': 'instance-state-name', 'Values': ['running']}] + id_suffix_filter('instance-id', 'i', id_suffixes)
+    if STREAMING_PARSE:
+        reservations = stream_items(ec2_client, 'DescribeInstances', 'Reservations', Filters=filters)
+    else:
+        reservations = ec2_client.describe_instances(Filters=filters)['Reservations']
     idle_instances = []
     instance_reasons = {}
 
-    for reservation in instances['Reservations']:
+    for reservation in reservations:
         for instance in reservation['Instances']:
-            instance_id = instance['InstanceId']
-            if 'Monitoring' in instance and instance['Monitoring']['State'] == 'disabled':
-                idle_instances.append(instance_id)
-                instance_reasons[instance_id] = "Monitoring is disabled"
-            else:
-                avg_cpu = get_instance_cpu_utilization(cloudwatch_client, instance_id)
-                if avg_cpu < CPU_THRESHOLD:
-                    idle_instances.append(instance_id)
-                    instance_reasons[instance_id] = f"Low CPU utilization: {avg_cpu:.2f}%"
+            reason = instance_idle_reason(cloudwatch_client, instance)
+            if reason:
+                idle_instances.append(instance['InstanceId'])
+                instance_reasons[instance['InstanceId']] = reason
 
     return idle_instances, instance_reasons
 
@@ -55,28 +95,63 @@ def get_instance_cpu_utilization(cloudwatch_client, instance_id):
     avg_cpu = sum(dp['Average'] for dp in data_points) / len(data_points)
     return avg_cpu
 
-def find_unattached_volumes(ec2_client):
+def volume_unattached_reason(volume):
+    """Reason a described volume counts as unattached, or None if it is in use."""
+    if volume.get('State', 'available') != 'available':
+        return None
+    return "Volume is not attached to any instance."
+
+def find_unattached_volumes(ec2_client, inventory=None, id_suffixes=None):
     """Find unattached (available) volumes."""
-    volumes = ec2_client.describe_volumes(
-        Filters=[{'Name': 'status', 'Values': ['available']}]
-    )
+    if inventory is not None:
+        return inventory.refresh('volume', volume_unattached_reason)
+
+    filters = [{'Name': 'status', 'Values': ['available']}] + id_suffix_filter('volume-id', 'vol', id_suffixes)
+    if STREAMING_PARSE:
+        volumes = stream_items(ec2_client, 'DescribeVolumes', 'Volumes', Filters=filters)
+    else:
+        volumes = ec2_client.describe_volumes(Filters=filters)['Volumes']
     unattached_volumes = []
     volume_reasons = {}
 
-    for volume in volumes['Volumes']:
+    for volume in volumes:
         unattached_volumes.append(volume['VolumeId'])
-        volume_reasons[volume['VolumeId']] = "Volume is not attached to any instance."
+        volume_reasons[volume['VolumeId']] = volume_unattached_reason(volume)
 
     return unattached_volumes, volume_reasons
 
-def cleanup_resources(ec2_client, cloudwatch_client, dry_run=True):
+def cleanup_resources(ec2_client, cloudwatch_client, dry_run=True, inventory=None, id_suffixes=None):
     """Identify and optionally clean up resources."""
-    idle_instances, instance_reasons = find_idle_instances(ec2_client, cloudwatch_client)
-    unattached_volumes, volume_reasons = find_unattached_volumes(ec2_client)
+    idle_instances, instance_reasons = find_idle_instances(ec2_client, cloudwatch_client, inventory, id_suffixes)
+    unattached_volumes, volume_reasons = find_unattached_volumes(ec2_client, inventory, id_suffixes)
+    return idle_instances, instance_reasons, unattached_volumes, volume_reasons
+
+def revalidate_findings(ec2_client, idle_instances, instance_reasons, unattached_volumes, volume_reasons):
+    """Drop snapshot findings whose resources are no longer running or unattached."""
+    running_instances = {
+        instance['InstanceId']
+        for reservation in describe_by_ids(
+            ec2_client, 'DescribeInstances', 'Reservations', 'instance-id', idle_instances,
+            [{'Name': 'instance-state-name', 'Values': ['running']}],
+        )
+        for instance in reservation['Instances']
+    }
+    available_volumes = {
+        volume['VolumeId']
+        for volume in describe_by_ids(
+            ec2_client, 'DescribeVolumes', 'Volumes', 'volume-id', unattached_volumes,
+            [{'Name': 'status', 'Values': ['available']}],
+        )
+    }
+
+    idle_instances = [instance for instance in idle_instances if instance in running_instances]
+    unattached_volumes = [volume for volume in unattached_volumes if volume in available_volumes]
+    instance_reasons = {instance: instance_reasons[instance] for instance in idle_instances}
+    volume_reasons = {volume: volume_reasons[volume] for volume in unattached_volumes}
     return idle_instances, instance_reasons, unattached_volumes, volume_reasons
 
-def generate_report(idle_instances, instance_reasons, unattached_volumes, volume_reasons):
-    """Generate a CSV report of identified resources."""
+def generate_report(idle_instances, instance_reasons, unattached_volumes, volume_reasons, findings=None):
+    """Generate a CSV report of identified resources, followed by any detector findings."""
     timestamp = datetime.utcnow().strftime('%Y-%m-%d_%H-%M-%S')
     report_filename = f"cloud_cleanup_report_{timestamp}.csv"
     with open(report_filename, 'w', newline='') as csvfile:
@@ -86,6 +161,8 @@ def generate_report(idle_instances, instance_reasons, unattached_volumes, volume
             writer.writerow(['Idle Instance', instance, instance_reasons.get(instance, 'Reason not available')])
         for volume in unattached_volumes:
             writer.writerow(['Unattached Volume', volume, volume_reasons.get(volume, 'Reason not available')])
+        for finding in findings or []:
+            writer.writerow([finding['resource_type'], finding['resource_id'], finding['reason']])
 
     print(f"Report generated: {report_filename}")
     return report_filename
@@ -104,43 +181,115 @@ def trigger_lambda():
 if not SLACK_WEBHOOK_URL:
     raise ValueError("SLACK_WEBHOOK_URL is not set. Check GitHub Secrets.")
 
-def send_slack_notification():
-    """Send Slack message with Approve/Decline buttons."""
-    payload = {
-        "text": "Cloud Cleanup dry-run completed. Approve to clean up identified resources.",
-        "attachments": [
-            {
-                "fallback": "Approve or Decline Cleanup.",
-                "text": "Choose an action:",
-                "actions": [
-                    {
-                        "type": "button",
-                        "text": "Approve Cleanup",
-                        "url": "https://slack.com/api/trigger-lambda",
-                        "style": "primary"
-                    },
-                    {
-                        "type": "button",
-                        "text": "Decline Cleanup",
-                        "url": "https://slack.com"
-                    }
-                ]
-            }
-        ]
-    }
-    response = requests.post(SLACK_WEBHOOK_URL, json=payload)
-    response.raise_for_status()
+def send_slack_notification(snapshot_id=None, summary=None, snapshot=None, delta=None, report_filename=None):
+    """Send Slack message with Approve/Decline buttons.
+
+    The Approve button carries the findings snapshot ID so the approval acts on
+    exactly what the dry run reported. The optional summary lists what changed
+    since the previous run. With a snapshot the message is a compact Block Kit
+    summary, and the full report is uploaded when a bot token is configured.
+    """
+    approve_value = f"approve:{snapshot_id}" if snapshot_id else "approve"
+    text = "Cloud Cleanup dry-run completed. Approve to clean up identified resources."
+    if summary:
+        text = f"{text}\n{summary}"
+    slack_client = get_slack_client()
+    upload = bool(report_filename and slack_client)
+    if snapshot is not None:
+        blocks = build_findings_blocks(
+            snapshot, snapshot_id, summary, delta, snapshot_savings(snapshot), report_attached=upload,
+        )
+        payload = {"text": text, "blocks": blocks}
+    else:
+        payload = {
+            "text": text,
+            "attachments": [
+                {
+                    "fallback": "Approve or Decline Cleanup.",
+                    "text": "Choose an action:",
+                    "callback_id": "cloud_cleanup",
+                    "actions": [
+                        {
+                            "type": "button",
+                            "name": "cleanup",
+                            "text": "Approve Cleanup",
+                            "value": approve_value,
+                            "style": "primary"
+                        },
+                        {
+                            "type": "button",
+                            "name": "cleanup",
+                            "text": "Decline Cleanup",
+                            "value": "decline"
+                        }
+                    ]
+                }
+            ]
+        }
+    response = get_webhook_client(SLACK_WEBHOOK_URL).send_dict(payload)
+    if response.status_code != 200:
+        raise RuntimeError(f"Slack webhook failed with status {response.status_code}: {response.body}")
+
+    if upload:
+        upload_report(slack_client, report_filename, title="Cloud Cleanup report")
+
+def send_cleanup_result(text, report_filename=None):
+    """Post the outcome of an approved cleanup as a plain message, without approval buttons."""
+    response = get_webhook_client(SLACK_WEBHOOK_URL).send_dict({"text": text})
+    if response.status_code != 200:
+        raise RuntimeError(f"Slack webhook failed with status {response.status_code}: {response.body}")
+
+    slack_client = get_slack_client()
+    if report_filename and slack_client:
+        upload_report(slack_client, report_filename, title="Cloud Cleanup results")
 
 def main():
     """Main execution logic."""
-    ec2_client = boto3.client('ec2')
-    cloudwatch_client = boto3.client('cloudwatch')
+    started = time.monotonic()
+    metrics = MetricsPublisher(dimensions={'Run': 'scan'})
+    if RESPONSE_PROJECTION:
+        ec2_client = share_http_pool(create_projected_client('ec2', SCAN_PROJECTIONS))
+    else:
+        ec2_client = create_client('ec2')
+    cloudwatch_client = create_client('cloudwatch')
+    metrics.count_api_calls(ec2_client)
+    metrics.count_api_calls(cloudwatch_client)
     dry_run = os.getenv('DRY_RUN', 'True').lower() == 'true'
 
-    idle_instances, instance_reasons, unattached_volumes, volume_reasons = cleanup_resources(ec2_client, cloudwatch_client, dry_run)
-    report_filename = generate_report(idle_instances, instance_reasons, unattached_volumes, volume_reasons)
-    send_slack_notification()
+    findings_store = get_findings_store()
+
+    if SCAN_MODE == 'sharded':
+        snapshot = run_sharded_scan(findings_store)
+        idle_instances, instance_reasons, unattached_volumes, volume_reasons = unpack_snapshot(snapshot)
+    else:
+        inventory = get_inventory(ec2_client)
+        idle_instances, instance_reasons, unattached_volumes, volume_reasons = cleanup_resources(ec2_client, cloudwatch_client, dry_run, inventory)
+        findings = []
+        if ENABLED_DETECTORS:
+            for region in SCAN_REGIONS:
+                findings.extend(run_detectors(boto3.Session(region_name=region), include_global=region == SCAN_REGIONS[0], metrics=metrics))
+        snapshot = build_snapshot(idle_instances, instance_reasons, unattached_volumes, volume_reasons, findings)
+        # Record where instances and volumes were found, as sharded scans do, for revalidation at approval
+        for finding in snapshot['findings']:
+            finding.setdefault('region', ec2_client.meta.region_name)
+    findings = detector_findings(snapshot)
+    report_filename = generate_report(idle_instances, instance_reasons, unattached_volumes, volume_reasons, findings)
+    snapshot_id = save_snapshot(findings_store, snapshot)
+    print(f"Findings snapshot stored: {snapshot_id}")
+    delta, index = compute_delta(findings_store, snapshot_id, snapshot)
+    record_run_metrics(metrics, started, idle_instances, unattached_volumes, findings)
+    metrics.put('NewFindings', len(delta['added']))
+    metrics.put('ResolvedFindings', len(delta['removed']))
+    # Publish while Slack is notified; wait before exiting so no datapoints are lost
+    metrics_flush = metrics.flush_async()
+    send_slack_notification(snapshot_id, format_delta_text(delta, snapshot), snapshot, delta, report_filename)
+    # Only a delta that reached Slack becomes the baseline for the next run
+    save_index(findings_store, index)
+    if SLACK_TEAM_CHANNELS:
+        notify_teams(snapshot)
     print(f"Report generated: {report_filename}")
+    log_pool_stats()
+    metrics_flush.join(METRICS_FLUSH_TIMEOUT_SECONDS)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,145 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from metric_data import HOURS_PER_MONTH, fetch_metric_values, lookback_window, metric_stat
+from streaming import paginate_items
+from transport import create_client
+
+# Databases whose CPU averaged below this (percent) with no connections count as idle
+DB_IDLE_CPU_PERCENT = float(os.getenv('DB_IDLE_CPU_PERCENT', '2'))
+# Stop calls in flight at once; RDS throttles control-plane calls per account and region
+RDS_STOP_CONCURRENCY = int(os.getenv('RDS_STOP_CONCURRENCY', '4'))
+# Adaptive retries slow the whole client down once RDS starts throttling
+RDS_REMEDIATION_CONFIG = Config(retries={'mode': 'adaptive', 'max_attempts': 10})
+# Approximate on-demand hourly prices (us-east-1, single-AZ) by instance class; Multi-AZ doubles them.
+# Classes not listed get no savings estimate.
+DB_CLASS_HOURLY_PRICES = {
+    'db.t3.micro': 0.017, 'db.t3.small': 0.034, 'db.t3.medium': 0.068, 'db.t3.large': 0.136,
+    'db.t4g.micro': 0.016, 'db.t4g.small': 0.032, 'db.t4g.medium': 0.065, 'db.t4g.large': 0.129,
+    'db.m5.large': 0.171, 'db.m5.xlarge': 0.342, 'db.m5.2xlarge': 0.684, 'db.m5.4xlarge': 1.368,
+    'db.m6g.large': 0.152, 'db.m6g.xlarge': 0.304, 'db.m6g.2xlarge': 0.608,
+    'db.r5.large': 0.25, 'db.r5.xlarge': 0.5, 'db.r5.2xlarge': 1.0, 'db.r5.4xlarge': 2.0,
+    'db.r6g.large': 0.225, 'db.r6g.xlarge': 0.45, 'db.r6g.2xlarge': 0.9, 'db.r6g.4xlarge': 1.8,
+}
+DB_INSTANCE_TYPE = 'Idle RDS Instance'
+DB_CLUSTER_TYPE = 'Idle Aurora Cluster'
+
+
+def monthly_cost(instance):
+    """Estimated monthly compute cost of a DB instance from its class, or None for unknown classes."""
+    hourly_price = DB_CLASS_HOURLY_PRICES.get(instance['DBInstanceClass'])
+    if hourly_price is None:
+        return None
+    return hourly_price * (2 if instance.get('MultiAZ') else 1) * HOURS_PER_MONTH
+
+
+def _database_metrics(dimension, identifier):
+    return {
+        'connections': metric_stat('AWS/RDS', 'DatabaseConnections', {dimension: identifier}, 'Maximum'),
+        'cpu': metric_stat('AWS/RDS', 'CPUUtilization', {dimension: identifier}, 'Average'),
+    }
+
+
+def database_identifier(arn):
+    """DB instance or cluster identifier from its ARN, e.g. arn:aws:rds:us-east-1:123456789012:db:my-db."""
+    return arn.rsplit(':', 1)[-1]
+
+
+def _idle_reason(usage):
+    """Reason a database with these metric values counts as idle, or None."""
+    connections, cpu = usage['connections'], usage['cpu']
+    # No datapoints at all means CloudWatch has not seen the database over the window
+    if not cpu or max(connections or [0]) > 0 or max(cpu) >= DB_IDLE_CPU_PERCENT:
+        return None
+    return f"No connections and {max(cpu):.2f}% average CPU over the lookback window"
+
+
+def find_idle_databases(rds_client, cloudwatch_client):
+    """Find RDS instances and Aurora clusters with no connections and near-zero CPU.
+
+    Metrics for every database come from batched GetMetricData calls: two
+    queries per database, so 500 databases take two calls however they are split.
+    """
+    window_start, _ = lookback_window()
+    clusters = [
+        cluster for cluster in paginate_items(rds_client, 'DescribeDBClusters', 'DBClusters')
+        if cluster['Status'] == 'available' and cluster['Engine'].startswith('aurora')
+        and cluster.get('EngineMode', 'provisioned') == 'provisioned' and cluster['ClusterCreateTime'] <= window_start
+    ]
+    members_by_cluster = {}
+    instances = []
+    for instance in paginate_items(rds_client, 'DescribeDBInstances', 'DBInstances'):
+        if instance.get('DBClusterIdentifier'):
+            members_by_cluster.setdefault(instance['DBClusterIdentifier'], []).append(instance)
+        # Read replicas cannot be stopped
+        elif instance['DBInstanceStatus'] == 'available' and not instance.get('ReadReplicaSourceDBInstanceIdentifier') \
+                and instance['InstanceCreateTime'] <= window_start:
+            instances.append(instance)
+
+    metrics = {}
+    for instance in instances:
+        for name, stat in _database_metrics('DBInstanceIdentifier', instance['DBInstanceIdentifier']).items():
+            metrics[(DB_INSTANCE_TYPE, instance['DBInstanceIdentifier'], name)] = stat
+    for cluster in clusters:
+        for name, stat in _database_metrics('DBClusterIdentifier', cluster['DBClusterIdentifier']).items():
+            metrics[(DB_CLUSTER_TYPE, cluster['DBClusterIdentifier'], name)] = stat
+    values = fetch_metric_values(cloudwatch_client, metrics)
+
+    def usage(resource_type, identifier):
+        return {name: values[(resource_type, identifier, name)] for name in ('connections', 'cpu')}
+
+    findings = []
+    for instance in instances:
+        reason = _idle_reason(usage(DB_INSTANCE_TYPE, instance['DBInstanceIdentifier']))
+        if reason:
+            finding = {
+                'resource_type': DB_INSTANCE_TYPE,
+                # Identifiers repeat across accounts and regions; the ARN does not
+                'resource_id': instance['DBInstanceArn'],
+                'reason': f"{reason} ({instance['Engine']} {instance['DBInstanceClass']}).",
+            }
+            cost = monthly_cost(instance)
+            if cost:
+                finding['monthly_savings'] = round(cost, 2)
+            findings.append(finding)
+    for cluster in clusters:
+        reason = _idle_reason(usage(DB_CLUSTER_TYPE, cluster['DBClusterIdentifier']))
+        if reason:
+            members = members_by_cluster.get(cluster['DBClusterIdentifier'], [])
+            classes = sorted({member['DBInstanceClass'] for member in members})
+            finding = {
+                'resource_type': DB_CLUSTER_TYPE,
+                'resource_id': cluster['DBClusterArn'],
+                'reason': f"{reason} ({len(members)} x {', '.join(classes) or 'no instances'}).",
+            }
+            costs = [monthly_cost(member) for member in members]
+            if costs and None not in costs:
+                finding['monthly_savings'] = round(sum(costs), 2)
+            findings.append(finding)
+    return findings
+
+
+def stop_idle_databases(session, findings):
+    """Stop the databases of approved findings, a few at a time; returns how many were stopped.
+
+    Databases that are no longer available (already stopped, deleted or
+    modifying) are skipped. RDS starts stopped databases again after seven days.
+    """
+    rds_client = create_client('rds', session, config=RDS_REMEDIATION_CONFIG)
+
+    def stop(finding):
+        identifier = database_identifier(finding['resource_id'])
+        try:
+            if finding['resource_type'] == DB_CLUSTER_TYPE:
+                rds_client.stop_db_cluster(DBClusterIdentifier=identifier)
+            else:
+                rds_client.stop_db_instance(DBInstanceIdentifier=identifier)
+        except ClientError as e:
+            print(f"Skipped stopping {finding['resource_id']}: {e.response['Error']['Code']}")
+            return False
+        print(f"Stopped {finding['resource_type']} {finding['resource_id']}")
+        return True
+
+    with ThreadPoolExecutor(max_workers=RDS_STOP_CONCURRENCY) as executor:
+        return sum(executor.map(stop, findings))
@@ -0,0 +1,103 @@
+import hashlib
+import json
+import re
+
+# Longest list of individual findings included in a Slack message
+SLACK_DELTA_LIMIT = 50
+# Standalone numbers in reason text, e.g. the 2.31 of "Low CPU utilization: 2.31%", but
+# not the digits inside resource IDs such as eni-0abc123
+MEASUREMENT_PATTERN = re.compile(r'(?<![\w-])(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?')
+
+
+def reason_category(reason):
+    """A reason with its measurements blanked out, so a new CPU average or size is not a change."""
+    return MEASUREMENT_PATTERN.sub('#', reason)
+
+
+def reason_hash(reason):
+    """Short, stable fingerprint of a finding's reason category."""
+    return hashlib.sha256(reason_category(reason).encode('utf-8')).hexdigest()[:16]
+
+
+def build_findings_index(snapshot_id, snapshot):
+    """Build the sorted (resource_type, resource_id, reason_hash) index of a snapshot."""
+    entries = sorted(
+        [finding['resource_type'], finding['resource_id'], reason_hash(finding['reason'])]
+        for finding in snapshot['findings']
+    )
+    return {'snapshot_id': snapshot_id, 'entries': entries}
+
+
+def load_previous_index(store):
+    """Index of the previous run, or None on the first run."""
+    body = store.read_index()
+    if body is None:
+        return None
+    return json.loads(body)
+
+
+def save_index(store, index):
+    """Make this run's index the baseline for the next run."""
+    store.write_index(json.dumps(index, separators=(',', ':')).encode('utf-8'))
+
+
+def diff_indexes(previous_entries, current_entries):
+    """Merge two sorted indexes in one pass into added, changed, removed and unchanged keys."""
+    added, changed, removed, unchanged = [], [], [], []
+    i = j = 0
+    while i < len(previous_entries) and j < len(current_entries):
+        previous_key, previous_hash = tuple(previous_entries[i][:2]), previous_entries[i][2]
+        current_key, current_hash = tuple(current_entries[j][:2]), current_entries[j][2]
+        if previous_key == current_key:
+            (unchanged if previous_hash == current_hash else changed).append(current_key)
+            i += 1
+            j += 1
+        elif previous_key < current_key:
+            removed.append(previous_key)
+            i += 1
+        else:
+            added.append(current_key)
+            j += 1
+    removed.extend(tuple(entry[:2]) for entry in previous_entries[i:])
+    added.extend(tuple(entry[:2]) for entry in current_entries[j:])
+    return {'added': added, 'changed': changed, 'removed': removed, 'unchanged': unchanged}
+
+
+def compute_delta(store, snapshot_id, snapshot):
+    """Diff this run against the previous one; returns the delta and this run's index.
+
+    The index is not saved here: pass it to save_index once the delta has been
+    reported, so a failed notification is reported again by the next run.
+    """
+    index = build_findings_index(snapshot_id, snapshot)
+    previous = load_previous_index(store)
+    delta = diff_indexes(previous['entries'] if previous else [], index['entries'])
+    delta['previous_snapshot_id'] = previous['snapshot_id'] if previous else None
+    return delta, index
+
+
+def format_delta_text(delta, snapshot):
+    """Render counts and the new or changed findings as Slack message text."""
+    reasons = {
+        (finding['resource_type'], finding['resource_id']): finding['reason']
+        for finding in snapshot['findings']
+    }
+    lines = [
+        f"New: {len(delta['added'])}, changed: {len(delta['changed'])}, "
+        f"resolved: {len(delta['removed'])}, unchanged: {len(delta['unchanged'])}"
+    ]
+
+    listed = 0
+    for label, keys in (('New', delta['added']), ('Changed', delta['changed']), ('Resolved', delta['removed'])):
+        for resource_type, resource_id in keys:
+            if listed == SLACK_DELTA_LIMIT:
+                break
+            reason = reasons.get((resource_type, resource_id))
+            suffix = f": {reason}" if reason and label != 'Resolved' else ""
+            lines.append(f"• {label} {resource_type} {resource_id}{suffix}")
+            listed += 1
+
+    remaining = len(delta['added']) + len(delta['changed']) + len(delta['removed']) - listed
+    if remaining > 0:
+        lines.append(f"…and {remaining} more in the full report.")
+    return "\n".join(lines)
@@ -0,0 +1,87 @@
+import os
+import time
+from databases import DB_CLUSTER_TYPE, DB_INSTANCE_TYPE, find_idle_databases, stop_idle_databases
+from dynamodb_capacity import find_overprovisioned_tables
+from images import find_unused_images
+from lambda_versions import find_stale_lambda_versions
+from load_balancers import find_idle_load_balancers
+from log_retention import NO_RETENTION_TYPE, find_log_groups_without_retention, set_log_retention
+from network_waste import find_network_waste
+from s3_uploads import STALE_UPLOADS_TYPE, abort_stale_uploads, find_stale_multipart_uploads
+from security_groups import find_unused_security_groups
+from transport import create_client
+
+# Detectors to run besides idle instances and unattached volumes, e.g. "network"
+ENABLED_DETECTORS = [name for name in os.getenv('ENABLED_DETECTORS', '').split(',') if name]
+
+# Detector name -> (function, services whose clients it takes, in argument order).
+# Each function scans one region and returns findings in snapshot format; the
+# service name 'session' passes the region's boto3 session instead of a client.
+DETECTORS = {
+    'network': (find_network_waste, ('ec2', 'cloudwatch')),
+    'load_balancers': (find_idle_load_balancers, ('elbv2', 'cloudwatch')),
+    'databases': (find_idle_databases, ('rds', 'cloudwatch')),
+    'images': (find_unused_images, ('ec2', 'autoscaling')),
+    's3_uploads': (find_stale_multipart_uploads, ('session',)),
+    'log_retention': (find_log_groups_without_retention, ('logs',)),
+    'lambda_versions': (find_stale_lambda_versions, ('lambda', 'cloudwatch')),
+    'security_groups': (find_unused_security_groups, ('ec2',)),
+    'dynamodb': (find_overprovisioned_tables, ('dynamodb', 'cloudwatch')),
+}
+# Detectors that cover the whole account whichever region they run from; they run in one region only
+GLOBAL_DETECTORS = {'s3_uploads'}
+
+# Resource type -> function(session, findings) that cleans up approved findings of that type
+REMEDIATIONS = {
+    DB_INSTANCE_TYPE: stop_idle_databases,
+    DB_CLUSTER_TYPE: stop_idle_databases,
+    STALE_UPLOADS_TYPE: abort_stale_uploads,
+    NO_RETENTION_TYPE: set_log_retention,
+}
+
+
+def run_detectors(session, names=None, include_global=True, metrics=None):
+    """Run the enabled detectors against one region's boto3 session and return their findings.
+
+    include_global=False leaves out GLOBAL_DETECTORS, for every region but the first.
+    A detector that fails is logged, counted as a DetectorErrors datapoint on
+    metrics, and skipped, so the other findings are still reported.
+    """
+    names = ENABLED_DETECTORS if names is None else names
+    unknown = [name for name in names if name not in DETECTORS]
+    if unknown:
+        raise ValueError(f"Unknown detectors {unknown}; available: {sorted(DETECTORS)}")
+
+    clients = {'session': session}
+    findings = []
+    for name in names:
+        if name in GLOBAL_DETECTORS and not include_global:
+            continue
+        detector, services = DETECTORS[name]
+        for service in services:
+            if service not in clients:
+                clients[service] = create_client(service, session)
+        started = time.monotonic()
+        try:
+            found = detector(*(clients[service] for service in services))
+        except Exception as e:
+            print(f"Detector {name} ({session.region_name}) failed: {e}")
+            if metrics is not None:
+                metrics.put('DetectorErrors', 1, Detector=name)
+            continue
+        print(f"Detector {name} ({session.region_name}): {len(found)} findings in {time.monotonic() - started:.1f}s")
+        for finding in found:
+            finding.setdefault('region', session.region_name)
+        findings.extend(found)
+    return findings
+
+
+def remediate_findings(session, findings):
+    """Clean up approved detector findings from one account and region; types without a remediation are left alone."""
+    by_remediation = {}
+    for finding in findings:
+        remediation = REMEDIATIONS.get(finding['resource_type'])
+        if remediation:
+            by_remediation.setdefault(remediation, []).append(finding)
+    for remediation, group in by_remediation.items():
+        remediation(session, group)
@@ -0,0 +1,103 @@
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from metric_data import HOURS_PER_MONTH, METRICS_LOOKBACK_DAYS, fetch_metric_values, lookback_window, metric_stat
+from streaming import paginate_items
+from transport import SCAN_CONCURRENCY
+
+# Provisioned tables whose busiest hour used less than this share of their capacity are reported
+DYNAMODB_LOW_UTILIZATION = float(os.getenv('DYNAMODB_LOW_UTILIZATION', '0.2'))
+# Utilization a reduced capacity is sized for at the busiest hour, leaving headroom
+DYNAMODB_TARGET_UTILIZATION = 0.7
+# Prices (us-east-1): provisioned capacity per unit-hour, on-demand per million request units
+RCU_HOURLY_PRICE = 0.00013
+WCU_HOURLY_PRICE = 0.00065
+ON_DEMAND_READ_PRICE = 0.125
+ON_DEMAND_WRITE_PRICE = 0.625
+SECONDS_PER_HOUR = 3600
+
+
+def describe_tables(dynamodb_client, table_names, concurrency=None):
+    """describe_table for every name, with at most concurrency calls in flight."""
+    with ThreadPoolExecutor(max_workers=concurrency or SCAN_CONCURRENCY) as executor:
+        return list(executor.map(lambda name: dynamodb_client.describe_table(TableName=name)['Table'], table_names))
+
+
+def provisioned_cost(read_units, write_units):
+    return (read_units * RCU_HOURLY_PRICE + write_units * WCU_HOURLY_PRICE) * HOURS_PER_MONTH
+
+
+def on_demand_cost(reads_per_second, writes_per_second):
+    seconds_per_month = HOURS_PER_MONTH * SECONDS_PER_HOUR
+    return (reads_per_second * ON_DEMAND_READ_PRICE + writes_per_second * ON_DEMAND_WRITE_PRICE) * seconds_per_month / 1e6
+
+
+def recommend(table, hourly_reads, hourly_writes):
+    """(recommendation text, monthly saving) for a provisioned table, or None when it is busy enough.
+
+    hourly_reads and hourly_writes are the consumed capacity units of each hour in the window.
+    """
+    throughput = table['ProvisionedThroughput']
+    read_units, write_units = throughput['ReadCapacityUnits'], throughput['WriteCapacityUnits']
+    # Per-second rates: the busiest hour sizes capacity, the average prices on-demand
+    hours = METRICS_LOOKBACK_DAYS * 24
+    peak_reads, peak_writes = max(hourly_reads or [0]) / SECONDS_PER_HOUR, max(hourly_writes or [0]) / SECONDS_PER_HOUR
+    mean_reads, mean_writes = sum(hourly_reads) / hours / SECONDS_PER_HOUR, sum(hourly_writes) / hours / SECONDS_PER_HOUR
+    utilization = max(peak_reads / read_units if read_units else 0, peak_writes / write_units if write_units else 0)
+    if utilization >= DYNAMODB_LOW_UTILIZATION:
+        return None
+
+    current = provisioned_cost(read_units, write_units)
+    reduced_reads = max(1, math.ceil(peak_reads / DYNAMODB_TARGET_UTILIZATION))
+    reduced_writes = max(1, math.ceil(peak_writes / DYNAMODB_TARGET_UTILIZATION))
+    options = [
+        (on_demand_cost(mean_reads, mean_writes), "switch to on-demand mode"),
+        (provisioned_cost(reduced_reads, reduced_writes), f"reduce capacity to {reduced_reads} RCU / {reduced_writes} WCU"),
+    ]
+    cost, action = min(options)
+    if cost >= current:
+        return None
+    text = (
+        f"Busiest hour used {utilization:.1%} of {read_units} RCU / {write_units} WCU provisioned; "
+        f"{action} (about ${current:,.2f} -> ${cost:,.2f} a month)."
+    )
+    return text, current - cost
+
+
+def find_overprovisioned_tables(dynamodb_client, cloudwatch_client):
+    """Find provisioned-mode tables that consume almost none of their capacity, and recommend on-demand or less capacity.
+
+    Tables are described over a bounded pool; consumed read and write
+    capacity of every table comes from batched GetMetricData calls.
+    Global secondary indexes are billed and scaled separately and are not counted.
+    """
+    window_start, _ = lookback_window()
+    tables = [
+        table for table in describe_tables(dynamodb_client, list(paginate_items(dynamodb_client, 'ListTables', 'TableNames')))
+        if table.get('BillingModeSummary', {}).get('BillingMode', 'PROVISIONED') == 'PROVISIONED'
+        and table['TableStatus'] == 'ACTIVE' and table['CreationDateTime'] <= window_start
+    ]
+    metrics = {}
+    for table in tables:
+        for metric_name in ('ConsumedReadCapacityUnits', 'ConsumedWriteCapacityUnits'):
+            metrics[(table['TableName'], metric_name)] = metric_stat('AWS/DynamoDB', metric_name, {'TableName': table['TableName']})
+    # Hourly sums, so the busiest hour can size a reduced capacity
+    consumed = fetch_metric_values(cloudwatch_client, metrics, period=SECONDS_PER_HOUR)
+
+    findings = []
+    for table in tables:
+        recommendation = recommend(
+            table,
+            consumed[(table['TableName'], 'ConsumedReadCapacityUnits')],
+            consumed[(table['TableName'], 'ConsumedWriteCapacityUnits')],
+        )
+        if recommendation:
+            reason, saving = recommendation
+            findings.append({
+                'resource_type': 'Overprovisioned DynamoDB Table',
+                # Names repeat across accounts and regions; the ARN does not
+                'resource_id': table['TableArn'],
+                'reason': reason,
+                'monthly_savings': round(saving, 2),
+            })
+    return findings
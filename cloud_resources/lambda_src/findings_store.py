@@ -0,0 +1,203 @@
+import hashlib
+import json
+import os
+import boto3
+
+FINDINGS_BUCKET = os.getenv('FINDINGS_BUCKET')
+FINDINGS_PREFIX = os.getenv('FINDINGS_PREFIX', 'findings/')
+# Index of the most recent run, used for delta reporting
+LATEST_INDEX_NAME = 'index/latest.json'
+FINDINGS_DIR = os.getenv('FINDINGS_DIR', os.path.join('/tmp', 'cloud_cleanup_findings'))
+
+
+class SnapshotNotFound(Exception):
+    """Raised when a findings snapshot ID is not present in the store."""
+
+
+class SnapshotCorrupted(Exception):
+    """Raised when stored snapshot content no longer matches its ID."""
+
+
+# Finding types produced by cleanup_resources; everything else comes from detectors
+EC2_RESOURCE_TYPES = ('Idle Instance', 'Unattached Volume')
+
+
+def build_snapshot(idle_instances, instance_reasons, unattached_volumes, volume_reasons, detector_findings=None):
+    """Build a canonical findings snapshot from the cleanup_resources results and any detector findings."""
+    findings = list(detector_findings or [])
+    for instance in idle_instances:
+        findings.append({
+            'resource_type': 'Idle Instance',
+            'resource_id': instance,
+            'reason': instance_reasons.get(instance, 'Reason not available'),
+        })
+    for volume in unattached_volumes:
+        findings.append({
+            'resource_type': 'Unattached Volume',
+            'resource_id': volume,
+            'reason': volume_reasons.get(volume, 'Reason not available'),
+        })
+    findings.sort(key=lambda finding: (finding['resource_type'], finding['resource_id']))
+    return {'version': 1, 'findings': findings}
+
+
+def unpack_snapshot(snapshot):
+    """Split a snapshot back into the (ids, reasons) pairs used by generate_report."""
+    idle_instances, instance_reasons = [], {}
+    unattached_volumes, volume_reasons = [], {}
+    for finding in snapshot['findings']:
+        if finding['resource_type'] == 'Idle Instance':
+            idle_instances.append(finding['resource_id'])
+            instance_reasons[finding['resource_id']] = finding['reason']
+        elif finding['resource_type'] == 'Unattached Volume':
+            unattached_volumes.append(finding['resource_id'])
+            volume_reasons[finding['resource_id']] = finding['reason']
+    return idle_instances, instance_reasons, unattached_volumes, volume_reasons
+
+
+def detector_findings(snapshot):
+    """The findings of a snapshot that unpack_snapshot leaves out."""
+    return [finding for finding in snapshot['findings'] if finding['resource_type'] not in EC2_RESOURCE_TYPES]
+
+
+def snapshot_savings(snapshot):
+    """Estimated monthly savings by (resource_type, resource_id), for findings that carry one."""
+    return {
+        (finding['resource_type'], finding['resource_id']): finding['monthly_savings']
+        for finding in snapshot['findings'] if finding.get('monthly_savings')
+    }
+
+
+def serialize_snapshot(snapshot):
+    """Serialize a snapshot to canonical JSON bytes so equal findings hash equally."""
+    return json.dumps(snapshot, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def compute_snapshot_id(body):
+    """Content address of a serialized snapshot."""
+    return hashlib.sha256(body).hexdigest()
+
+
+class S3FindingsStore:
+    """Write-once snapshot store backed by an S3 bucket."""
+
+    def __init__(self, bucket, prefix=FINDINGS_PREFIX, s3_client=None):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.s3_client = s3_client or boto3.client('s3')
+
+    def _key(self, snapshot_id):
+        return f"{self.prefix}{snapshot_id}.json"
+
+    def put(self, snapshot_id, body):
+        try:
+            self.s3_client.put_object(
+                Bucket=self.bucket,
+                Key=self._key(snapshot_id),
+                Body=body,
+                ContentType='application/json',
+                IfNoneMatch='*',
+            )
+        except self.s3_client.exceptions.ClientError as e:
+            # The same ID means the same content, so an existing object is already correct.
+            if e.response['Error']['Code'] != 'PreconditionFailed':
+                raise
+
+    def get(self, snapshot_id):
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket, Key=self._key(snapshot_id))
+        except self.s3_client.exceptions.NoSuchKey:
+            raise SnapshotNotFound(snapshot_id)
+        return response['Body'].read()
+
+    def write_object(self, name, body):
+        self.s3_client.put_object(
+            Bucket=self.bucket,
+            Key=f"{self.prefix}{name}",
+            Body=body,
+            ContentType='application/json',
+        )
+
+    def read_object(self, name):
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket, Key=f"{self.prefix}{name}")
+        except self.s3_client.exceptions.NoSuchKey:
+            return None
+        return response['Body'].read()
+
+    def write_index(self, body):
+        self.write_object(LATEST_INDEX_NAME, body)
+
+    def read_index(self):
+        return self.read_object(LATEST_INDEX_NAME)
+
+
+class LocalFindingsStore:
+    """Write-once snapshot store backed by a local directory, for tests and local runs."""
+
+    def __init__(self, directory=FINDINGS_DIR):
+        self.directory = directory
+
+    def _path(self, snapshot_id):
+        return os.path.join(self.directory, f"{snapshot_id}.json")
+
+    def put(self, snapshot_id, body):
+        os.makedirs(self.directory, exist_ok=True)
+        try:
+            with open(self._path(snapshot_id), 'xb') as snapshot_file:
+                snapshot_file.write(body)
+        except FileExistsError:
+            pass
+
+    def get(self, snapshot_id):
+        try:
+            with open(self._path(snapshot_id), 'rb') as snapshot_file:
+                return snapshot_file.read()
+        except FileNotFoundError:
+            raise SnapshotNotFound(snapshot_id)
+
+    def write_object(self, name, body):
+        path = os.path.join(self.directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Replace atomically so a concurrent reader never sees a partial object
+        with open(f"{path}.tmp", 'wb') as object_file:
+            object_file.write(body)
+        os.replace(f"{path}.tmp", path)
+
+    def read_object(self, name):
+        try:
+            with open(os.path.join(self.directory, name), 'rb') as object_file:
+                return object_file.read()
+        except FileNotFoundError:
+            return None
+
+    def write_index(self, body):
+        self.write_object(LATEST_INDEX_NAME, body)
+
+    def read_index(self):
+        return self.read_object(LATEST_INDEX_NAME)
+
+
+def get_findings_store():
+    """Use S3 when FINDINGS_BUCKET is configured, otherwise the local directory store."""
+    if FINDINGS_BUCKET:
+        return S3FindingsStore(FINDINGS_BUCKET)
+    return LocalFindingsStore()
+
+
+def save_snapshot(store, snapshot):
+    """Persist a snapshot and return its content-addressed ID."""
+    body = serialize_snapshot(snapshot)
+    snapshot_id = compute_snapshot_id(body)
+    store.put(snapshot_id, body)
+    return snapshot_id
+
+
+def load_snapshot(store, snapshot_id):
+    """Load a snapshot and check that its content still matches the ID."""
+    if not all(c in '0123456789abcdef' for c in snapshot_id) or len(snapshot_id) != 64:
+        raise SnapshotNotFound(snapshot_id)
+    body = store.get(snapshot_id)
+    if compute_snapshot_id(body) != snapshot_id:
+        raise SnapshotCorrupted(snapshot_id)
+    return json.loads(body)
@@ -0,0 +1,166 @@
+import json
+import os
+import sqlite3
+import time
+import boto3
+
+IDEMPOTENCY_TABLE = os.getenv('IDEMPOTENCY_TABLE')
+IDEMPOTENCY_DB = os.getenv('IDEMPOTENCY_DB', os.path.join('/tmp', 'cloud_cleanup_idempotency.db'))
+# An in-progress lease outlives the longest possible Lambda invocation (15 minutes)
+LEASE_SECONDS = 900
+# Completed results are served to duplicates for a day
+RESULT_TTL_SECONDS = 86400
+
+IN_PROGRESS = 'IN_PROGRESS'
+COMPLETED = 'COMPLETED'
+
+
+def idempotency_key(payload, snapshot_id=None):
+    """Key an approval on its findings snapshot, falling back to the Slack trigger ID or action_ts.
+
+    Slack retries reuse the trigger ID; double-clicks produce new trigger IDs
+    but approve the same snapshot, so the snapshot ID is preferred when present.
+    """
+    if snapshot_id:
+        return f"snapshot:{snapshot_id}"
+    actions = payload.get('actions') or [{}]
+    token = payload.get('trigger_id') or payload.get('action_ts') or actions[0].get('action_ts')
+    if not token:
+        return None
+    return f"trigger:{token}"
+
+
+class DynamoDBIdempotencyStore:
+    """Conditional-write leases in a DynamoDB table keyed on idempotency_key."""
+
+    def __init__(self, table_name, dynamodb_client=None):
+        self.table_name = table_name
+        self.dynamodb_client = dynamodb_client or boto3.client('dynamodb')
+
+    def acquire(self, key, now=None):
+        now = int(now or time.time())
+        try:
+            self.dynamodb_client.put_item(
+                TableName=self.table_name,
+                Item={
+                    'idempotency_key': {'S': key},
+                    'status': {'S': IN_PROGRESS},
+                    'lease_expires_at': {'N': str(now + LEASE_SECONDS)},
+                    'expires_at': {'N': str(now + RESULT_TTL_SECONDS)},
+                },
+                ConditionExpression='attribute_not_exists(idempotency_key) OR expires_at < :now OR (#status = :in_progress AND lease_expires_at < :now)',
+                ExpressionAttributeNames={'#status': 'status'},
+                ExpressionAttributeValues={':in_progress': {'S': IN_PROGRESS}, ':now': {'N': str(now)}},
+            )
+            return True, None
+        except self.dynamodb_client.exceptions.ConditionalCheckFailedException:
+            item = self.dynamodb_client.get_item(
+                TableName=self.table_name,
+                Key={'idempotency_key': {'S': key}},
+                ConsistentRead=True,
+            ).get('Item')
+            if not item:
+                # The holder released the lease between our write and read; let the caller retry.
+                return False, {'status': IN_PROGRESS, 'result': None}
+            result = json.loads(item['result']['S']) if 'result' in item else None
+            return False, {'status': item['status']['S'], 'result': result}
+
+    def complete(self, key, result, now=None):
+        now = int(now or time.time())
+        self.dynamodb_client.update_item(
+            TableName=self.table_name,
+            Key={'idempotency_key': {'S': key}},
+            UpdateExpression='SET #status = :completed, #result = :result, expires_at = :expires_at',
+            ExpressionAttributeNames={'#status': 'status', '#result': 'result'},
+            ExpressionAttributeValues={
+                ':completed': {'S': COMPLETED},
+                ':result': {'S': json.dumps(result)},
+                ':expires_at': {'N': str(now + RESULT_TTL_SECONDS)},
+            },
+        )
+
+    def release(self, key):
+        self.dynamodb_client.delete_item(TableName=self.table_name, Key={'idempotency_key': {'S': key}})
+
+
+class SQLiteIdempotencyStore:
+    """Local stand-in for the DynamoDB store with the same lease semantics."""
+
+    def __init__(self, path=IDEMPOTENCY_DB):
+        self.path = path
+        with self._connect() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS leases ('
+                'idempotency_key TEXT PRIMARY KEY, status TEXT NOT NULL, result TEXT, '
+                'lease_expires_at INTEGER NOT NULL, expires_at INTEGER NOT NULL)'
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def acquire(self, key, now=None):
+        now = int(now or time.time())
+        connection = self._connect()
+        try:
+            # BEGIN IMMEDIATE takes the write lock, making read-then-insert atomic
+            connection.execute('BEGIN IMMEDIATE')
+            row = connection.execute(
+                'SELECT status, result, lease_expires_at, expires_at FROM leases WHERE idempotency_key = ?',
+                (key,),
+            ).fetchone()
+            if row:
+                status, result, lease_expires_at, expires_at = row
+                lease_expired = status == IN_PROGRESS and lease_expires_at < now
+                if not lease_expired and expires_at >= now:
+                    connection.execute('COMMIT')
+                    return False, {'status': status, 'result': json.loads(result) if result else None}
+            connection.execute(
+                'INSERT OR REPLACE INTO leases (idempotency_key, status, result, lease_expires_at, expires_at) '
+                'VALUES (?, ?, NULL, ?, ?)',
+                (key, IN_PROGRESS, now + LEASE_SECONDS, now + RESULT_TTL_SECONDS),
+            )
+            connection.execute('COMMIT')
+            return True, None
+        finally:
+            connection.close()
+
+    def complete(self, key, result, now=None):
+        now = int(now or time.time())
+        with self._connect() as connection:
+            connection.execute(
+                'UPDATE leases SET status = ?, result = ?, expires_at = ? WHERE idempotency_key = ?',
+                (COMPLETED, json.dumps(result), now + RESULT_TTL_SECONDS, key),
+            )
+
+    def release(self, key):
+        with self._connect() as connection:
+            connection.execute('DELETE FROM leases WHERE idempotency_key = ?', (key,))
+
+
+def get_idempotency_store():
+    """Use DynamoDB when IDEMPOTENCY_TABLE is configured, otherwise the local SQLite store."""
+    if IDEMPOTENCY_TABLE:
+        return DynamoDBIdempotencyStore(IDEMPOTENCY_TABLE)
+    return SQLiteIdempotencyStore()
+
+
+def run_once(store, key, handler):
+    """Run handler at most once per key, returning the in-flight or cached response to duplicates."""
+    acquired, record = store.acquire(key)
+    if not acquired:
+        if record['status'] == COMPLETED and record['result'] is not None:
+            return record['result']
+        return {"statusCode": 202, "body": json.dumps({"message": "Cleanup already in progress"})}
+
+    try:
+        result = handler()
+    except Exception:
+        store.release(key)
+        raise
+
+    # Failed runs give up the lease so an explicit retry can try again
+    if result.get("statusCode", 500) >= 500:
+        store.release(key)
+    else:
+        store.complete(key, result)
+    return result
@@ -0,0 +1,86 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from streaming import paginate_items, stream_items
+from transport import SCAN_CONCURRENCY
+
+# Unreferenced images younger than this are kept; they may be about to roll out
+AMI_MIN_AGE_DAYS = int(os.getenv('AMI_MIN_AGE_DAYS', '90'))
+# EBS snapshot storage price per GB-month (us-east-1, standard tier)
+SNAPSHOT_GB_MONTH_PRICE = 0.05
+# Instances in these states still need their image to be launched or started again
+REFERENCING_INSTANCE_STATES = ['pending', 'running', 'stopping', 'stopped']
+
+
+def _launch_template_image_ids(ec2_client, launch_template_id):
+    return {
+        version['LaunchTemplateData'].get('ImageId')
+        for version in paginate_items(ec2_client, 'DescribeLaunchTemplateVersions', 'LaunchTemplateVersions',
+                                      LaunchTemplateId=launch_template_id)
+    }
+
+
+def referenced_image_ids(ec2_client, autoscaling_client, concurrency=None):
+    """Every image ID an instance, launch template version or launch configuration points at.
+
+    Launch template versions are described for all templates concurrently,
+    with at most concurrency calls in flight.
+    """
+    image_ids = {
+        instance['ImageId']
+        for reservation in paginate_items(ec2_client, 'DescribeInstances', 'Reservations',
+                                          Filters=[{'Name': 'instance-state-name', 'Values': REFERENCING_INSTANCE_STATES}])
+        for instance in reservation['Instances']
+    }
+    image_ids.update(
+        configuration['ImageId']
+        for configuration in paginate_items(autoscaling_client, 'DescribeLaunchConfigurations', 'LaunchConfigurations')
+    )
+    template_ids = [
+        template['LaunchTemplateId']
+        for template in paginate_items(ec2_client, 'DescribeLaunchTemplates', 'LaunchTemplates')
+    ]
+    with ThreadPoolExecutor(max_workers=concurrency or SCAN_CONCURRENCY) as executor:
+        for template_image_ids in executor.map(lambda template_id: _launch_template_image_ids(ec2_client, template_id), template_ids):
+            image_ids.update(template_image_ids)
+    # Versions without an image, or resolving one from SSM at launch, contribute nothing
+    image_ids.discard(None)
+    return image_ids
+
+
+def find_unused_images(ec2_client, autoscaling_client):
+    """Find self-owned images older than AMI_MIN_AGE_DAYS that nothing references.
+
+    The references are collected once into a set, then the account's images
+    are streamed and each one is a set lookup; no image gets an API call of its own.
+    """
+    referenced = referenced_image_ids(ec2_client, autoscaling_client)
+    cutoff = datetime.now(timezone.utc) - timedelta(days=AMI_MIN_AGE_DAYS)
+    findings = []
+    for image in stream_items(ec2_client, 'DescribeImages', 'Images', Owners=['self']):
+        if image['ImageId'] in referenced:
+            continue
+        created = datetime.fromisoformat(image['CreationDate'].replace('Z', '+00:00'))
+        if created > cutoff:
+            continue
+        snapshots = [
+            mapping['Ebs'] for mapping in image.get('BlockDeviceMappings', [])
+            if mapping.get('Ebs', {}).get('SnapshotId')
+        ]
+        reason = (
+            f"Image is not used by any instance, launch template or launch configuration "
+            f"and is {(datetime.now(timezone.utc) - created).days} days old."
+        )
+        if snapshots:
+            reason = f"{reason} Backed by {', '.join(snapshot['SnapshotId'] for snapshot in snapshots)}."
+        finding = {
+            'resource_type': 'Unused AMI',
+            'resource_id': image['ImageId'],
+            'reason': reason,
+        }
+        # Snapshots are incremental, so this is an upper bound
+        snapshot_gb = sum(snapshot.get('VolumeSize', 0) for snapshot in snapshots)
+        if snapshot_gb:
+            finding['monthly_savings'] = round(snapshot_gb * SNAPSHOT_GB_MONTH_PRICE, 2)
+        findings.append(finding)
+    return findings
@@ -0,0 +1,372 @@
+import json
+import os
+import sqlite3
+import time
+from collections import deque
+import boto3
+from streaming import describe_by_ids
+
+INVENTORY_TABLE = os.getenv('INVENTORY_TABLE')
+INVENTORY_DB = os.getenv('INVENTORY_DB')
+INVENTORY_QUEUE_URL = os.getenv('INVENTORY_QUEUE_URL')
+# Full describe sweep that corrects missed events and refreshes CPU verdicts. Scans run
+# weekly, so a 30-day default leaves most runs revisiting only what changed.
+RECONCILE_INTERVAL_SECONDS = int(os.getenv('INVENTORY_RECONCILE_INTERVAL_SECONDS', str(30 * 86400)))
+SQS_MAX_MESSAGES = 10
+
+INSTANCE = 'instance'
+VOLUME = 'volume'
+
+# CloudTrail event name -> (resource type, where the IDs live)
+CLOUDTRAIL_EVENTS = {
+    'RunInstances': (INSTANCE, 'responseElements'),
+    'StartInstances': (INSTANCE, 'requestParameters'),
+    'StopInstances': (INSTANCE, 'requestParameters'),
+    'TerminateInstances': (INSTANCE, 'requestParameters'),
+    'MonitorInstances': (INSTANCE, 'requestParameters'),
+    'UnmonitorInstances': (INSTANCE, 'requestParameters'),
+    'CreateVolume': (VOLUME, 'responseElements'),
+    'DeleteVolume': (VOLUME, 'requestParameters'),
+    'AttachVolume': (VOLUME, 'requestParameters'),
+    'DetachVolume': (VOLUME, 'requestParameters'),
+}
+
+
+def changed_resources(event):
+    """Extract the (resource type, resource ID) pairs an EC2 or CloudTrail event touches."""
+    detail = event.get('detail') or {}
+    if event.get('detail-type') == 'EC2 Instance State-change Notification':
+        return [(INSTANCE, detail['instance-id'])] if detail.get('instance-id') else []
+
+    if event.get('detail-type') == 'AWS API Call via CloudTrail':
+        resource_type, section = CLOUDTRAIL_EVENTS.get(detail.get('eventName'), (None, None))
+        elements = detail.get(section) or {}
+        if resource_type == INSTANCE:
+            items = (elements.get('instancesSet') or {}).get('items', [])
+            return [(INSTANCE, item['instanceId']) for item in items if item.get('instanceId')]
+        if resource_type == VOLUME and elements.get('volumeId'):
+            return [(VOLUME, elements['volumeId'])]
+    return []
+
+
+class SQSEventQueue:
+    """EventBridge deliveries of EC2 events through an SQS queue."""
+
+    def __init__(self, queue_url, sqs_client=None):
+        self.queue_url = queue_url
+        self.sqs_client = sqs_client or boto3.client('sqs')
+
+    def receive(self):
+        response = self.sqs_client.receive_message(
+            QueueUrl=self.queue_url,
+            MaxNumberOfMessages=SQS_MAX_MESSAGES,
+            WaitTimeSeconds=0,
+        )
+        return [(message['ReceiptHandle'], json.loads(message['Body'])) for message in response.get('Messages', [])]
+
+    def delete(self, receipts):
+        if receipts:
+            self.sqs_client.delete_message_batch(
+                QueueUrl=self.queue_url,
+                Entries=[{'Id': str(i), 'ReceiptHandle': receipt} for i, receipt in enumerate(receipts)],
+            )
+
+
+class LocalEventQueue:
+    """In-memory stand-in for the SQS queue, for tests and local runs."""
+
+    def __init__(self, events=()):
+        self.messages = deque(events)
+        self.in_flight = {}
+        self.next_receipt = 0
+
+    def send(self, event):
+        self.messages.append(event)
+
+    def receive(self):
+        batch = []
+        while self.messages and len(batch) < SQS_MAX_MESSAGES:
+            receipt = str(self.next_receipt)
+            self.next_receipt += 1
+            self.in_flight[receipt] = self.messages.popleft()
+            batch.append((receipt, self.in_flight[receipt]))
+        return batch
+
+    def delete(self, receipts):
+        for receipt in receipts:
+            self.in_flight.pop(receipt, None)
+
+
+class DynamoDBInventoryTable:
+    """Materialized resource table in DynamoDB.
+
+    Two sparse indexes keep the hot queries proportional to their result:
+    dirty-index holds only resources changed since they were last evaluated,
+    finding-index only resources whose current verdict is a finding.
+    """
+
+    def __init__(self, table_name, dynamodb_client=None):
+        self.table_name = table_name
+        self.dynamodb_client = dynamodb_client or boto3.client('dynamodb')
+
+    def _query_ids(self, index_name, key_name, resource_type, attributes):
+        paginator = self.dynamodb_client.get_paginator('query')
+        for page in paginator.paginate(
+            TableName=self.table_name,
+            IndexName=index_name,
+            KeyConditionExpression=f"{key_name} = :type",
+            ExpressionAttributeValues={':type': {'S': resource_type}},
+            ProjectionExpression=', '.join(f"#{attribute}" for attribute in attributes),
+            ExpressionAttributeNames={f"#{attribute}": attribute for attribute in attributes},
+        ):
+            yield from page['Items']
+
+    def mark_dirty(self, resource_type, resource_id):
+        # Every mark bumps the version, so a verdict based on an older read cannot clear it
+        self.dynamodb_client.update_item(
+            TableName=self.table_name,
+            Key={'resource_id': {'S': resource_id}},
+            UpdateExpression='SET resource_type = :type, dirty_type = :type ADD #version :one',
+            ExpressionAttributeNames={'#version': 'version'},
+            ExpressionAttributeValues={':type': {'S': resource_type}, ':one': {'N': '1'}},
+        )
+
+    def dirty_versions(self, resource_type):
+        return {
+            item['resource_id']['S']: int(item['version']['N']) if 'version' in item else 0
+            for item in self._query_ids('dirty-index', 'dirty_type', resource_type, ['resource_id', 'version'])
+        }
+
+    def all_ids(self, resource_type):
+        ids = []
+        paginator = self.dynamodb_client.get_paginator('scan')
+        for page in paginator.paginate(
+            TableName=self.table_name,
+            FilterExpression='resource_type = :type',
+            ExpressionAttributeValues={':type': {'S': resource_type}},
+            ProjectionExpression='resource_id',
+        ):
+            ids.extend(item['resource_id']['S'] for item in page['Items'])
+        return ids
+
+    def _version_condition(self, version, values):
+        if not version:
+            return 'attribute_not_exists(#version)'
+        values[':version'] = {'N': str(version)}
+        return '#version = :version'
+
+    def upsert(self, resource_type, resource_id, reason, version):
+        values = {':type': {'S': resource_type}}
+        if reason:
+            update = 'SET resource_type = :type, finding_type = :type, #reason = :reason REMOVE dirty_type'
+            values[':reason'] = {'S': reason}
+        else:
+            update = 'SET resource_type = :type REMOVE dirty_type, finding_type, #reason'
+        try:
+            self.dynamodb_client.update_item(
+                TableName=self.table_name,
+                Key={'resource_id': {'S': resource_id}},
+                UpdateExpression=update,
+                ConditionExpression=self._version_condition(version, values),
+                ExpressionAttributeNames={'#reason': 'reason', '#version': 'version'},
+                ExpressionAttributeValues=values,
+            )
+        except self.dynamodb_client.exceptions.ConditionalCheckFailedException:
+            return False
+        return True
+
+    def delete(self, resource_id, version=None):
+        params = {}
+        if version is not None:
+            values = {}
+            params = {
+                'ConditionExpression': self._version_condition(version, values),
+                'ExpressionAttributeNames': {'#version': 'version'},
+            }
+            if values:
+                params['ExpressionAttributeValues'] = values
+        try:
+            self.dynamodb_client.delete_item(TableName=self.table_name, Key={'resource_id': {'S': resource_id}}, **params)
+        except self.dynamodb_client.exceptions.ConditionalCheckFailedException:
+            return False
+        return True
+
+    def findings(self, resource_type):
+        return [
+            (item['resource_id']['S'], item['reason']['S'])
+            for item in self._query_ids('finding-index', 'finding_type', resource_type, ['resource_id', 'reason'])
+        ]
+
+    def get_meta(self, name):
+        item = self.dynamodb_client.get_item(
+            TableName=self.table_name, Key={'resource_id': {'S': f"meta:{name}"}}
+        ).get('Item')
+        return item['meta_value']['S'] if item else None
+
+    def set_meta(self, name, value):
+        self.dynamodb_client.put_item(
+            TableName=self.table_name,
+            Item={'resource_id': {'S': f"meta:{name}"}, 'resource_type': {'S': 'meta'}, 'meta_value': {'S': value}},
+        )
+
+
+class SQLiteInventoryTable:
+    """Local stand-in for the DynamoDB inventory table."""
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path)
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS resources ('
+                'resource_id TEXT PRIMARY KEY, resource_type TEXT NOT NULL, '
+                'dirty INTEGER NOT NULL DEFAULT 0, reason TEXT, version INTEGER NOT NULL DEFAULT 0)'
+            )
+            columns = [row[1] for row in self.connection.execute('PRAGMA table_info(resources)')]
+            if 'version' not in columns:
+                self.connection.execute('ALTER TABLE resources ADD COLUMN version INTEGER NOT NULL DEFAULT 0')
+            self.connection.execute('CREATE INDEX IF NOT EXISTS dirty_index ON resources (resource_type) WHERE dirty = 1')
+            self.connection.execute('CREATE INDEX IF NOT EXISTS finding_index ON resources (resource_type) WHERE reason IS NOT NULL')
+            self.connection.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)')
+
+    def mark_dirty(self, resource_type, resource_id):
+        with self.connection:
+            self.connection.execute(
+                'INSERT INTO resources (resource_id, resource_type, dirty, version) VALUES (?, ?, 1, 1) '
+                'ON CONFLICT (resource_id) DO UPDATE SET dirty = 1, version = version + 1',
+                (resource_id, resource_type),
+            )
+
+    def dirty_versions(self, resource_type):
+        rows = self.connection.execute(
+            'SELECT resource_id, version FROM resources WHERE resource_type = ? AND dirty = 1', (resource_type,)
+        )
+        return dict(rows)
+
+    def all_ids(self, resource_type):
+        rows = self.connection.execute('SELECT resource_id FROM resources WHERE resource_type = ?', (resource_type,))
+        return [row[0] for row in rows]
+
+    def upsert(self, resource_type, resource_id, reason, version):
+        with self.connection:
+            cursor = self.connection.execute(
+                'UPDATE resources SET resource_type = ?, dirty = 0, reason = ? WHERE resource_id = ? AND version = ?',
+                (resource_type, reason, resource_id, version),
+            )
+        return cursor.rowcount == 1
+
+    def delete(self, resource_id, version=None):
+        with self.connection:
+            if version is None:
+                cursor = self.connection.execute('DELETE FROM resources WHERE resource_id = ?', (resource_id,))
+            else:
+                cursor = self.connection.execute(
+                    'DELETE FROM resources WHERE resource_id = ? AND version = ?', (resource_id, version)
+                )
+        return cursor.rowcount == 1
+
+    def findings(self, resource_type):
+        rows = self.connection.execute(
+            'SELECT resource_id, reason FROM resources WHERE resource_type = ? AND reason IS NOT NULL', (resource_type,)
+        )
+        return [(row[0], row[1]) for row in rows]
+
+    def get_meta(self, name):
+        row = self.connection.execute('SELECT value FROM meta WHERE name = ?', (name,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, name, value):
+        with self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)', (name, value))
+
+
+class InventoryService:
+    """Keeps the resource table current from queued events so scans only revisit what changed."""
+
+    def __init__(self, table, queue, ec2_client):
+        self.table = table
+        self.queue = queue
+        self.ec2_client = ec2_client
+
+    def process_events(self):
+        """Drain the queue, marking every resource an event touched as dirty."""
+        processed = 0
+        while True:
+            batch = self.queue.receive()
+            if not batch:
+                return processed
+            for _, event in batch:
+                for resource_type, resource_id in changed_resources(event):
+                    self.table.mark_dirty(resource_type, resource_id)
+            self.queue.delete([receipt for receipt, _ in batch])
+            processed += len(batch)
+
+    def reconcile(self, now=None):
+        """Full sweep: mark every live resource dirty and drop rows for resources that no longer exist."""
+        live = {INSTANCE: set(), VOLUME: set()}
+        for page in self.ec2_client.get_paginator('describe_instances').paginate():
+            for reservation in page['Reservations']:
+                for instance in reservation['Instances']:
+                    live[INSTANCE].add(instance['InstanceId'])
+        for page in self.ec2_client.get_paginator('describe_volumes').paginate():
+            for volume in page['Volumes']:
+                live[VOLUME].add(volume['VolumeId'])
+
+        for resource_type, resource_ids in live.items():
+            for resource_id in set(self.table.all_ids(resource_type)) - resource_ids:
+                self.table.delete(resource_id)
+            for resource_id in resource_ids:
+                self.table.mark_dirty(resource_type, resource_id)
+        self.table.set_meta('last_reconciled_at', str(int(now or time.time())))
+
+    def reconcile_if_due(self, now=None):
+        now = int(now or time.time())
+        last_reconciled_at = self.table.get_meta('last_reconciled_at')
+        if last_reconciled_at is None or now - int(last_reconciled_at) >= RECONCILE_INTERVAL_SECONDS:
+            self.reconcile(now)
+            return True
+        return False
+
+    def _describe_by_id(self, resource_type, resource_ids):
+        """Batched describe of just the given IDs; IDs that no longer exist are simply absent."""
+        if resource_type == INSTANCE:
+            return {
+                instance['InstanceId']: instance
+                for reservation in describe_by_ids(self.ec2_client, 'DescribeInstances', 'Reservations', 'instance-id', resource_ids)
+                for instance in reservation['Instances']
+            }
+        return {
+            volume['VolumeId']: volume
+            for volume in describe_by_ids(self.ec2_client, 'DescribeVolumes', 'Volumes', 'volume-id', resource_ids)
+        }
+
+    def refresh(self, resource_type, evaluate):
+        """Re-evaluate dirty resources with evaluate(resource) -> reason or None, then return all findings."""
+        self.process_events()
+        self.reconcile_if_due()
+
+        # Verdicts are written only if no event marked the resource dirty again since
+        # this read; a newer mark keeps the resource dirty for the next run
+        dirty = self.table.dirty_versions(resource_type)
+        described = self._describe_by_id(resource_type, list(dirty))
+        for resource_id, version in dirty.items():
+            resource = described.get(resource_id)
+            terminated = resource_type == INSTANCE and resource and resource['State']['Name'] == 'terminated'
+            if resource is None or terminated:
+                self.table.delete(resource_id, version)
+            else:
+                self.table.upsert(resource_type, resource_id, evaluate(resource), version)
+
+        findings = sorted(self.table.findings(resource_type))
+        return [resource_id for resource_id, _ in findings], dict(findings)
+
+
+def get_inventory(ec2_client):
+    """Inventory service when a table is configured, otherwise None (full describe sweeps)."""
+    if INVENTORY_TABLE:
+        table = DynamoDBInventoryTable(INVENTORY_TABLE)
+    elif INVENTORY_DB:
+        table = SQLiteInventoryTable(INVENTORY_DB)
+    else:
+        return None
+    queue = SQSEventQueue(INVENTORY_QUEUE_URL) if INVENTORY_QUEUE_URL else LocalEventQueue()
+    return InventoryService(table, queue, ec2_client)
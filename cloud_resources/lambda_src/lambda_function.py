@@ -1,87 +1,83 @@
+import base64
+import binascii
+import importlib.util
 import json
-import os
 import logging
-import urllib.parse
-import boto3
-import asyncio
-from cloud_cleanup import cleanup_resources, generate_report, send_slack_notification
+import os
+
+# Only light modules are imported here: unsigned requests are rejected before
+# boto3 and the cleanup modules are loaded (see slack_actions).
+SLACK_SIGNING_SECRET = os.getenv('SLACK_SIGNING_SECRET')
+# Slack interaction payloads are far smaller; anything larger is not from Slack
+MAX_BODY_BYTES = int(os.getenv('MAX_BODY_BYTES', str(64 * 1024)))
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-def lambda_handler(event, context):
-    try:
-        ec2_client = boto3.client('ec2')
-        cloudwatch_client = boto3.client('cloudwatch')
-        dry_run = os.getenv('DRY_RUN', 'True').lower() == 'true'
-
-        logger.info(f"Received event: {json.dumps(event)}")
-
-        # Extract and parse Slack request payload
-        body = event.get("body", "")
-        if not body:
-            return {"statusCode": 400, "body": json.dumps({"error": "Missing request body"})}
-
-        parsed_body = urllib.parse.parse_qs(body)
-        payload = json.loads(parsed_body.get("payload", ["{}"])[0])
-
-        # Handle Slack URL verification
-        if payload.get("type") == "url_verification":
-            return {"statusCode": 200, "body": payload["challenge"]}
-
-        # Handle Slack interactive message actions
-        if payload.get("type") == "interactive_message":
-            actions = payload.get("actions", [])
-            if not actions:
-                return {"statusCode": 400, "body": json.dumps({"error": "No action received"})}
-
-            action = actions[0].get("value")
-
-            if action == "approve":
-                return execute_cleanup(ec2_client, cloudwatch_client, dry_run, context)
-            elif action == "decline":
-                return {"statusCode": 200, "body": json.dumps({"text": "Cleanup declined. No action taken."})}
-
-        return {"statusCode": 400, "body": json.dumps({"error": "Invalid request format"})}
-
-    except Exception as e:
-        logger.error(f"Error processing event: {e}", exc_info=True)
-        return {
-            "statusCode": 500,
-            "body": json.dumps({
-                "error": "Internal Server Error",
-                "message": str(e),
-                "request_id": context.aws_request_id
-            })
-        }
-
-def execute_cleanup(ec2_client, cloudwatch_client, dry_run, context):
+
+def _load_signature_verifier():
+    """Load slack_sdk.signature without running slack_sdk/__init__, which imports the whole Web API client."""
+    package = importlib.util.find_spec('slack_sdk')
+    path = os.path.join(package.submodule_search_locations[0], 'signature', '__init__.py')
+    spec = importlib.util.spec_from_file_location('slack_sdk.signature', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.SignatureVerifier
+
+
+SignatureVerifier = _load_signature_verifier()
+verifier = SignatureVerifier(SLACK_SIGNING_SECRET) if SLACK_SIGNING_SECRET else None
+
+# SnapStart and provisioned concurrency pay for initialization ahead of the first
+# request, so there the heavy modules are loaded and warmed up front
+if os.getenv('AWS_LAMBDA_INITIALIZATION_TYPE') in ('snap-start', 'provisioned-concurrency') or \
+        os.getenv('PRIME_ON_INIT', 'False').lower() == 'true':
+    from priming import install_priming_hooks
+    install_priming_hooks()
+
+
+def reject(status_code, error):
+    return {"statusCode": status_code, "body": json.dumps({"error": error})}
+
+
+def verify_slack_request(event):
+    """Return (body, None) for a correctly signed request, or (None, response) to reject it with."""
+    body = event.get("body") or ""
+    encoded = event.get("isBase64Encoded", False)
+    # Checked before decoding; base64 adds a third
+    if len(body) > (MAX_BODY_BYTES * 4 // 3 + 4 if encoded else MAX_BODY_BYTES):
+        return None, reject(413, "Request body too large")
+    if encoded:
+        try:
+            body = base64.b64decode(body, validate=True).decode('utf-8')
+        except (binascii.Error, UnicodeDecodeError):
+            return None, reject(400, "Malformed request body")
+    if len(body.encode('utf-8')) > MAX_BODY_BYTES:
+        return None, reject(413, "Request body too large")
+
     try:
-        logger.info("Starting cleanup process")
-
-        idle_instances, instance_reasons, unattached_volumes, volume_reasons = cleanup_resources(ec2_client, cloudwatch_client, dry_run)
-        report_filename = generate_report(idle_instances, instance_reasons, unattached_volumes, volume_reasons)
-
-        # Send Slack notification asynchronously
-        asyncio.run(send_slack_notification())
-
-        logger.info("Cleanup process completed")
-        return {
-            "statusCode": 200,
-            "body": json.dumps({
-                "message": "Cleanup executed successfully",
-                "report": report_filename,
-                "request_id": context.aws_request_id
-            })
-        }
-    except Exception as e:
-        logger.error(f"Error during cleanup: {e}", exc_info=True)
-        return {
-            "statusCode": 500,
-            "body": json.dumps({
-                "error": "Failed to execute cleanup",
-                "message": str(e),
-                "request_id": context.aws_request_id
-            })
-        }
+        valid = verifier.is_valid_request(body, event.get("headers") or {})
+    except ValueError:
+        # Non-numeric X-Slack-Request-Timestamp
+        valid = False
+    if not valid:
+        return None, reject(401, "Invalid request signature")
+    return body, None
+
+
+def lambda_handler(event, context):
+    # Direct invocations from the sharded-scan coordinator carry no HTTP body
+    if event.get("action") == "scan_shard":
+        from slack_actions import handle_scan_shard
+        return handle_scan_shard(event)
+
+    if verifier is None:
+        logger.error("SLACK_SIGNING_SECRET is not set; rejecting all Slack requests")
+        return reject(500, "Signing secret not configured")
+    body, rejection = verify_slack_request(event)
+    if rejection:
+        return rejection
+
+    from slack_actions import handle_slack_request
+    return handle_slack_request({**event, "body": body, "isBase64Encoded": False}, context)
@@ -0,0 +1,78 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from metric_data import fetch_metric_values, lookback_window, metric_stat
+from streaming import paginate_items
+from transport import SCAN_CONCURRENCY
+
+# Most recent published versions kept per function even without an alias, for rollbacks
+LAMBDA_KEEP_RECENT_VERSIONS = int(os.getenv('LAMBDA_KEEP_RECENT_VERSIONS', '1'))
+# Versions listed by name in a finding before the rest are only counted
+MAX_LISTED_VERSIONS = 10
+
+
+def alias_versions(aliases):
+    """Versions an alias points to, including the extra versions of weighted aliases."""
+    versions = set()
+    for alias in aliases:
+        versions.add(alias['FunctionVersion'])
+        versions.update(alias.get('RoutingConfig', {}).get('AdditionalVersionWeights', {}))
+    return versions
+
+
+def stale_versions(lambda_client, function_name):
+    """Published versions of a function that no alias points to, oldest first, minus the most recent ones kept."""
+    versions = [
+        version for version in paginate_items(lambda_client, 'ListVersionsByFunction', 'Versions', FunctionName=function_name)
+        if version['Version'] != '$LATEST'
+    ]
+    referenced = alias_versions(paginate_items(lambda_client, 'ListAliases', 'Aliases', FunctionName=function_name))
+    versions.sort(key=lambda version: int(version['Version']))
+    if LAMBDA_KEEP_RECENT_VERSIONS:
+        versions = versions[:-LAMBDA_KEEP_RECENT_VERSIONS]
+    return [version for version in versions if version['Version'] not in referenced]
+
+
+def find_stale_lambda_versions(lambda_client, cloudwatch_client, concurrency=None):
+    """Find published Lambda versions no alias points to, and functions not invoked over the lookback window.
+
+    Versions and aliases are listed per function over a pool of at most
+    concurrency threads; invocations of every function come from one batched
+    GetMetricData sweep.
+    """
+    functions = list(paginate_items(lambda_client, 'ListFunctions', 'Functions'))
+    with ThreadPoolExecutor(max_workers=concurrency or SCAN_CONCURRENCY) as executor:
+        unreferenced = dict(zip(
+            (function['FunctionName'] for function in functions),
+            executor.map(lambda function: stale_versions(lambda_client, function['FunctionName']), functions),
+        ))
+    invocations = fetch_metric_values(cloudwatch_client, {
+        function['FunctionName']: metric_stat('AWS/Lambda', 'Invocations', {'FunctionName': function['FunctionName']})
+        for function in functions
+    })
+
+    window_start, _ = lookback_window()
+    findings = []
+    for function in functions:
+        name = function['FunctionName']
+        versions = unreferenced[name]
+        if versions:
+            listed = ', '.join(version['Version'] for version in versions[:MAX_LISTED_VERSIONS])
+            more = f" and {len(versions) - MAX_LISTED_VERSIONS} more" if len(versions) > MAX_LISTED_VERSIONS else ""
+            code_mib = sum(version.get('CodeSize', 0) for version in versions) / 1024 ** 2
+            findings.append({
+                'resource_type': 'Stale Lambda Versions',
+                # Names repeat across accounts and regions; the unqualified ARN does not
+                'resource_id': function['FunctionArn'],
+                'reason': f"{len(versions)} published versions ({listed}{more}) are not used by any alias; "
+                          f"they hold {code_mib:,.1f} MiB of the code storage quota.",
+            })
+        # LastModified looks like 2024-01-01T12:00:00.000+0000
+        modified = datetime.strptime(function['LastModified'], '%Y-%m-%dT%H:%M:%S.%f%z')
+        if modified <= window_start and not sum(invocations[name]):
+            findings.append({
+                'resource_type': 'Unused Lambda Function',
+                'resource_id': function['FunctionArn'],
+                'reason': "Function was not invoked over the lookback window.",
+            })
+    return findings
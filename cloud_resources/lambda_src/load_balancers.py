@@ -0,0 +1,80 @@
+from concurrent.futures import ThreadPoolExecutor
+from metric_data import HOURS_PER_MONTH, fetch_metric_values, lookback_window, metric_stat
+from streaming import paginate_items
+from transport import SCAN_CONCURRENCY
+
+# On-demand hourly price (us-east-1) of an ALB or NLB before capacity units
+LOAD_BALANCER_HOURLY_PRICE = 0.0225
+# Traffic metrics per load balancer type; gateway load balancers are not checked
+TRAFFIC_METRICS = {
+    'application': ('AWS/ApplicationELB', ('RequestCount', 'ProcessedBytes')),
+    'network': ('AWS/NetworkELB', ('ProcessedBytes',)),
+}
+
+
+def _metric_dimension(load_balancer):
+    # CloudWatch identifies a load balancer by the end of its ARN, e.g. app/my-alb/50dc6c495c0c9188
+    return load_balancer['LoadBalancerArn'].split(':loadbalancer/', 1)[1]
+
+
+def healthy_target_counts(elbv2_client, target_groups, concurrency=None):
+    """Healthy target count by target group ARN, with at most concurrency describe_target_health calls in flight."""
+    def count(target_group_arn):
+        descriptions = elbv2_client.describe_target_health(TargetGroupArn=target_group_arn)['TargetHealthDescriptions']
+        return target_group_arn, sum(1 for target in descriptions if target['TargetHealth']['State'] == 'healthy')
+
+    arns = [target_group['TargetGroupArn'] for target_group in target_groups]
+    with ThreadPoolExecutor(max_workers=concurrency or SCAN_CONCURRENCY) as executor:
+        return dict(executor.map(count, arns))
+
+
+def find_idle_load_balancers(elbv2_client, cloudwatch_client):
+    """Find ALBs and NLBs with no healthy targets or no traffic over the lookback window."""
+    load_balancers = [
+        load_balancer for load_balancer in paginate_items(elbv2_client, 'DescribeLoadBalancers', 'LoadBalancers')
+        if load_balancer['Type'] in TRAFFIC_METRICS and load_balancer['State']['Code'] == 'active'
+    ]
+    if not load_balancers:
+        return []
+    target_groups = list(paginate_items(elbv2_client, 'DescribeTargetGroups', 'TargetGroups'))
+    target_groups_by_load_balancer = {}
+    for target_group in target_groups:
+        for load_balancer_arn in target_group.get('LoadBalancerArns', []):
+            target_groups_by_load_balancer.setdefault(load_balancer_arn, []).append(target_group['TargetGroupArn'])
+    # Target groups no load balancer uses cannot make one idle
+    healthy = healthy_target_counts(elbv2_client, [
+        target_group for target_group in target_groups if target_group.get('LoadBalancerArns')
+    ])
+
+    metrics = {}
+    for load_balancer in load_balancers:
+        namespace, metric_names = TRAFFIC_METRICS[load_balancer['Type']]
+        for metric_name in metric_names:
+            metrics[(load_balancer['LoadBalancerArn'], metric_name)] = metric_stat(
+                namespace, metric_name, {'LoadBalancer': _metric_dimension(load_balancer)}
+            )
+    traffic = fetch_metric_values(cloudwatch_client, metrics)
+
+    window_start, _ = lookback_window()
+    findings = []
+    for load_balancer in load_balancers:
+        arn = load_balancer['LoadBalancerArn']
+        group_arns = target_groups_by_load_balancer.get(arn, [])
+        healthy_targets = sum(healthy[group_arn] for group_arn in group_arns)
+        if not group_arns:
+            reason = "Load balancer has no target groups."
+        elif not healthy_targets:
+            reason = f"None of the targets in its {len(group_arns)} target group(s) are healthy."
+        elif load_balancer['CreatedTime'] <= window_start and not any(
+                sum(traffic[(arn, metric_name)]) for metric_name in TRAFFIC_METRICS[load_balancer['Type']][1]):
+            reason = "Load balancer served no traffic over the lookback window."
+        else:
+            continue
+        findings.append({
+            'resource_type': 'Idle Load Balancer',
+            # Names repeat across accounts and regions; the ARN does not
+            'resource_id': arn,
+            'reason': reason,
+            'monthly_savings': round(LOAD_BALANCER_HOURLY_PRICE * HOURS_PER_MONTH, 2),
+        })
+    return findings
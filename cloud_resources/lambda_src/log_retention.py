@@ -0,0 +1,123 @@
+import heapq
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from botocore.config import Config
+from streaming import paginate_items
+from transport import create_client
+
+# Log groups without retention reported per region, largest first
+LOG_TOP_K = int(os.getenv('LOG_TOP_K', '100'))
+# Retention set on approved log groups; must be one of the values CloudWatch Logs accepts
+LOG_RETENTION_DAYS = int(os.getenv('LOG_RETENTION_DAYS', '30'))
+# PutRetentionPolicy is throttled per account and region; stay under it
+LOGS_PUT_RETENTION_PER_SECOND = float(os.getenv('LOGS_PUT_RETENTION_PER_SECOND', '5'))
+LOGS_REMEDIATION_CONCURRENCY = int(os.getenv('LOGS_REMEDIATION_CONCURRENCY', '5'))
+LOGS_REMEDIATION_CONFIG = Config(retries={'mode': 'adaptive', 'max_attempts': 10})
+# Log storage price per GB-month (us-east-1)
+LOG_GB_MONTH_PRICE = 0.03
+NO_RETENTION_TYPE = 'Log Group Without Retention'
+
+
+def _groups_without_retention(logs_client):
+    for group in paginate_items(logs_client, 'DescribeLogGroups', 'logGroups'):
+        if not group.get('retentionInDays'):
+            yield group
+
+
+def log_group_name(arn):
+    """Log group name from its ARN, e.g. arn:aws:logs:us-east-1:123456789012:log-group:/aws/lambda/my-function."""
+    return arn.split(':log-group:', 1)[-1]
+
+
+def largest_groups(groups, k):
+    """The k largest groups by storedBytes, largest first, holding at most k groups in memory at a time.
+
+    Also returns how many groups there were and their total size.
+    """
+    heap = []
+    count = total_bytes = 0
+    for group in groups:
+        stored_bytes = group.get('storedBytes', 0)
+        count += 1
+        total_bytes += stored_bytes
+        # Ties are broken by name so groups never get compared as dicts
+        entry = (stored_bytes, group['logGroupName'], group)
+        if len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif entry[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, entry)
+    return [group for _, _, group in sorted(heap, key=lambda entry: entry[:2], reverse=True)], count, total_bytes
+
+
+def find_log_groups_without_retention(logs_client):
+    """Find the LOG_TOP_K largest log groups that keep their events forever.
+
+    describe_log_groups is consumed page by page into a bounded heap, so
+    memory stays flat with 100k log groups.
+    """
+    top, count, total_bytes = largest_groups(_groups_without_retention(logs_client), LOG_TOP_K)
+    print(f"{count} log groups without retention store {total_bytes / 1024 ** 3:,.2f} GiB; reporting the largest {len(top)}")
+    findings = []
+    for group in top:
+        stored_gb = group.get('storedBytes', 0) / 1024 ** 3
+        finding = {
+            'resource_type': NO_RETENTION_TYPE,
+            # Names repeat across accounts and regions; the ARN does not
+            'resource_id': group['logGroupArn'],
+            'reason': f"No retention policy; stores {stored_gb:,.2f} GiB that never expires.",
+        }
+        # Upper bound: what the group costs to store today
+        if stored_gb:
+            finding['monthly_savings'] = round(stored_gb * LOG_GB_MONTH_PRICE, 2)
+        findings.append(finding)
+    return findings
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across threads."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        time.sleep(start - now)
+
+
+def retention_unset(logs_client, name):
+    """Whether the log group still exists and has no retention, from a single describe_log_groups call.
+
+    A group sorts before every other group its name is a prefix of, so the
+    first result of a prefix lookup is the group itself when it exists.
+    """
+    groups = logs_client.describe_log_groups(logGroupNamePrefix=name, limit=1)['logGroups']
+    return bool(groups) and groups[0]['logGroupName'] == name and not groups[0].get('retentionInDays')
+
+
+def set_log_retention(session, findings):
+    """Set LOG_RETENTION_DAYS on approved log groups that still have no retention; returns how many were updated.
+
+    Each approved group is checked by name, so the cost follows the number
+    of findings (at most LOG_TOP_K per region) rather than the number of groups.
+    """
+    logs_client = create_client('logs', session, config=LOGS_REMEDIATION_CONFIG)
+    limiter = RateLimiter(LOGS_PUT_RETENTION_PER_SECOND)
+
+    def put(name):
+        if not retention_unset(logs_client, name):
+            return False
+        limiter.wait()
+        logs_client.put_retention_policy(logGroupName=name, retentionInDays=LOG_RETENTION_DAYS)
+        return True
+
+    with ThreadPoolExecutor(max_workers=LOGS_REMEDIATION_CONCURRENCY) as executor:
+        updated = sum(executor.map(put, [log_group_name(finding['resource_id']) for finding in findings]))
+    print(f"Set {LOG_RETENTION_DAYS}-day retention on {updated} log groups")
+    return updated
@@ -0,0 +1,53 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+# Days of metrics the detectors look back over
+METRICS_LOOKBACK_DAYS = int(os.getenv('METRICS_LOOKBACK_DAYS', '7'))
+# GetMetricData accepts at most 500 queries per request
+MAX_QUERIES_PER_CALL = 500
+# Hours in an average month, for turning hourly prices into monthly savings
+HOURS_PER_MONTH = 730
+
+
+def metric_stat(namespace, metric_name, dimensions, stat='Sum'):
+    """One metric for fetch_metric_values; dimensions maps names to values."""
+    return {
+        'Metric': {
+            'Namespace': namespace,
+            'MetricName': metric_name,
+            'Dimensions': [{'Name': name, 'Value': value} for name, value in dimensions.items()],
+        },
+        'Stat': stat,
+    }
+
+
+def lookback_window(days=None, end=None):
+    """(start, end) of the metrics window, ending now unless end is given."""
+    end = end or datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    return end - timedelta(days=days or METRICS_LOOKBACK_DAYS), end
+
+
+def fetch_metric_values(cloudwatch_client, metrics, days=None, period=None, end=None):
+    """Datapoint values of many metrics in as few GetMetricData calls as possible.
+
+    metrics maps any key to a metric_stat(); the result maps the same keys to
+    lists of values, empty for metrics without data. period defaults to the
+    whole window, so each metric comes back as a single value.
+    """
+    days = days or METRICS_LOOKBACK_DAYS
+    start, end = lookback_window(days, end)
+    period = period or days * 86400
+    keys = list(metrics)
+    values = {key: [] for key in keys}
+    paginator = cloudwatch_client.get_paginator('get_metric_data')
+    for offset in range(0, len(keys), MAX_QUERIES_PER_CALL):
+        batch = keys[offset:offset + MAX_QUERIES_PER_CALL]
+        # Query IDs must start with a lowercase letter; the index maps results back to keys
+        queries = [
+            {'Id': f"m{index}", 'MetricStat': {**metrics[key], 'Period': period}, 'ReturnData': True}
+            for index, key in enumerate(batch)
+        ]
+        for page in paginator.paginate(MetricDataQueries=queries, StartTime=start, EndTime=end):
+            for result in page['MetricDataResults']:
+                values[batch[int(result['Id'][1:])]].extend(result['Values'])
+    return values
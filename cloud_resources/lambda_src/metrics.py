@@ -0,0 +1,151 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import quote
+from botocore.config import Config
+from findings_store import snapshot_savings
+from transport import create_client
+
+# Publish per-run KPIs to CloudWatch
+PUBLISH_METRICS = os.getenv('PUBLISH_METRICS', 'True').lower() == 'true'
+METRICS_NAMESPACE = os.getenv('METRICS_NAMESPACE', 'CloudCleanup')
+# PutMetricData limits: 1000 metrics and 1 MB per request
+MAX_METRICS_PER_CALL = 1000
+MAX_PAYLOAD_BYTES = 1024 * 1024
+# Bodies at least this large are gzip-compressed by botocore (its default is 10 KB)
+METRICS_COMPRESSION_MIN_BYTES = 1024
+# Longest a handler waits for the background flush before returning
+METRICS_FLUSH_TIMEOUT_SECONDS = 10
+
+
+def _query_size(prefix, value):
+    """Approximate size of a value once encoded by the query serializer under prefix."""
+    if isinstance(value, dict):
+        return sum(_query_size(f"{prefix}.{key}", item) for key, item in value.items())
+    if isinstance(value, list):
+        return sum(_query_size(f"{prefix}.member.{i}", item) for i, item in enumerate(value, 1))
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    return len(prefix) + len(quote(str(value), safe='')) + 2
+
+
+def pack_metric_data(metric_data):
+    """Split datums into PutMetricData batches within the per-request metric and size limits."""
+    batches, batch, batch_bytes = [], [], 0
+    for datum in metric_data:
+        # Measured at the largest index a batch can reach
+        datum_bytes = _query_size(f"MetricData.member.{MAX_METRICS_PER_CALL}", datum)
+        if batch and (len(batch) == MAX_METRICS_PER_CALL or batch_bytes + datum_bytes > MAX_PAYLOAD_BYTES):
+            batches.append(batch)
+            batch, batch_bytes = [], 0
+        batch.append(datum)
+        batch_bytes += datum_bytes
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class MetricsPublisher:
+    """Buffers datapoints and publishes them as statistic sets in as few PutMetricData calls as possible."""
+
+    def __init__(self, cloudwatch_client=None, namespace=None, dimensions=None):
+        self._cloudwatch_client = cloudwatch_client
+        self.namespace = namespace or METRICS_NAMESPACE
+        self.dimensions = dict(dimensions or {})
+        self._lock = threading.Lock()
+        # (metric name, dimensions, unit) -> [sample count, sum, min, max]
+        self._buffer = {}
+        # (client, handler) pairs registered by count_api_calls
+        self._counted_clients = []
+
+    @property
+    def cloudwatch_client(self):
+        if self._cloudwatch_client is None:
+            self._cloudwatch_client = create_client(
+                'cloudwatch',
+                config=Config(request_min_compression_size_bytes=METRICS_COMPRESSION_MIN_BYTES),
+            )
+        return self._cloudwatch_client
+
+    def put(self, name, value, unit='Count', **dimensions):
+        """Buffer one datapoint; repeated points of the same metric are folded into one statistic set."""
+        merged = {**self.dimensions, **dimensions}
+        key = (name, tuple(sorted(merged.items())), unit)
+        with self._lock:
+            stats = self._buffer.get(key)
+            if stats is None:
+                self._buffer[key] = [1, value, value, value]
+            else:
+                stats[0] += 1
+                stats[1] += value
+                stats[2] = min(stats[2], value)
+                stats[3] = max(stats[3], value)
+
+    def count_api_calls(self, client):
+        """Count every API call the client makes as an APICalls datapoint for its service."""
+        service = client.meta.service_model.service_name
+
+        def record(**kwargs):
+            self.put('APICalls', 1, Service=service)
+
+        client.meta.events.register('after-call', record)
+        self._counted_clients.append((client, record))
+        return client
+
+    def stop_counting(self):
+        """Detach from the counted clients, which may outlive this publisher."""
+        for client, record in self._counted_clients:
+            client.meta.events.unregister('after-call', record)
+        self._counted_clients = []
+
+    def _drain(self):
+        with self._lock:
+            buffered, self._buffer = self._buffer, {}
+        timestamp = datetime.now(timezone.utc)
+        metric_data = []
+        for (name, dimensions, unit), (count, total, minimum, maximum) in buffered.items():
+            metric_data.append({
+                'MetricName': name,
+                'Dimensions': [{'Name': key, 'Value': str(value)} for key, value in dimensions],
+                'Timestamp': timestamp,
+                'StatisticValues': {'SampleCount': count, 'Sum': total, 'Minimum': minimum, 'Maximum': maximum},
+                'Unit': unit,
+            })
+        return metric_data
+
+    def flush(self):
+        """Publish everything buffered so far and stop counting API calls; returns the number of PutMetricData calls made."""
+        self.stop_counting()
+        if not PUBLISH_METRICS:
+            self._drain()
+            return 0
+        batches = pack_metric_data(self._drain())
+        for batch in batches:
+            self.cloudwatch_client.put_metric_data(Namespace=self.namespace, MetricData=batch)
+        return len(batches)
+
+    def flush_async(self):
+        """Start flushing on a background thread; join the returned thread before the process exits."""
+        def run():
+            try:
+                calls = self.flush()
+                print(f"Published metrics to {self.namespace} in {calls} call(s)")
+            except Exception as e:
+                print(f"Failed to publish metrics: {e}")
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+
+def record_run_metrics(metrics, started, idle_instances, unattached_volumes, detector_findings=()):
+    """Buffer the standard KPIs of a scan or cleanup run."""
+    metrics.put('IdleInstances', len(idle_instances))
+    metrics.put('UnattachedVolumes', len(unattached_volumes))
+    metrics.put('DetectorFindings', len(detector_findings))
+    metrics.put('Findings', len(idle_instances) + len(unattached_volumes) + len(detector_findings))
+    metrics.put('RunDuration', time.monotonic() - started, unit='Seconds')
+    # Dollars a month, from the findings that carry a savings estimate
+    savings = snapshot_savings({'findings': list(detector_findings)})
+    metrics.put('EstimatedMonthlySavings', round(sum(savings.values()), 2), unit='None')
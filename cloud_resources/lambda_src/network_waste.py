@@ -0,0 +1,93 @@
+import os
+from metric_data import HOURS_PER_MONTH, fetch_metric_values, lookback_window, metric_stat
+from streaming import paginate_items
+
+# NAT gateways that sent fewer bytes than this over the lookback window count as idle
+NAT_IDLE_BYTES = int(os.getenv('NAT_IDLE_BYTES', str(1024 ** 3)))
+# On-demand prices (us-east-1) used for savings estimates
+ELASTIC_IP_HOURLY_PRICE = 0.005
+NAT_GATEWAY_HOURLY_PRICE = 0.045
+# Interfaces of these types are managed by the owning service and cleaned up with it
+MANAGED_INTERFACE_TYPES = {'nat_gateway', 'lambda', 'network_load_balancer', 'gateway_load_balancer', 'vpc_endpoint'}
+
+
+def _address_label(address):
+    return address.get('PublicIp') or address.get('AllocationId')
+
+
+def find_network_waste(ec2_client, cloudwatch_client):
+    """Find unassociated Elastic IPs, idle NAT gateways and detached network interfaces in one region.
+
+    Each API is called once (plus pagination); addresses, gateways and
+    interfaces are joined through in-memory indexes, and the traffic of every
+    NAT gateway comes from one batched GetMetricData sweep.
+    """
+    addresses = ec2_client.describe_addresses()['Addresses']
+    nat_gateways = list(paginate_items(ec2_client, 'DescribeNatGateways', 'NatGateways',
+                                  Filters=[{'Name': 'state', 'Values': ['available']}]))
+    interfaces = {
+        interface['NetworkInterfaceId']: interface
+        for interface in paginate_items(ec2_client, 'DescribeNetworkInterfaces', 'NetworkInterfaces')
+    }
+    addresses_by_interface = {}
+    for address in addresses:
+        if address.get('NetworkInterfaceId'):
+            addresses_by_interface.setdefault(address['NetworkInterfaceId'], []).append(address)
+
+    findings = []
+    address_savings = round(ELASTIC_IP_HOURLY_PRICE * HOURS_PER_MONTH, 2)
+    for address in addresses:
+        interface = interfaces.get(address.get('NetworkInterfaceId'))
+        if not address.get('AssociationId'):
+            reason = "Elastic IP is not associated with any instance or network interface."
+        elif interface is not None and interface['Status'] == 'available':
+            reason = f"Elastic IP is associated with detached network interface {interface['NetworkInterfaceId']}."
+        else:
+            continue
+        findings.append({
+            'resource_type': 'Unassociated Elastic IP',
+            'resource_id': address.get('AllocationId') or address['PublicIp'],
+            'reason': reason,
+            'monthly_savings': address_savings,
+        })
+
+    window_start, _ = lookback_window()
+    traffic = fetch_metric_values(cloudwatch_client, {
+        gateway['NatGatewayId']: metric_stat('AWS/NATGateway', 'BytesOutToDestination', {'NatGatewayId': gateway['NatGatewayId']})
+        for gateway in nat_gateways
+    })
+    for gateway in nat_gateways:
+        # Too young to judge on a full window of traffic
+        if gateway['CreateTime'] > window_start:
+            continue
+        sent = sum(traffic[gateway['NatGatewayId']])
+        if sent >= NAT_IDLE_BYTES:
+            continue
+        reason = f"NAT gateway sent {sent / 1024 ** 2:,.1f} MiB to destinations over the lookback window."
+        public_ips = [
+            _address_label(address)
+            for gateway_address in gateway.get('NatGatewayAddresses', [])
+            for address in addresses_by_interface.get(gateway_address.get('NetworkInterfaceId'), [])
+        ]
+        if public_ips:
+            reason = f"{reason} Release its Elastic IPs ({', '.join(public_ips)}) along with it."
+        findings.append({
+            'resource_type': 'Idle NAT Gateway',
+            'resource_id': gateway['NatGatewayId'],
+            'reason': reason,
+            'monthly_savings': round(NAT_GATEWAY_HOURLY_PRICE * HOURS_PER_MONTH + len(public_ips) * address_savings, 2),
+        })
+
+    for interface in interfaces.values():
+        if interface['Status'] != 'available' or interface.get('InterfaceType', 'interface') in MANAGED_INTERFACE_TYPES:
+            continue
+        reason = "Network interface is not attached to any instance."
+        attached_addresses = addresses_by_interface.get(interface['NetworkInterfaceId'], [])
+        if attached_addresses:
+            reason = f"{reason} It holds Elastic IP {', '.join(_address_label(address) for address in attached_addresses)}."
+        findings.append({
+            'resource_type': 'Detached Network Interface',
+            'resource_id': interface['NetworkInterfaceId'],
+            'reason': reason,
+        })
+    return findings
@@ -0,0 +1,151 @@
+import importlib
+import os
+import boto3
+import botocore
+import botocore.session
+from botocore.awsrequest import AWSResponse
+from transport import close_shared_sessions, create_client
+
+# Prime even without SnapStart, e.g. under provisioned concurrency
+PRIME_ON_INIT = os.getenv('PRIME_ON_INIT', 'False').lower() == 'true'
+# Clients kept across invocations; the handler's services
+PRIMED_CLIENTS = ('ec2', 'cloudwatch')
+# Services used elsewhere in the function whose models and parsers are warmed as well
+PRIMED_SERVICES = PRIMED_CLIENTS + ('s3', 'dynamodb', 'sts')
+
+# One side-effect-free call per service with a canned response, run through the full
+# serialize/endpoint/parse pipeline without credentials or network access
+PRIMING_CALLS = {
+    'ec2': (
+        'DescribeInstances', {},
+        b'<DescribeInstancesResponse xmlns="http://ec2.amazonaws.com/doc/2016-11-15/">'
+        b'<requestId>priming</requestId><reservationSet/></DescribeInstancesResponse>',
+    ),
+    'cloudwatch': (
+        'GetMetricStatistics',
+        {
+            'Namespace': 'AWS/EC2', 'MetricName': 'CPUUtilization', 'StartTime': 0, 'EndTime': 1,
+            'Period': 86400, 'Statistics': ['Average'],
+        },
+        b'<GetMetricStatisticsResponse xmlns="http://monitoring.amazonaws.com/doc/2010-08-01/">'
+        b'<GetMetricStatisticsResult><Datapoints/><Label>CPUUtilization</Label></GetMetricStatisticsResult>'
+        b'<ResponseMetadata><RequestId>priming</RequestId></ResponseMetadata></GetMetricStatisticsResponse>',
+    ),
+    's3': (
+        'ListObjectsV2', {'Bucket': 'priming'},
+        b'<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+        b'<Name>priming</Name><KeyCount>0</KeyCount></ListBucketResult>',
+    ),
+    'dynamodb': ('GetItem', {'TableName': 'priming', 'Key': {'id': {'S': 'priming'}}}, b'{}'),
+    'sts': (
+        'GetCallerIdentity', {},
+        b'<GetCallerIdentityResponse xmlns="https://sts.amazonaws.com/doc/2011-06-15/">'
+        b'<GetCallerIdentityResult><Account>000000000000</Account></GetCallerIdentityResult>'
+        b'<ResponseMetadata><RequestId>priming</RequestId></ResponseMetadata></GetCallerIdentityResponse>',
+    ),
+}
+
+_clients = {}
+# Hooks registered while running outside Lambda, for local simulation
+_before_snapshot_hooks = []
+_after_restore_hooks = []
+
+try:
+    # Provided by the Lambda Python runtime when SnapStart is available
+    from snapshot_restore_py import register_after_restore, register_before_snapshot
+except ImportError:
+    def register_before_snapshot(hook, *args, **kwargs):
+        _before_snapshot_hooks.append((hook, args, kwargs))
+        return hook
+
+    def register_after_restore(hook, *args, **kwargs):
+        _after_restore_hooks.append((hook, args, kwargs))
+        return hook
+
+
+def run_before_snapshot_hooks():
+    """Simulate the runtime taking a snapshot (local runs only)."""
+    for hook, args, kwargs in _before_snapshot_hooks:
+        hook(*args, **kwargs)
+
+
+def run_after_restore_hooks():
+    """Simulate the runtime restoring from a snapshot (local runs only)."""
+    for hook, args, kwargs in _after_restore_hooks:
+        hook(*args, **kwargs)
+
+
+class _CannedBody:
+    def __init__(self, body):
+        self._body = body
+
+    def stream(self, *args, **kwargs):
+        yield self._body
+
+
+def warm_client(client, operation_name, params, body):
+    """Run one call through the client with signing switched off and a canned response instead of the network."""
+    service_id = client.meta.service_model.service_id.hyphenize()
+
+    def unsigned(**kwargs):
+        return botocore.UNSIGNED
+
+    def canned_response(request, **kwargs):
+        return AWSResponse(request.url, 200, {}, _CannedBody(body))
+
+    client.meta.events.register_first(f"choose-signer.{service_id}.{operation_name}", unsigned)
+    client.meta.events.register_first(f"before-send.{service_id}.{operation_name}", canned_response)
+    try:
+        getattr(client, botocore.xform_name(operation_name))(**params)
+    finally:
+        client.meta.events.unregister(f"choose-signer.{service_id}.{operation_name}", unsigned)
+        client.meta.events.unregister(f"before-send.{service_id}.{operation_name}", canned_response)
+
+
+def get_client(service_name):
+    """Client kept for the life of the execution environment, on the shared connection pool."""
+    if service_name not in _clients:
+        _clients[service_name] = create_client(service_name)
+    return _clients[service_name]
+
+
+def prime():
+    """Load code, service models and endpoint rules, and warm the parsers, so invocations start warm."""
+    # Imported for its side effect: it loads boto3 and every cleanup module
+    importlib.import_module('slack_actions')
+
+    region = boto3.session.Session().region_name or 'us-east-1'
+    for service_name in PRIMED_SERVICES:
+        if service_name in PRIMED_CLIENTS:
+            client = get_client(service_name)
+        else:
+            # Models and endpoint rules are cached on the default session for clients created later
+            client = create_client(service_name, region_name=region)
+        operation_name, params, body = PRIMING_CALLS[service_name]
+        warm_client(client, operation_name, params, body)
+    print(f"Primed {', '.join(PRIMED_SERVICES)}")
+
+
+def restore():
+    """Drop state that must not outlive a snapshot: credentials, clients bound to them, and open connections."""
+    botocore_session = botocore.session.get_session()
+    if boto3.DEFAULT_SESSION is not None:
+        # Keep the loaded models; only credentials and clients are rebuilt.
+        # boto3 has no public accessor for a session's botocore session.
+        loader = boto3.DEFAULT_SESSION._session.get_component('data_loader')
+        botocore_session.register_component('data_loader', loader)
+    boto3.setup_default_session(botocore_session=botocore_session)
+    close_shared_sessions()
+    for service_name in list(_clients):
+        _clients[service_name] = create_client(service_name)
+    print("Restored clients with fresh credentials and connections")
+
+
+def install_priming_hooks(initialization_type=None):
+    """Prime now or before the snapshot, depending on how the execution environment is initialized."""
+    initialization_type = initialization_type or os.getenv('AWS_LAMBDA_INITIALIZATION_TYPE')
+    if initialization_type == 'snap-start':
+        register_before_snapshot(prime)
+        register_after_restore(restore)
+    elif PRIME_ON_INIT or initialization_type == 'provisioned-concurrency':
+        prime()
@@ -0,0 +1,195 @@
+import botocore.session
+import boto3
+from botocore.compat import ETree, XMLParseError
+from botocore.parsers import PROTOCOL_PARSERS, ResponseParserError, ResponseParserFactory
+
+# Passed as the projection of a member to keep its whole subtree
+KEEP_ALL = None
+# Element-name wildcard used for list items
+ANY_ELEMENT = '*'
+
+
+def compile_projection(paths):
+    """Turn dotted member paths into a nested dict; lists are traversed implicitly.
+
+    ['Reservations.Instances.InstanceId', 'Reservations.Instances.Monitoring']
+    -> {'Reservations': {'Instances': {'InstanceId': None, 'Monitoring': None}}}
+    """
+    tree = {}
+    for path in paths:
+        node = tree
+        names = path.split('.')
+        for name in names[:-1]:
+            if node.get(name, {}) is KEEP_ALL:
+                break
+            node = node.setdefault(name, {})
+        else:
+            node[names[-1]] = KEEP_ALL
+    return tree
+
+
+def _member_xml_name(member_name, member_shape):
+    """XML element name of a structure member, mirroring BaseXMLResponseParser._member_key_name."""
+    if member_shape.type_name == 'list' and member_shape.serialization.get('flattened'):
+        name = member_shape.member.serialization.get('name')
+        if name is not None:
+            return name
+    return member_shape.serialization.get('name') or member_name
+
+
+def _xml_projection(shape, projection):
+    """Translate a member projection into the element-name tree of the wire format."""
+    if projection is KEEP_ALL:
+        return KEEP_ALL
+    if shape.type_name == 'list':
+        member_projection = _xml_projection(shape.member, projection)
+        if shape.serialization.get('flattened'):
+            return member_projection
+        # The list parser takes every child as an item whatever its tag
+        return {ANY_ELEMENT: member_projection}
+    if shape.type_name != 'structure':
+        return KEEP_ALL
+
+    xml_tree = {}
+    for member_name, member_projection in projection.items():
+        if member_name not in shape.members:
+            raise ValueError(f"{shape.name} has no member {member_name}")
+        member_shape = shape.members[member_name]
+        xml_tree[_member_xml_name(member_name, member_shape)] = _xml_projection(member_shape, member_projection)
+    return xml_tree
+
+
+def build_xml_projection(output_shape, projection):
+    """Element-name tree for a whole response document, including pagination and metadata elements."""
+    projection = dict(projection)
+    for token_name in ('NextToken', 'nextToken'):
+        if token_name in output_shape.members:
+            projection.setdefault(token_name, KEEP_ALL)
+    xml_tree = _xml_projection(output_shape, projection)
+    # Request IDs live outside the modeled output: <requestId> on EC2, <ResponseMetadata> on Query
+    xml_tree.update({'requestId': KEEP_ALL, 'ResponseMetadata': KEEP_ALL})
+    wrapper = output_shape.serialization.get('resultWrapper')
+    if wrapper:
+        xml_tree = {wrapper: xml_tree, 'ResponseMetadata': KEEP_ALL}
+    return xml_tree
+
+
+class ProjectingTreeBuilder:
+    """ElementTree parser target that only builds elements inside the projection.
+
+    Skipped subtrees are never turned into Element objects, so neither their
+    memory nor the parser's later walk over them is paid for.
+    """
+
+    _SKIP = object()
+
+    def __init__(self, xml_tree):
+        self._builder = ETree.TreeBuilder()
+        self._root_spec = xml_tree
+        # Projection of each currently open element; _SKIP inside pruned subtrees
+        self._stack = []
+
+    @staticmethod
+    def _local_name(tag):
+        return tag.rsplit('}', 1)[-1]
+
+    def start(self, tag, attrib):
+        if not self._stack:
+            spec = self._root_spec
+        else:
+            parent = self._stack[-1]
+            if parent is self._SKIP:
+                spec = self._SKIP
+            elif parent is KEEP_ALL:
+                spec = KEEP_ALL
+            else:
+                spec = parent.get(self._local_name(tag), parent.get(ANY_ELEMENT, self._SKIP))
+        self._stack.append(spec)
+        if spec is not self._SKIP:
+            self._builder.start(tag, attrib)
+
+    def end(self, tag):
+        if self._stack.pop() is not self._SKIP:
+            return self._builder.end(tag)
+
+    def data(self, data):
+        if self._stack and self._stack[-1] is not self._SKIP:
+            self._builder.data(data)
+
+    def close(self):
+        return self._builder.close()
+
+
+def _projecting_parser_class(base_class):
+    class ProjectingParser(base_class):
+        """Parser that prunes responses of projected operations while the XML is read."""
+
+        def __init__(self, xml_projections, **kwargs):
+            super().__init__(**kwargs)
+            # Output shape name -> element-name tree
+            self._xml_projections = xml_projections
+
+        def _parse_body_as_xml(self, response, shape, inject_metadata=True):
+            xml_tree = self._xml_projections.get(shape.name) if shape is not None else None
+            if xml_tree is None:
+                return super()._parse_body_as_xml(response, shape, inject_metadata)
+
+            # Same steps as QueryParser._parse_body_as_xml, with a pruned DOM
+            root = self._parse_projected_xml(response['body'], xml_tree)
+            start = root
+            if 'resultWrapper' in shape.serialization:
+                start = self._find_result_wrapped_shape(shape.serialization['resultWrapper'], root)
+            parsed = self._parse_shape(shape, start)
+            if inject_metadata:
+                self._inject_response_metadata(root, parsed)
+            return parsed
+
+        def _parse_projected_xml(self, xml_string, xml_tree):
+            try:
+                parser = ETree.XMLParser(target=ProjectingTreeBuilder(xml_tree), encoding=self.DEFAULT_ENCODING)
+                parser.feed(xml_string)
+                return parser.close()
+            except XMLParseError as e:
+                raise ResponseParserError(
+                    f"Unable to parse response ({e}), "
+                    f"invalid XML received. Further retries may succeed:\n{xml_string}"
+                )
+
+    ProjectingParser.__name__ = f"Projecting{base_class.__name__}"
+    return ProjectingParser
+
+
+# Endpoints create a parser per response, so the classes are built once here
+PROJECTING_PARSERS = {
+    protocol_name: _projecting_parser_class(PROTOCOL_PARSERS[protocol_name])
+    for protocol_name in ('ec2', 'query')
+}
+
+
+class ProjectingParserFactory(ResponseParserFactory):
+    """Response parser factory that applies projections to query and ec2 protocol operations."""
+
+    def __init__(self, service_model, projections):
+        super().__init__()
+        self._xml_projections = {}
+        for operation_name, paths in projections.items():
+            output_shape = service_model.operation_model(operation_name).output_shape
+            self._xml_projections[output_shape.name] = build_xml_projection(output_shape, compile_projection(paths))
+
+    def create_parser(self, protocol_name):
+        if protocol_name not in PROJECTING_PARSERS:
+            return super().create_parser(protocol_name)
+        return PROJECTING_PARSERS[protocol_name](self._xml_projections, **self._defaults)
+
+
+def create_projected_client(service_name, projections, **client_kwargs):
+    """Create a client whose responses for the given operations only contain the projected members.
+
+    projections maps operation names to dotted member paths, for example
+    {'DescribeInstances': ['Reservations.Instances.InstanceId']}. Operations
+    that are not listed parse exactly as usual.
+    """
+    session = botocore.session.Session()
+    service_model = session.get_service_model(service_name)
+    session.register_component('response_parser_factory', ProjectingParserFactory(service_model, projections))
+    return boto3.Session(botocore_session=session).client(service_name, **client_kwargs)
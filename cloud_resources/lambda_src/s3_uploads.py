@@ -0,0 +1,160 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from botocore.exceptions import ClientError
+from streaming import paginate_items
+from transport import create_client
+
+# Multipart uploads started longer ago than this are considered abandoned
+S3_STALE_UPLOAD_DAYS = int(os.getenv('S3_STALE_UPLOAD_DAYS', '7'))
+# Buckets scanned at once in each region
+S3_REGION_CONCURRENCY = int(os.getenv('S3_REGION_CONCURRENCY', '8'))
+# Buckets not reached within this many seconds are skipped and reported as such
+S3_SCAN_BUDGET_SECONDS = int(os.getenv('S3_SCAN_BUDGET_SECONDS', '300'))
+# Uploads per bucket whose parts are listed to estimate the size of the rest
+S3_SIZED_UPLOADS_PER_BUCKET = int(os.getenv('S3_SIZED_UPLOADS_PER_BUCKET', '20'))
+S3_ABORT_CONCURRENCY = int(os.getenv('S3_ABORT_CONCURRENCY', '16'))
+# S3 Standard storage price per GB-month (us-east-1)
+S3_GB_MONTH_PRICE = 0.023
+STALE_UPLOADS_TYPE = 'Stale Multipart Uploads'
+
+# Bucket name -> region; a bucket never moves, so this lives as long as the process
+_bucket_regions = {}
+_bucket_regions_lock = threading.Lock()
+
+
+def bucket_region(s3_client, bucket):
+    """Region of a ListBuckets entry, from the entry itself or a cached get_bucket_location."""
+    name = bucket['Name']
+    with _bucket_regions_lock:
+        if name in _bucket_regions:
+            return _bucket_regions[name]
+    region = bucket.get('BucketRegion')
+    if not region:
+        location = s3_client.get_bucket_location(Bucket=name).get('LocationConstraint')
+        # Buckets in us-east-1 have no location constraint; EU is the legacy name of eu-west-1
+        region = {None: 'us-east-1', '': 'us-east-1', 'EU': 'eu-west-1'}.get(location, location)
+    with _bucket_regions_lock:
+        _bucket_regions[name] = region
+    return region
+
+
+def stale_uploads(s3_client, bucket_name, cutoff):
+    return [
+        upload for upload in paginate_items(s3_client, 'ListMultipartUploads', 'Uploads', Bucket=bucket_name)
+        if upload['Initiated'] < cutoff
+    ]
+
+
+def _upload_bytes(s3_client, bucket_name, upload):
+    return sum(
+        part['Size']
+        for part in paginate_items(s3_client, 'ListParts', 'Parts', Bucket=bucket_name, Key=upload['Key'], UploadId=upload['UploadId'])
+    )
+
+
+def aborts_incomplete_uploads(s3_client, bucket_name):
+    """Whether an enabled lifecycle rule of the bucket aborts incomplete multipart uploads."""
+    try:
+        rules = s3_client.get_bucket_lifecycle_configuration(Bucket=bucket_name)['Rules']
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'NoSuchLifecycleConfiguration':
+            return False
+        raise
+    return any(rule['Status'] == 'Enabled' and 'AbortIncompleteMultipartUpload' in rule for rule in rules)
+
+
+def scan_bucket(s3_client, bucket_name, cutoff):
+    """Finding for a bucket with stale multipart uploads, or None."""
+    uploads = stale_uploads(s3_client, bucket_name, cutoff)
+    if not uploads:
+        return None
+    sized = uploads[:S3_SIZED_UPLOADS_PER_BUCKET]
+    sized_bytes = sum(_upload_bytes(s3_client, bucket_name, upload) for upload in sized)
+    estimated_bytes = sized_bytes * len(uploads) / len(sized)
+    reason = (
+        f"{len(uploads)} multipart uploads older than {S3_STALE_UPLOAD_DAYS} days hold "
+        f"{'' if len(sized) == len(uploads) else 'an estimated '}{estimated_bytes / 1024 ** 3:,.2f} GiB."
+    )
+    if not aborts_incomplete_uploads(s3_client, bucket_name):
+        reason = f"{reason} No lifecycle rule aborts incomplete multipart uploads."
+    finding = {'resource_type': STALE_UPLOADS_TYPE, 'resource_id': bucket_name, 'reason': reason}
+    if estimated_bytes:
+        finding['monthly_savings'] = round(estimated_bytes / 1024 ** 3 * S3_GB_MONTH_PRICE, 2)
+    return finding
+
+
+def find_stale_multipart_uploads(session):
+    """Find buckets holding abandoned multipart uploads, scanning each region's buckets on its own worker pool.
+
+    Scanning stops starting new buckets after S3_SCAN_BUDGET_SECONDS, so an
+    account with thousands of buckets still finishes in bounded time.
+    """
+    s3_client = create_client('s3', session)
+    buckets_by_region = {}
+    for bucket in paginate_items(s3_client, 'ListBuckets', 'Buckets'):
+        buckets_by_region.setdefault(bucket_region(s3_client, bucket), []).append(bucket['Name'])
+
+    deadline = time.monotonic() + S3_SCAN_BUDGET_SECONDS
+    cutoff = datetime.now(timezone.utc) - timedelta(days=S3_STALE_UPLOAD_DAYS)
+    skipped = []
+
+    def scan(regional_client, bucket_name):
+        if time.monotonic() > deadline:
+            skipped.append(bucket_name)
+            return None
+        try:
+            return scan_bucket(regional_client, bucket_name, cutoff)
+        except ClientError as e:
+            print(f"Skipped bucket {bucket_name}: {e.response['Error']['Code']}")
+            return None
+
+    findings = []
+    executors = []
+    futures = []
+    for region, bucket_names in buckets_by_region.items():
+        regional_client = create_client('s3', session, region_name=region)
+        executor = ThreadPoolExecutor(max_workers=S3_REGION_CONCURRENCY)
+        executors.append(executor)
+        futures.extend((region, executor.submit(scan, regional_client, name)) for name in bucket_names)
+    for region, future in futures:
+        finding = future.result()
+        if finding:
+            finding['region'] = region
+            findings.append(finding)
+    for executor in executors:
+        executor.shutdown()
+    if skipped:
+        print(f"S3 scan budget of {S3_SCAN_BUDGET_SECONDS}s ran out; {len(skipped)} buckets were not scanned")
+    return findings
+
+
+def abort_stale_uploads(session, findings):
+    """Abort the stale multipart uploads of approved buckets in parallel; returns how many were aborted.
+
+    Uploads are listed again first, so only ones that are still stale are aborted.
+    """
+    s3_client = create_client('s3', session)
+    cutoff = datetime.now(timezone.utc) - timedelta(days=S3_STALE_UPLOAD_DAYS)
+    uploads = [
+        (finding['resource_id'], upload)
+        for finding in findings
+        for upload in stale_uploads(s3_client, finding['resource_id'], cutoff)
+    ]
+
+    def abort(bucket_upload):
+        bucket_name, upload = bucket_upload
+        try:
+            s3_client.abort_multipart_upload(Bucket=bucket_name, Key=upload['Key'], UploadId=upload['UploadId'])
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'NoSuchUpload':
+                return False
+            raise
+        return True
+
+    with ThreadPoolExecutor(max_workers=S3_ABORT_CONCURRENCY) as executor:
+        aborted = sum(executor.map(abort, uploads))
+    print(f"Aborted {aborted} stale multipart uploads in {len(findings)} buckets")
+    return aborted
@@ -0,0 +1,183 @@
+import json
+import os
+import time
+import uuid
+import boto3
+from detectors import ENABLED_DETECTORS, run_detectors
+from findings_store import build_snapshot
+from metrics import MetricsPublisher, METRICS_FLUSH_TIMEOUT_SECONDS
+from transport import create_client, log_pool_stats
+
+LAMBDA_FUNCTION_NAME = "CloudCleanupLambda"
+AWS_REGION = "us-east-1"
+SCAN_REGIONS = [region for region in (os.getenv('SCAN_REGIONS') or AWS_REGION).split(',') if region]
+# Cross-account role ARNs to scan; empty means only the caller's own account
+SCAN_ACCOUNT_ROLES = [role for role in os.getenv('SCAN_ACCOUNT_ROLES', '').split(',') if role]
+# Split each account/region further by the last hex digit of the resource ID (1 = no split)
+SCAN_ID_SHARDS = int(os.getenv('SCAN_ID_SHARDS', '1'))
+# A shard with no result this long after its last invocation is re-invoked
+SHARD_TIMEOUT_SECONDS = int(os.getenv('SHARD_TIMEOUT_SECONDS', '900'))
+MAX_SHARD_ATTEMPTS = 3
+# Give up on the whole run after this long
+RUN_TIMEOUT_SECONDS = int(os.getenv('RUN_TIMEOUT_SECONDS', '3600'))
+POLL_INTERVAL_SECONDS = 10
+
+HEX_DIGITS = '0123456789abcdef'
+
+
+class ShardedScanIncomplete(Exception):
+    """Raised when shards are still missing after every retry or the run timeout."""
+
+
+def id_suffix_filter(name, resource_prefix, id_suffixes):
+    """Describe filter restricting a scan to IDs ending in the given hex digits, e.g. i-*0 and i-*8.
+
+    Current 17-digit IDs all start with 0, but their last digit is spread
+    evenly, so shards cut on it get similar shares of the resources.
+    """
+    if not id_suffixes:
+        return []
+    return [{'Name': name, 'Values': [f"{resource_prefix}-*{suffix}" for suffix in id_suffixes]}]
+
+
+def plan_shards(regions=None, account_roles=None, id_shards=None):
+    """Split the scan into one shard per account, region and (optionally) resource-ID suffix group."""
+    regions = regions or SCAN_REGIONS
+    account_roles = account_roles or SCAN_ACCOUNT_ROLES or [None]
+    id_shards = min(id_shards or SCAN_ID_SHARDS, len(HEX_DIGITS))
+    if id_shards > 1:
+        # Deal the 16 hex digits out round-robin so group sizes differ by at most one
+        suffix_groups = [HEX_DIGITS[i::id_shards] for i in range(id_shards)]
+    else:
+        suffix_groups = [None]
+
+    shards = []
+    for account_role in account_roles:
+        account = account_role.split(':')[4] if account_role else 'self'
+        for region in regions:
+            for suffixes in suffix_groups:
+                shards.append({
+                    'shard_id': f"{account}-{region}-{suffixes or 'all'}",
+                    'account': account,
+                    'account_role': account_role,
+                    'region': region,
+                    'id_suffixes': list(suffixes) if suffixes else None,
+                })
+    return shards
+
+
+def shard_result_name(run_id, shard_id):
+    return f"runs/{run_id}/shards/{shard_id}.json"
+
+
+def invoke_shard(lambda_client, run_id, shard):
+    """Start a worker for one shard, fire-and-forget like trigger_lambda."""
+    return lambda_client.invoke(
+        FunctionName=LAMBDA_FUNCTION_NAME,
+        InvocationType='Event',
+        Payload=json.dumps({"action": "scan_shard", "run_id": run_id, "shard": shard}),
+    )
+
+
+def start_sharded_scan(lambda_client, store, shards):
+    """Coordinator: record the run manifest and invoke every shard worker."""
+    run_id = uuid.uuid4().hex
+    now = time.time()
+    manifest = {'run_id': run_id, 'started_at': now, 'shards': {}}
+    for shard in shards:
+        invoke_shard(lambda_client, run_id, shard)
+        manifest['shards'][shard['shard_id']] = {'shard': shard, 'attempts': 1, 'invoked_at': now}
+    store.write_object(f"runs/{run_id}/manifest.json", json.dumps(manifest).encode('utf-8'))
+    print(f"Started sharded scan {run_id} with {len(shards)} shards")
+    return manifest
+
+
+def shard_session(shard):
+    """boto3 session for the shard's region, in the shard's account."""
+    session = boto3.Session(region_name=shard['region'])
+    if shard.get('account_role'):
+        credentials = create_client('sts', session).assume_role(
+            RoleArn=shard['account_role'],
+            RoleSessionName='cloud-cleanup-shard',
+        )['Credentials']
+        session = boto3.Session(
+            region_name=shard['region'],
+            aws_access_key_id=credentials['AccessKeyId'],
+            aws_secret_access_key=credentials['SecretAccessKey'],
+            aws_session_token=credentials['SessionToken'],
+        )
+    return session
+
+
+def location_session(account, region):
+    """boto3 session for a finding's account ID (None for the caller's own) and region."""
+    account_roles = {role.split(':')[4]: role for role in SCAN_ACCOUNT_ROLES}
+    return shard_session({'region': region, 'account_role': account_roles.get(account)})
+
+
+def run_shard(event, store, scan):
+    """Worker: scan one shard with scan(ec2_client, cloudwatch_client, id_suffixes) and store its findings."""
+    shard = event['shard']
+    session = shard_session(shard)
+    ec2_client, cloudwatch_client = create_client('ec2', session), create_client('cloudwatch', session)
+    metrics = MetricsPublisher(dimensions={'Run': 'shard'})
+    findings = []
+    # Detectors scan whole regions, so only the shard holding the first suffix group runs them
+    if ENABLED_DETECTORS and (not shard['id_suffixes'] or shard['id_suffixes'][0] == HEX_DIGITS[0]):
+        findings = run_detectors(session, include_global=shard['region'] == SCAN_REGIONS[0], metrics=metrics)
+    snapshot = build_snapshot(*scan(ec2_client, cloudwatch_client, shard['id_suffixes']), findings)
+    for finding in snapshot['findings']:
+        finding.setdefault('region', shard['region'])
+        if shard.get('account_role'):
+            finding['account'] = shard['account']
+    store.write_object(shard_result_name(event['run_id'], shard['shard_id']), json.dumps(snapshot).encode('utf-8'))
+    metrics_flush = metrics.flush_async()
+    log_pool_stats()
+    metrics_flush.join(METRICS_FLUSH_TIMEOUT_SECONDS)
+    return {"statusCode": 200, "body": json.dumps({"shard_id": shard['shard_id'], "findings": len(snapshot['findings'])})}
+
+
+def wait_for_shards(lambda_client, store, manifest, sleep=time.sleep, clock=time.time):
+    """Reducer: poll for shard results, re-invoke stragglers, and merge everything into one snapshot."""
+    run_id = manifest['run_id']
+    pending = dict(manifest['shards'])
+    results = {}
+
+    while pending:
+        for shard_id in list(pending):
+            body = store.read_object(shard_result_name(run_id, shard_id))
+            if body is not None:
+                results[shard_id] = json.loads(body)
+                del pending[shard_id]
+        if not pending:
+            break
+
+        now = clock()
+        if now - manifest['started_at'] > RUN_TIMEOUT_SECONDS:
+            raise ShardedScanIncomplete(f"Run {run_id} timed out waiting for shards: {sorted(pending)}")
+        for shard_id, state in pending.items():
+            if now - state['invoked_at'] < SHARD_TIMEOUT_SECONDS:
+                continue
+            if state['attempts'] >= MAX_SHARD_ATTEMPTS:
+                raise ShardedScanIncomplete(f"Shard {shard_id} failed after {state['attempts']} attempts")
+            print(f"Retrying straggler shard {shard_id} (attempt {state['attempts'] + 1})")
+            invoke_shard(lambda_client, run_id, state['shard'])
+            state['attempts'] += 1
+            state['invoked_at'] = now
+        sleep(POLL_INTERVAL_SECONDS)
+
+    return merge_shard_results(results.values())
+
+
+def merge_shard_results(shard_snapshots):
+    """Combine shard snapshots into one snapshot in the same canonical order build_snapshot uses."""
+    findings = [finding for snapshot in shard_snapshots for finding in snapshot['findings']]
+    findings.sort(key=lambda finding: (finding['resource_type'], finding['resource_id']))
+    return {'version': 1, 'findings': findings}
+
+
+def run_sharded_scan(store, lambda_client=None):
+    """Coordinator and reducer in one call: fan the scan out and return the merged snapshot."""
+    lambda_client = lambda_client or boto3.client('lambda', region_name=AWS_REGION)
+    manifest = start_sharded_scan(lambda_client, store, plan_shards())
+    return wait_for_shards(lambda_client, store, manifest)
@@ -0,0 +1,174 @@
+import json
+import os
+import logging
+import urllib.parse
+import time
+from cloud_cleanup import cleanup_resources, generate_report, revalidate_findings, send_cleanup_result
+from detectors import remediate_findings
+from findings_store import EC2_RESOURCE_TYPES, SnapshotNotFound, detector_findings, get_findings_store, load_snapshot, unpack_snapshot
+from metrics import MetricsPublisher, METRICS_FLUSH_TIMEOUT_SECONDS, record_run_metrics
+from idempotency import get_idempotency_store, idempotency_key, run_once
+from sharding import AWS_REGION, location_session, run_shard
+from transport import create_client
+from priming import get_client
+
+logger = logging.getLogger()
+
+def handle_scan_shard(event):
+    """Scan one shard for the sharded-scan coordinator."""
+    return run_shard(
+        event,
+        get_findings_store(),
+        lambda ec2_client, cloudwatch_client, id_suffixes: cleanup_resources(ec2_client, cloudwatch_client, True, None, id_suffixes),
+    )
+
+def handle_slack_request(event, context):
+    """Handle a Slack request whose signature lambda_function has already verified."""
+    try:
+        ec2_client = get_client('ec2')
+        cloudwatch_client = get_client('cloudwatch')
+        dry_run = os.getenv('DRY_RUN', 'True').lower() == 'true'
+
+        logger.info(f"Received event: {json.dumps(event)}")
+
+        # Extract and parse Slack request payload
+        body = event.get("body", "")
+        if not body:
+            return {"statusCode": 400, "body": json.dumps({"error": "Missing request body"})}
+
+        parsed_body = urllib.parse.parse_qs(body)
+        payload = json.loads(parsed_body.get("payload", ["{}"])[0])
+
+        # Handle Slack URL verification
+        if payload.get("type") == "url_verification":
+            return {"statusCode": 200, "body": payload["challenge"]}
+
+        # Handle Slack button clicks: legacy attachments and Block Kit messages
+        if payload.get("type") in ("interactive_message", "block_actions"):
+            actions = payload.get("actions", [])
+            if not actions:
+                return {"statusCode": 400, "body": json.dumps({"error": "No action received"})}
+
+            action, _, snapshot_id = actions[0].get("value", "").partition(":")
+
+            if action == "approve":
+                key = idempotency_key(payload, snapshot_id)
+                run_cleanup = lambda: execute_cleanup(ec2_client, cloudwatch_client, dry_run, context, snapshot_id or None)
+                if not key:
+                    return run_cleanup()
+                return run_once(get_idempotency_store(), key, run_cleanup)
+            elif action == "decline":
+                return {"statusCode": 200, "body": json.dumps({"text": "Cleanup declined. No action taken."})}
+
+        return {"statusCode": 400, "body": json.dumps({"error": "Invalid request format"})}
+
+    except Exception as e:
+        logger.error(f"Error processing event: {e}", exc_info=True)
+        return {
+            "statusCode": 500,
+            "body": json.dumps({
+                "error": "Internal Server Error",
+                "message": str(e),
+                "request_id": context.aws_request_id
+            })
+        }
+
+def findings_by_location(findings):
+    """Group findings by (account, region); findings without either come from the Lambda's own account and AWS_REGION."""
+    by_location = {}
+    for finding in findings:
+        by_location.setdefault((finding.get('account'), finding.get('region') or AWS_REGION), []).append(finding)
+    return by_location
+
+def load_approved_findings(ec2_client, snapshot_id):
+    """Load the dry-run snapshot and keep only resources that are still in the reported state.
+
+    Instances and volumes are revalidated in the account and region they were
+    found in. Returns the revalidated cleanup_resources results and the
+    snapshot's detector findings, which their remediations check as they go.
+    """
+    snapshot = load_snapshot(get_findings_store(), snapshot_id)
+    logger.info(f"Loaded findings snapshot {snapshot_id} with {len(snapshot['findings'])} findings")
+    ec2_findings = [finding for finding in snapshot['findings'] if finding['resource_type'] in EC2_RESOURCE_TYPES]
+    still_found = set()
+    for (account, region), group in findings_by_location(ec2_findings).items():
+        client = ec2_client
+        if account or region != ec2_client.meta.region_name:
+            client = create_client('ec2', location_session(account, region))
+        idle_instances, _, unattached_volumes, _ = revalidate_findings(client, *unpack_snapshot({'findings': group}))
+        still_found.update((account, region, resource_id) for resource_id in idle_instances + unattached_volumes)
+    approved = [
+        finding for finding in ec2_findings
+        if (finding.get('account'), finding.get('region') or AWS_REGION, finding['resource_id']) in still_found
+    ]
+    return unpack_snapshot({'findings': approved}), detector_findings(snapshot)
+
+def remediate_detector_findings(findings):
+    """Run the remediations of approved detector findings in each finding's account and region."""
+    for (account, region), group in findings_by_location(findings).items():
+        remediate_findings(location_session(account, region), group)
+
+def execute_cleanup(ec2_client, cloudwatch_client, dry_run, context, snapshot_id=None):
+    started = time.monotonic()
+    metrics = MetricsPublisher(dimensions={'Run': 'cleanup'})
+    metrics.count_api_calls(ec2_client)
+    metrics.count_api_calls(cloudwatch_client)
+    metrics_flush = None
+    try:
+        logger.info("Starting cleanup process")
+
+        findings = []
+        if snapshot_id:
+            try:
+                (idle_instances, instance_reasons, unattached_volumes, volume_reasons), findings = load_approved_findings(ec2_client, snapshot_id)
+            except SnapshotNotFound:
+                return {"statusCode": 404, "body": json.dumps({"error": "Findings snapshot not found", "snapshot_id": snapshot_id})}
+            if findings and not dry_run:
+                remediate_detector_findings(findings)
+        else:
+            idle_instances, instance_reasons, unattached_volumes, volume_reasons = cleanup_resources(ec2_client, cloudwatch_client, dry_run)
+        report_filename = generate_report(idle_instances, instance_reasons, unattached_volumes, volume_reasons, findings)
+        record_run_metrics(metrics, started, idle_instances, unattached_volumes, findings)
+        metrics_flush = metrics.flush_async()
+
+        text = (
+            f"Cleanup approved: {len(idle_instances)} idle instances, {len(unattached_volumes)} unattached volumes "
+            f"and {len(findings)} other findings still apply."
+        )
+        if dry_run:
+            text = f"{text} DRY_RUN is on, so nothing was changed."
+        elif findings:
+            text = f"{text} Findings with a remediation were cleaned up."
+        # Resources may already have changed, so a failed message must not turn
+        # into an error that releases the approval for another run
+        try:
+            send_cleanup_result(text, report_filename)
+        except Exception as e:
+            logger.error(f"Failed to send cleanup result to Slack: {e}", exc_info=True)
+
+        logger.info("Cleanup process completed")
+        return {
+            "statusCode": 200,
+            "body": json.dumps({
+                "message": "Cleanup executed successfully",
+                "report": report_filename,
+                "request_id": context.aws_request_id
+            })
+        }
+    except Exception as e:
+        logger.error(f"Error during cleanup: {e}", exc_info=True)
+        return {
+            "statusCode": 500,
+            "body": json.dumps({
+                "error": "Failed to execute cleanup",
+                "message": str(e),
+                "request_id": context.aws_request_id
+            })
+        }
+    finally:
+        # The execution environment is frozen once the handler returns
+        if metrics_flush is not None:
+            metrics_flush.join(METRICS_FLUSH_TIMEOUT_SECONDS)
+        # The clients are cached across warm invocations; without this an early
+        # return or error would leave the counters on them and count calls twice
+        metrics.stop_counting()
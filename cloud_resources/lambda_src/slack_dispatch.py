@@ -0,0 +1,157 @@
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from slack_sdk import WebClient
+from slack_sdk.http_retry import RateLimitErrorRetryHandler
+from slack_sdk.webhook import WebhookClient
+from slack_report import SLACK_BOT_TOKEN, build_findings_blocks
+
+# Team routing: account ID (or "*" for everything else) -> channel ID or {"channel": ..., "workspace": ...}
+SLACK_TEAM_CHANNELS = json.loads(os.getenv('SLACK_TEAM_CHANNELS') or '{}')
+# Bot tokens of additional workspaces by name; the default workspace uses SLACK_BOT_TOKEN
+SLACK_WORKSPACE_TOKENS = json.loads(os.getenv('SLACK_WORKSPACE_TOKENS') or '{}')
+DEFAULT_WORKSPACE = 'default'
+# Messages in flight at once, per workspace and per channel
+SLACK_WORKSPACE_CONCURRENCY = int(os.getenv('SLACK_WORKSPACE_CONCURRENCY', '2'))
+SLACK_CHANNEL_CONCURRENCY = int(os.getenv('SLACK_CHANNEL_CONCURRENCY', '1'))
+# Retries of one request after a 429
+SLACK_RATE_LIMIT_RETRIES = int(os.getenv('SLACK_RATE_LIMIT_RETRIES', '5'))
+
+
+class WorkspaceRateLimitRetryHandler(RateLimitErrorRetryHandler):
+    """RateLimitErrorRetryHandler whose Retry-After pause holds back every sender of the workspace.
+
+    Slack rate limits apply to the whole workspace token, so once one request
+    is throttled, the others would only collect 429s of their own.
+    """
+
+    def __init__(self, max_retry_count=SLACK_RATE_LIMIT_RETRIES, **kwargs):
+        super().__init__(max_retry_count=max_retry_count, **kwargs)
+        self._lock = threading.Lock()
+        self._resume_at = 0.0
+
+    def wait_until_resumed(self):
+        """Block while the workspace is paused by a Retry-After."""
+        while True:
+            with self._lock:
+                delay = self._resume_at - time.monotonic()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+    def prepare_for_next_attempt(self, *, state, request, response=None, error=None):
+        if response is None:
+            raise error
+        retry_after = next((values for name, values in response.headers.items() if name.lower() == 'retry-after'), None)
+        duration = (int(retry_after[0]) if retry_after else 1) + random.random()
+        with self._lock:
+            self._resume_at = max(self._resume_at, time.monotonic() + duration)
+        state.next_attempt_requested = True
+        self.wait_until_resumed()
+        state.increment_current_attempt()
+
+
+def get_webhook_client(url):
+    """WebhookClient that retries 429s after their Retry-After."""
+    return WebhookClient(url, retry_handlers=[RateLimitErrorRetryHandler(max_retry_count=SLACK_RATE_LIMIT_RETRIES)])
+
+
+def resolve_route(account, team_channels=None):
+    """(workspace, channel) for an account's findings, or None when the account has no team channel."""
+    team_channels = SLACK_TEAM_CHANNELS if team_channels is None else team_channels
+    route = team_channels.get(account or '*', team_channels.get('*'))
+    if route is None:
+        return None
+    if isinstance(route, str):
+        return DEFAULT_WORKSPACE, route
+    return route.get('workspace', DEFAULT_WORKSPACE), route['channel']
+
+
+class SlackDispatcher:
+    """Queue of team notifications that coalesces findings per channel and sends within Slack's limits."""
+
+    def __init__(self, workspace_tokens=None):
+        tokens = {DEFAULT_WORKSPACE: SLACK_BOT_TOKEN, **SLACK_WORKSPACE_TOKENS}
+        tokens.update(workspace_tokens or {})
+        self._tokens = tokens
+        self._clients = {}
+        self._rate_limiters = {}
+        # (workspace, channel) -> findings waiting to be sent
+        self._pending = {}
+        # Workspaces already warned about a missing token
+        self._skipped = set()
+
+    def _client(self, workspace):
+        if workspace not in self._clients:
+            rate_limiter = WorkspaceRateLimitRetryHandler()
+            self._rate_limiters[workspace] = rate_limiter
+            self._clients[workspace] = WebClient(token=self._tokens[workspace], retry_handlers=[rate_limiter])
+        return self._clients[workspace]
+
+    def add(self, workspace, channel, findings):
+        """Queue findings for a channel; everything queued for one channel becomes a single message.
+
+        Findings for a workspace without a bot token are skipped with a warning
+        rather than failing a run whose approval message has already been sent.
+        """
+        if not self._tokens.get(workspace):
+            if workspace not in self._skipped:
+                self._skipped.add(workspace)
+                print(f"Warning: no Slack bot token configured for workspace {workspace}; skipping its team notifications")
+            return
+        self._pending.setdefault((workspace, channel), []).extend(findings)
+
+    def add_snapshot(self, snapshot, team_channels=None):
+        """Route each finding of a snapshot to its team's channel by account."""
+        for finding in snapshot['findings']:
+            route = resolve_route(finding.get('account'), team_channels)
+            if route:
+                self.add(*route, [finding])
+
+    def dispatch(self, render=None):
+        """Send one message per queued channel; returns {(workspace, channel): error or None}.
+
+        render(findings) returns the message blocks for a channel's findings.
+        """
+        render = render or (lambda findings: build_findings_blocks({'findings': findings}, actions=False))
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return {}
+
+        workspaces = {workspace for workspace, _ in pending}
+        workspace_slots = {workspace: threading.Semaphore(SLACK_WORKSPACE_CONCURRENCY) for workspace in workspaces}
+        channel_slots = {key: threading.Semaphore(SLACK_CHANNEL_CONCURRENCY) for key in pending}
+        for workspace in workspaces:
+            self._client(workspace)
+
+        def send(key, findings):
+            workspace, channel = key
+            with workspace_slots[workspace], channel_slots[key]:
+                self._rate_limiters[workspace].wait_until_resumed()
+                try:
+                    self._clients[workspace].chat_postMessage(
+                        channel=channel,
+                        text=f"Cloud Cleanup found {len(findings)} resources for your team.",
+                        blocks=render(findings),
+                    )
+                    return None
+                except Exception as e:
+                    print(f"Failed to notify {channel} in workspace {workspace}: {e}")
+                    return e
+
+        max_workers = len(workspaces) * SLACK_WORKSPACE_CONCURRENCY
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {key: executor.submit(send, key, findings) for key, findings in pending.items()}
+        results = {key: future.result() for key, future in futures.items()}
+        print(f"Sent {sum(error is None for error in results.values())} of {len(results)} team notifications")
+        return results
+
+
+def notify_teams(snapshot, team_channels=None):
+    """Send every team with findings in the snapshot one coalesced message."""
+    dispatcher = SlackDispatcher()
+    dispatcher.add_snapshot(snapshot, team_channels)
+    return dispatcher.dispatch()
@@ -0,0 +1,170 @@
+import os
+import urllib.request
+from collections import Counter
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackRequestError
+
+# Bot token and channel for report uploads; the webhook alone cannot upload files
+SLACK_BOT_TOKEN = os.getenv('SLACK_BOT_TOKEN')
+SLACK_CHANNEL_ID = os.getenv('CHANNEL_ID')
+# Findings listed in the message itself; the rest are only in the uploaded report
+SLACK_TOP_FINDINGS = int(os.getenv('SLACK_TOP_FINDINGS', '10'))
+# Block Kit limits
+MAX_BLOCKS = 50
+MAX_SECTION_CHARS = 3000
+MAX_FIELDS = 10
+MAX_BUTTON_VALUE_CHARS = 2000
+
+
+def count_findings(snapshot):
+    """Finding counts by resource type and by region."""
+    by_type = Counter(finding['resource_type'] for finding in snapshot['findings'])
+    by_region = Counter(finding.get('region', 'default') for finding in snapshot['findings'])
+    return by_type, by_region
+
+
+def top_findings(snapshot, delta=None, savings=None, limit=None):
+    """The findings worth listing first: highest savings, then new and changed ones, then the rest.
+
+    savings optionally maps (resource_type, resource_id) to an estimated monthly saving.
+    """
+    limit = SLACK_TOP_FINDINGS if limit is None else limit
+    savings = savings or {}
+    fresh = set(delta['added']) | set(delta['changed']) if delta else set()
+
+    def rank(finding):
+        key = (finding['resource_type'], finding['resource_id'])
+        return (-savings.get(key, 0), key not in fresh, key)
+
+    return sorted(snapshot['findings'], key=rank)[:limit]
+
+
+def _finding_line(finding, savings):
+    saving = savings.get((finding['resource_type'], finding['resource_id']))
+    prefix = f"${saving:,.2f}/mo " if saving else ""
+    region = f" ({finding['region']})" if finding.get('region') else ""
+    return f"• {prefix}`{finding['resource_id']}`{region}: {finding['reason']}"
+
+
+def _section_pages(lines):
+    """Group lines into section texts that each stay within Slack's per-section limit."""
+    pages, page = [], ""
+    for line in lines:
+        line = line[:MAX_SECTION_CHARS]
+        if page and len(page) + len(line) + 1 > MAX_SECTION_CHARS:
+            pages.append(page)
+            page = ""
+        page = f"{page}\n{line}" if page else line
+    if page:
+        pages.append(page)
+    return pages
+
+
+def _field_lines(counts):
+    return [
+        {"type": "mrkdwn", "text": f"*{name}*\n{count}"}
+        for name, count in counts.most_common(MAX_FIELDS)
+    ]
+
+
+def build_findings_blocks(snapshot, snapshot_id=None, summary=None, delta=None, savings=None, actions=True,
+                          report_attached=False):
+    """Compact Block Kit message: counts by type and region, the top findings, and approval buttons.
+
+    actions=False leaves out the buttons, for informational copies such as per-team messages.
+    report_attached=True points readers to the uploaded report for the findings left out.
+    """
+    savings = savings or {}
+    by_type, by_region = count_findings(snapshot)
+    total = len(snapshot['findings'])
+    intro = f"*{total}* findings."
+    if actions:
+        intro = f"{intro} Approve to clean up identified resources."
+    blocks = [
+        {"type": "header", "text": {"type": "plain_text", "text": "Cloud Cleanup dry run"}},
+        {"type": "section", "text": {"type": "mrkdwn", "text": intro}},
+    ]
+    if by_type:
+        blocks.append({"type": "section", "fields": _field_lines(by_type)})
+    if len(by_region) > 1:
+        blocks.append({"type": "section", "fields": _field_lines(by_region)})
+    if summary:
+        # Only the counts line; the per-finding lines are covered by the top findings below
+        blocks.append({"type": "context", "elements": [{"type": "mrkdwn", "text": summary.splitlines()[0]}]})
+
+    top = top_findings(snapshot, delta, savings)
+    if top:
+        blocks.append({"type": "divider"})
+        # Leave room for the trailing context and actions blocks
+        room = MAX_BLOCKS - len(blocks) - (2 if actions else 1)
+        for page in _section_pages(_finding_line(finding, savings) for finding in top)[:room]:
+            blocks.append({"type": "section", "text": {"type": "mrkdwn", "text": page}})
+        if total > len(top):
+            shown = f"Top {len(top)} of {total} shown"
+            if report_attached:
+                shown = f"{shown}; the full list is in the attached report"
+            blocks.append({"type": "context", "elements": [{"type": "mrkdwn", "text": f"{shown}."}]})
+
+    if not actions:
+        return blocks
+    approve_value = f"approve:{snapshot_id}" if snapshot_id else "approve"
+    blocks.append({
+        "type": "actions",
+        "block_id": "cloud_cleanup",
+        "elements": [
+            {
+                "type": "button",
+                "action_id": "approve_cleanup",
+                "text": {"type": "plain_text", "text": "Approve Cleanup"},
+                "value": approve_value[:MAX_BUTTON_VALUE_CHARS],
+                "style": "primary",
+            },
+            {
+                "type": "button",
+                "action_id": "decline_cleanup",
+                "text": {"type": "plain_text", "text": "Decline Cleanup"},
+                "value": "decline",
+            },
+        ],
+    })
+    return blocks
+
+
+def get_slack_client():
+    """WebClient for the bot token, or None when only the webhook is configured."""
+    if not SLACK_BOT_TOKEN:
+        return None
+    return WebClient(token=SLACK_BOT_TOKEN)
+
+
+def upload_report(client, report_filename, channel=None, title=None, initial_comment=None):
+    """Upload a report file to Slack, streaming it from disk.
+
+    Follows the same three steps as WebClient.files_upload_v2, which reads the
+    whole file into memory before uploading it; here the upload body is sent
+    straight from the open file.
+    """
+    channel = channel or SLACK_CHANNEL_ID
+    filename = os.path.basename(report_filename)
+    length = os.path.getsize(report_filename)
+    upload = client.files_getUploadURLExternal(filename=filename, length=length)
+
+    with open(report_filename, 'rb') as report:
+        request = urllib.request.Request(
+            upload['upload_url'],
+            data=report,
+            method='POST',
+            headers={'Content-Length': str(length), 'Content-Type': 'application/octet-stream'},
+        )
+        handlers = [urllib.request.HTTPSHandler(context=client.ssl)]
+        if client.proxy:
+            handlers.append(urllib.request.ProxyHandler({'http': client.proxy, 'https': client.proxy}))
+        with urllib.request.build_opener(*handlers).open(request, timeout=client.timeout) as response:
+            if response.status != 200:
+                raise SlackRequestError(f"Failed to upload {filename} (status: {response.status})")
+
+    return client.files_completeUploadExternal(
+        files=[{"id": upload['file_id'], "title": title or filename}],
+        channel_id=channel,
+        initial_comment=initial_comment,
+    )
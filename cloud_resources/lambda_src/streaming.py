@@ -0,0 +1,211 @@
+import queue
+import threading
+from xml.sax.saxutils import escape
+from botocore import xform_name
+from botocore.awsrequest import AWSResponse
+from botocore.compat import ETree
+from botocore.parsers import create_parser
+from projection import _member_xml_name
+
+# Bytes read from the socket per parser feed
+STREAM_CHUNK_SIZE = 64 * 1024
+# Parsed items buffered ahead of the consumer before the parser waits
+STREAM_QUEUE_SIZE = 1000
+# EC2 accepts at most 200 values per describe filter
+DESCRIBE_FILTER_BATCH_SIZE = 200
+
+_DONE = object()
+
+
+class StreamInterrupted(Exception):
+    """Raised when a response fails after items were already emitted.
+
+    It is deliberately not a retryable botocore error: a retry would emit the
+    page's first items a second time.
+    """
+
+
+class _BufferedRaw:
+    """Minimal raw-stream stand-in so AWSResponse.content returns a prepared body."""
+
+    def __init__(self, body):
+        self._body = body
+
+    def stream(self, *args, **kwargs):
+        yield self._body
+
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+class ItemStreamParser:
+    """Incremental parser for one EC2 query-protocol page.
+
+    Feeds the body into an XMLPullParser as it arrives, converts each
+    completed list item with botocore's own shape handlers, and clears the
+    element so only the item being read is held in memory.
+    """
+
+    def __init__(self, operation_model, list_member):
+        output_shape = operation_model.output_shape
+        list_shape = output_shape.members[list_member]
+        self._item_shape = list_shape.member
+        self._list_tag = _member_xml_name(list_member, list_shape)
+        self._shape_parser = create_parser(operation_model.metadata['protocol'])
+        self._pull_parser = ETree.XMLPullParser(events=('start', 'end'))
+        self._path = []
+        self._list_element = None
+        self.root_tag = None
+        self.scalars = {}
+
+    def feed(self, chunk):
+        """Parse a chunk and return the items it completed."""
+        self._pull_parser.feed(chunk)
+        return self._drain()
+
+    def close(self):
+        self._pull_parser.close()
+        return self._drain()
+
+    def _drain(self):
+        items = []
+        for event, element in self._pull_parser.read_events():
+            tag = _local_name(element.tag)
+            if event == 'start':
+                if not self._path:
+                    self.root_tag = element.tag
+                self._path.append(tag)
+                if len(self._path) == 2 and tag == self._list_tag:
+                    self._list_element = element
+                continue
+
+            self._path.pop()
+            depth = len(self._path)
+            if depth == 2 and self._path[1] == self._list_tag:
+                # A complete list item: parse it, then release it
+                items.append(self._shape_parser._parse_shape(self._item_shape, element))
+                self._list_element.remove(element)
+            elif depth == 1 and tag != self._list_tag:
+                # Top-level scalars such as requestId and nextToken
+                self.scalars[tag] = element.text or ''
+        return items
+
+    def summary_body(self):
+        """The page with its list emptied, for botocore's normal parse of tokens and metadata."""
+        namespace = self.root_tag[1:].split('}')[0] if self.root_tag.startswith('{') else ''
+        root = _local_name(self.root_tag)
+        xmlns = f' xmlns="{escape(namespace)}"' if namespace else ''
+        children = ''.join(f"<{tag}>{escape(text)}</{tag}>" for tag, text in self.scalars.items())
+        return f"<{root}{xmlns}>{children}</{root}>".encode('utf-8')
+
+
+def _make_streaming_sender(client, operation_name, list_member, emit):
+    operation_model = client.meta.service_model.operation_model(operation_name)
+    # botocore has no public accessor for a client's HTTP session
+    http_session = client._endpoint.http_session
+
+    def send(request, **kwargs):
+        request.stream_output = True
+        http_response = http_session.send(request)
+        if http_response.status_code >= 300:
+            http_response.content
+            return http_response
+
+        parser = ItemStreamParser(operation_model, list_member)
+        emitted = False
+        try:
+            for chunk in http_response.raw.stream(STREAM_CHUNK_SIZE, decode_content=True):
+                for item in parser.feed(chunk):
+                    emit(item)
+                    emitted = True
+            for item in parser.close():
+                emit(item)
+                emitted = True
+        except Exception as e:
+            if emitted:
+                raise StreamInterrupted(f"{operation_name} response failed mid-stream: {e}") from e
+            raise
+        finally:
+            http_response.raw.release_conn()
+
+        headers = {
+            name: value for name, value in http_response.headers.items()
+            if name.lower() != 'content-length'
+        }
+        return AWSResponse(request.url, http_response.status_code, headers, _BufferedRaw(parser.summary_body()))
+
+    return send
+
+
+def paginate_items(client, operation_name, list_member, **params):
+    """Yield the items of a paginated call page by page, e.g. paginate_items(ec2_client, 'DescribeAddresses', 'Addresses')."""
+    for page in client.get_paginator(xform_name(operation_name)).paginate(**params):
+        # Some operations, e.g. ListMultipartUploads and ListParts, leave the member out of empty pages
+        yield from page.get(list_member, [])
+
+
+def describe_by_ids(ec2_client, operation_name, list_member, id_filter, resource_ids, filters=()):
+    """Yield the items of an EC2 describe call for just the given IDs, DESCRIBE_FILTER_BATCH_SIZE IDs per call.
+
+    For example describe_by_ids(ec2_client, 'DescribeVolumes', 'Volumes', 'volume-id', volume_ids).
+    IDs that no longer exist, or that the extra filters exclude, are simply absent.
+    """
+    for i in range(0, len(resource_ids), DESCRIBE_FILTER_BATCH_SIZE):
+        batch = resource_ids[i:i + DESCRIBE_FILTER_BATCH_SIZE]
+        yield from paginate_items(
+            ec2_client, operation_name, list_member, Filters=[{'Name': id_filter, 'Values': batch}, *filters]
+        )
+
+
+def stream_items(client, operation_name, list_member, **params):
+    """Yield the items of a paginated EC2 describe call while each page is still being parsed.
+
+    For example stream_items(ec2_client, 'DescribeInstances', 'Reservations')
+    yields one reservation dict at a time. Signing, retries of failed
+    requests, and pagination still go through botocore. The client should not
+    be used for the same operation by other threads while streaming.
+    """
+    items = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+    stopped = threading.Event()
+
+    def emit(item):
+        # Waits while the consumer catches up; gives up once the consumer has gone away
+        while True:
+            if stopped.is_set():
+                raise StreamInterrupted("Consumer stopped reading")
+            try:
+                items.put(item, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    service_id = client.meta.service_model.service_id.hyphenize()
+    event_name = f"before-send.{service_id}.{operation_name}"
+    sender = _make_streaming_sender(client, operation_name, list_member, emit)
+    paginator = client.get_paginator(xform_name(operation_name))
+
+    def produce():
+        try:
+            for _ in paginator.paginate(**params):
+                pass
+            emit(_DONE)
+        except Exception as e:
+            if not stopped.is_set():
+                emit(e)
+
+    client.meta.events.register(event_name, sender)
+    try:
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        while True:
+            item = items.get()
+            if item is _DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+        producer.join()
+    finally:
+        stopped.set()
+        client.meta.events.unregister(event_name, sender)
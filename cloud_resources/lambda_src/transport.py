@@ -0,0 +1,157 @@
+import os
+import threading
+import time
+import boto3
+from botocore.awsrequest import AWSHTTPConnectionPool, AWSHTTPSConnectionPool
+from botocore.httpsession import URLLib3Session
+
+# Route every client through one shared connection pool per endpoint host
+SHARED_HTTP_POOL = os.getenv('SHARED_HTTP_POOL', 'True').lower() == 'true'
+# Threads of one scan that may call the same endpoint at once; sizes each host's pool
+SCAN_CONCURRENCY = int(os.getenv('SCAN_CONCURRENCY', '4'))
+# Never size a pool below this, so a held streaming connection cannot starve other calls
+MIN_POOL_CONNECTIONS = 2
+
+_stats_lock = threading.Lock()
+_pool_stats = {}
+_sessions_lock = threading.Lock()
+_shared_sessions = {}
+
+
+def pool_size(concurrency=None):
+    """Connections kept per endpoint host for the given scan concurrency."""
+    return max(concurrency or SCAN_CONCURRENCY, MIN_POOL_CONNECTIONS)
+
+
+def _record(host, **counts):
+    with _stats_lock:
+        stats = _pool_stats.setdefault(host, {
+            'requests': 0, 'new_connections': 0, 'hits': 0, 'waits': 0, 'wait_seconds': 0.0,
+        })
+        for name, value in counts.items():
+            stats[name] += value
+
+
+def _instrumented_pool_class(base_class):
+    class InstrumentedPool(base_class):
+        """Connection pool that counts reused connections and time spent waiting for one."""
+
+        def _get_conn(self, timeout=None):
+            # Every slot is checked out, so a blocking pool waits for a connection to come back
+            waiting = self.pool is not None and self.pool.empty()
+            started = time.monotonic()
+            connections_before = self.num_connections
+            conn = super()._get_conn(timeout)
+            reused = self.num_connections == connections_before
+            _record(
+                self.host,
+                requests=1,
+                hits=1 if reused else 0,
+                new_connections=0 if reused else 1,
+                waits=1 if waiting else 0,
+                wait_seconds=time.monotonic() - started if waiting else 0.0,
+            )
+            return conn
+
+    InstrumentedPool.__name__ = f"Instrumented{base_class.__name__}"
+    return InstrumentedPool
+
+
+class SharedURLLib3Session(URLLib3Session):
+    """URLLib3Session shared by many clients, with blocking pools sized from the scan concurrency."""
+
+    def __init__(self, max_pool_connections=None, **kwargs):
+        super().__init__(max_pool_connections=pool_size(max_pool_connections), **kwargs)
+        self._pool_classes_by_scheme = {
+            'http': _instrumented_pool_class(AWSHTTPConnectionPool),
+            'https': _instrumented_pool_class(AWSHTTPSConnectionPool),
+        }
+        self._manager.pool_classes_by_scheme = self._pool_classes_by_scheme
+
+    def _get_pool_manager_kwargs(self, **extra_kwargs):
+        # Wait for a pooled connection rather than opening throwaway ones past the pool size
+        return super()._get_pool_manager_kwargs(block=True, **extra_kwargs)
+
+    def close(self):
+        # Owned by the module, not by any one client; see close_shared_sessions
+        pass
+
+    def close_pools(self):
+        super().close()
+
+
+def _transport_key(client):
+    """Settings that must match for two clients to share connections."""
+    config = client.meta.config
+    # botocore has no public accessor for a client's TLS verification setting
+    verify = getattr(client._endpoint.http_session, '_verify', True)
+    proxies = tuple(sorted((config.proxies or {}).items()))
+    proxies_config = tuple(sorted((config.proxies_config or {}).items()))
+    client_cert = config.client_cert
+    if isinstance(client_cert, list):
+        client_cert = tuple(client_cert)
+    return (verify, config.connect_timeout, config.read_timeout, proxies, proxies_config, client_cert)
+
+
+def get_shared_session(client):
+    """The shared HTTP session for clients with the same transport settings as this one."""
+    key = _transport_key(client)
+    with _sessions_lock:
+        session = _shared_sessions.get(key)
+        if session is None:
+            verify, connect_timeout, read_timeout, _, _, client_cert = key
+            config = client.meta.config
+            session = SharedURLLib3Session(
+                verify=verify,
+                proxies=config.proxies,
+                timeout=(connect_timeout, read_timeout),
+                client_cert=client_cert,
+                proxies_config=config.proxies_config,
+            )
+            _shared_sessions[key] = session
+    return session
+
+
+def share_http_pool(client):
+    """Point a client at the shared pool for its endpoint host; returns the client.
+
+    TLS connections opened by one client are then reused by every other client,
+    from any boto3 session or account, that talks to the same host.
+    """
+    if not SHARED_HTTP_POOL:
+        return client
+    # botocore has no public hook for the HTTP session of a client
+    own_session = client._endpoint.http_session
+    if isinstance(own_session, SharedURLLib3Session):
+        return client
+    client._endpoint.http_session = get_shared_session(client)
+    own_session.close()
+    return client
+
+
+def create_client(service_name, session=None, **client_kwargs):
+    """boto3 client on the shared connection pool, from the given boto3 session or the default one."""
+    client = (session or boto3).client(service_name, **client_kwargs)
+    return share_http_pool(client)
+
+
+def pool_stats():
+    """Per-host request, reuse and wait counters of the shared pools."""
+    with _stats_lock:
+        return {host: dict(stats) for host, stats in _pool_stats.items()}
+
+
+def log_pool_stats():
+    for host, stats in sorted(pool_stats().items()):
+        print(
+            f"HTTP pool {host}: {stats['requests']} requests, {stats['hits']} reused, "
+            f"{stats['new_connections']} new, {stats['waits']} waits ({stats['wait_seconds']:.3f}s)"
+        )
+
+
+def close_shared_sessions():
+    """Close every shared pool, e.g. before a snapshot or at the end of a test run."""
+    with _sessions_lock:
+        for session in _shared_sessions.values():
+            session.close_pools()
+        _shared_sessions.clear()
@@ -23,3 +23,18 @@ output "api_gateway_url" {
 output "http_api_id" {
   value = aws_apigatewayv2_api.http_api.id
 }
+
+output "findings_bucket" {
+  value       = aws_s3_bucket.findings.bucket
+  description = "S3 bucket holding dry-run findings snapshots; set as the FINDINGS_BUCKET secret"
+}
+
+output "inventory_table" {
+  value       = aws_dynamodb_table.inventory.name
+  description = "Materialized EC2 inventory table; set as the INVENTORY_TABLE secret"
+}
+
+output "inventory_queue_url" {
+  value       = aws_sqs_queue.inventory_events.id
+  description = "EC2 change event queue; set as the INVENTORY_QUEUE_URL secret"
+}
@@ -0,0 +1,36 @@
+# Sharded scans: the coordinator invokes this function once per shard
+resource "aws_iam_policy" "shard_invoke" {
+  name = "cloud-cleanup-shard-invoke"
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect   = "Allow"
+        Action   = ["lambda:InvokeFunction"]
+        Resource = aws_lambda_function.slack_interaction_handler.arn
+      }
+    ]
+  })
+}
+
+resource "aws_iam_role_policy_attachment" "github_shard_invoke" {
+  role       = aws_iam_role.github_actions_role.name
+  policy_arn = aws_iam_policy.shard_invoke.arn
+}
+
+resource "aws_iam_role_policy" "lambda_assume_scan_roles" {
+  count = length(var.scan_account_roles) > 0 ? 1 : 0
+  name  = "lambda-assume-scan-roles"
+  role  = aws_iam_role.lambda_execution_role.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect   = "Allow"
+        Action   = ["sts:AssumeRole"]
+        Resource = var.scan_account_roles
+      }
+    ]
+  })
+}
@@ -0,0 +1,162 @@
+import argparse
+import hashlib
+import json
+import math
+import random
+from datetime import datetime, timedelta, timezone
+
+ACCOUNT_ID = '123456789012'
+AVAILABILITY_ZONES = ['us-east-1a', 'us-east-1b', 'us-east-1c', 'us-east-1d']
+# (value, weight) pairs
+INSTANCE_STATES = [('running', 85), ('stopped', 12), ('terminated', 3)]
+INSTANCE_TYPES = [
+    ('t3.micro', 20), ('t3.medium', 20), ('m5.large', 18), ('m5.xlarge', 12), ('c5.large', 10),
+    ('c5.2xlarge', 6), ('r5.large', 6), ('r5.2xlarge', 4), ('g4dn.xlarge', 2), ('m5.8xlarge', 2),
+]
+VOLUME_TYPES = [('gp3', 60), ('gp2', 25), ('io1', 5), ('st1', 5), ('sc1', 5)]
+TEAMS = ['payments', 'search', 'data', 'platform', 'ml', 'web']
+# Share of running instances whose CPU sits below the 5% idle threshold
+IDLE_SHARE = 0.3
+# Share of instances with detailed monitoring disabled
+MONITORING_DISABLED_SHARE = 0.1
+# Share of volumes not attached to any instance
+AVAILABLE_VOLUME_SHARE = 0.2
+# Share of snapshots whose source volume no longer exists
+ORPHANED_SNAPSHOT_SHARE = 0.25
+
+
+def _weighted(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+
+def _resource_id(rng, prefix):
+    return f"{prefix}-0{rng.getrandbits(64):016x}"
+
+
+def _timestamp(moment):
+    return moment.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+
+def _cpu_profile(rng, state):
+    """Mean, diurnal amplitude and noise of an instance's CPU utilization, in percent."""
+    if state == 'running' and rng.random() < IDLE_SHARE:
+        mean = rng.uniform(0.2, 4.5)
+    else:
+        # Busy instances: long-tailed around 20%, capped at 95%
+        mean = min(95.0, rng.lognormvariate(math.log(20), 0.6))
+    return {'mean': round(mean, 3), 'amplitude': round(mean * rng.uniform(0.1, 0.5), 3), 'noise': round(rng.uniform(0.2, 2.0), 3)}
+
+
+def generate_estate(instances=1000, volumes=None, snapshots=None, seed=0, now=None):
+    """Build an estate dict with the given numbers of instances, volumes and snapshots.
+
+    Instances come grouped into reservations, each with a CPU profile from
+    which estate_server.py derives CloudWatch datapoints on request. The
+    same arguments always produce the same estate.
+    """
+    rng = random.Random(seed)
+    now = now or datetime(2024, 1, 1, tzinfo=timezone.utc)
+    volumes = instances * 3 // 2 if volumes is None else volumes
+    snapshots = volumes // 2 if snapshots is None else snapshots
+
+    reservations, all_instances = [], []
+    while len(all_instances) < instances:
+        # Mostly single-instance launches, occasionally a small fleet
+        count = min(instances - len(all_instances), 1 if rng.random() < 0.8 else rng.randint(2, 5))
+        instance_type = _weighted(rng, INSTANCE_TYPES)
+        zone = rng.choice(AVAILABILITY_ZONES)
+        launched = now - timedelta(days=rng.expovariate(1 / 120))
+        team = rng.choice(TEAMS)
+        members = []
+        for _ in range(count):
+            state = _weighted(rng, INSTANCE_STATES)
+            instance = {
+                'InstanceId': _resource_id(rng, 'i'),
+                'InstanceType': instance_type,
+                'State': state,
+                'AvailabilityZone': zone,
+                'LaunchTime': _timestamp(launched),
+                'Monitoring': 'disabled' if rng.random() < MONITORING_DISABLED_SHARE else 'enabled',
+                'Tags': {'team': team, 'Name': f"{team}-{rng.randint(1, 999)}"},
+                'Cpu': _cpu_profile(rng, state),
+            }
+            members.append(instance)
+        all_instances.extend(members)
+        reservations.append({'ReservationId': _resource_id(rng, 'r'), 'Instances': members})
+
+    attachable = [instance for instance in all_instances if instance['State'] != 'terminated']
+    all_volumes = []
+    for _ in range(volumes):
+        volume_type = _weighted(rng, VOLUME_TYPES)
+        minimum_size = 125 if volume_type in ('st1', 'sc1') else 8
+        size = max(minimum_size, min(16384, int(rng.lognormvariate(math.log(100), 1.0))))
+        attached_to = None
+        if attachable and rng.random() >= AVAILABLE_VOLUME_SHARE:
+            attached_to = rng.choice(attachable)
+        all_volumes.append({
+            'VolumeId': _resource_id(rng, 'vol'),
+            'Size': size,
+            'VolumeType': volume_type,
+            'Iops': size * 50 if volume_type == 'io1' else None,
+            'State': 'in-use' if attached_to else 'available',
+            'AvailabilityZone': attached_to['AvailabilityZone'] if attached_to else rng.choice(AVAILABILITY_ZONES),
+            'CreateTime': _timestamp(now - timedelta(days=rng.expovariate(1 / 200))),
+            'InstanceId': attached_to['InstanceId'] if attached_to else None,
+            'Tags': {'team': attached_to['Tags']['team'] if attached_to else rng.choice(TEAMS)},
+        })
+
+    all_snapshots = []
+    for _ in range(snapshots):
+        if all_volumes and rng.random() >= ORPHANED_SNAPSHOT_SHARE:
+            source = rng.choice(all_volumes)
+            volume_id, size = source['VolumeId'], source['Size']
+        else:
+            volume_id, size = _resource_id(rng, 'vol'), rng.choice([8, 30, 100, 500])
+        all_snapshots.append({
+            'SnapshotId': _resource_id(rng, 'snap'),
+            'VolumeId': volume_id,
+            'VolumeSize': size,
+            'StartTime': _timestamp(now - timedelta(days=rng.expovariate(1 / 365))),
+            'Description': 'Created by scheduled backup' if rng.random() < 0.7 else '',
+            'StorageTier': 'archive' if rng.random() < 0.05 else 'standard',
+        })
+
+    return {
+        'seed': seed,
+        'generated_at': _timestamp(now),
+        'account_id': ACCOUNT_ID,
+        'reservations': reservations,
+        'volumes': all_volumes,
+        'snapshots': all_snapshots,
+    }
+
+
+def cpu_utilization(profile, resource_id, moment):
+    """CPU utilization of an instance at a moment: a daily cycle plus noise, stable for the same inputs."""
+    hour = moment.timestamp() / 3600
+    digest = hashlib.blake2b(f"{resource_id}:{int(hour)}".encode(), digest_size=4).digest()
+    noise = (int.from_bytes(digest, 'big') / 0xFFFFFFFF - 0.5) * 2 * profile['noise']
+    value = profile['mean'] + profile['amplitude'] * math.sin(2 * math.pi * (hour % 24) / 24) + noise
+    return max(0.0, min(100.0, value))
+
+
+def main():
+    """Write a synthetic AWS estate as JSON."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('output')
+    parser.add_argument('--instances', type=int, default=1000)
+    parser.add_argument('--volumes', type=int)
+    parser.add_argument('--snapshots', type=int)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    estate = generate_estate(args.instances, args.volumes, args.snapshots, args.seed)
+    with open(args.output, 'w') as output:
+        json.dump(estate, output)
+    instances = sum(len(reservation['Instances']) for reservation in estate['reservations'])
+    print(f"Wrote {instances} instances, {len(estate['volumes'])} volumes and {len(estate['snapshots'])} snapshots to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import glob
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from compile_package import compile_tree, remove_mismatched_caches, verify_cold_start
+
+
+def build_package(directory):
+    """Lay out the package the way lambda.tf does: the dependencies, then lambda_src on top."""
+    shutil.copytree(
+        os.path.join(ROOT, 'lambda_package'), directory,
+        ignore=shutil.ignore_patterns('__pycache__', '*.pyc'),
+    )
+    for path in glob.glob(os.path.join(ROOT, 'lambda_src', '*.py')):
+        shutil.copy(path, directory)
+    return str(directory)
+
+
+def test_compiled_package_imports_without_compiling(tmp_path):
+    package_dir = build_package(tmp_path / 'lambda_package')
+    compile_tree(package_dir)
+    # Raises SystemExit naming every module the import system had to compile
+    verify_cold_start(package_dir)
+
+
+def test_uncompiled_package_fails_the_cold_start_check(tmp_path):
+    package_dir = build_package(tmp_path / 'lambda_package')
+    with pytest.raises(SystemExit, match='modules were compiled at import'):
+        verify_cold_start(package_dir)
+
+
+def test_foreign_extension_modules_are_rejected(tmp_path):
+    cache_tag = sys.implementation.cache_tag
+    (tmp_path / f'native.{cache_tag}-x86_64-linux-gnu.so').write_bytes(b'')
+    (tmp_path / 'other.cpython-39-darwin.so').write_bytes(b'')
+    with pytest.raises(SystemExit, match='other.cpython-39-darwin.so'):
+        remove_mismatched_caches(str(tmp_path), cache_tag)
+
+
+def test_bytecode_for_other_interpreters_is_removed(tmp_path):
+    cache_tag = sys.implementation.cache_tag
+    cache_dir = tmp_path / '__pycache__'
+    cache_dir.mkdir()
+    (cache_dir / f'module.{cache_tag}.pyc').write_bytes(b'')
+    (cache_dir / 'module.cpython-39.pyc').write_bytes(b'')
+    removed = remove_mismatched_caches(str(tmp_path), cache_tag)
+    assert removed == [str(cache_dir / 'module.cpython-39.pyc')]
+    assert os.listdir(cache_dir) == [f'module.{cache_tag}.pyc']
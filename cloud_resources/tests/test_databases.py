@@ -0,0 +1,28 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'lambda_src'), os.path.join(ROOT, 'lambda_package')]
+
+import boto3
+from botocore.stub import Stubber
+from databases import DB_CLUSTER_TYPE, DB_INSTANCE_TYPE, stop_idle_databases
+
+
+def test_approved_databases_are_stopped_by_identifier():
+    session = boto3.session.Session(
+        aws_access_key_id='testing', aws_secret_access_key='testing', region_name='eu-west-1',
+    )
+    rds_client = session.client('rds')
+    session.client = lambda *args, **kwargs: rds_client
+    findings = [
+        {'resource_type': DB_INSTANCE_TYPE, 'resource_id': 'arn:aws:rds:eu-west-1:111111111111:db:orders'},
+        {'resource_type': DB_CLUSTER_TYPE, 'resource_id': 'arn:aws:rds:eu-west-1:111111111111:cluster:reports'},
+    ]
+    with Stubber(rds_client) as stubber:
+        stubber.add_response('stop_db_instance', {}, {'DBInstanceIdentifier': 'orders'})
+        stubber.add_response('stop_db_cluster', {}, {'DBClusterIdentifier': 'reports'})
+        # One at a time, so the calls reach the stubber in order
+        stopped = stop_idle_databases(session, findings[:1]) + stop_idle_databases(session, findings[1:])
+        stubber.assert_no_pending_responses()
+    assert stopped == 2
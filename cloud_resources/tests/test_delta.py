@@ -0,0 +1,36 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'lambda_src'), os.path.join(ROOT, 'lambda_package')]
+
+from delta import compute_delta, save_index
+from findings_store import LocalFindingsStore, build_snapshot, save_snapshot
+
+
+def run(store, instance_reasons, volume_reasons=None):
+    """One scan: diff against the previous run, then save the index as main does after notifying Slack."""
+    volume_reasons = volume_reasons or {}
+    snapshot = build_snapshot(list(instance_reasons), instance_reasons, list(volume_reasons), volume_reasons)
+    snapshot_id = save_snapshot(store, snapshot)
+    delta, index = compute_delta(store, snapshot_id, snapshot)
+    save_index(store, index)
+    return delta
+
+
+def test_new_cpu_averages_are_not_changes(tmp_path):
+    store = LocalFindingsStore(str(tmp_path))
+    first = run(store, {'i-01': 'Low CPU utilization: 2.31%', 'i-02': 'Monitoring is disabled'})
+    assert len(first['added']) == 2
+    second = run(store, {'i-01': 'Low CPU utilization: 2.47%', 'i-02': 'Monitoring is disabled'})
+    assert (second['added'], second['changed'], second['removed']) == ([], [], [])
+    assert len(second['unchanged']) == 2
+
+
+def test_new_verdicts_and_resources_are_reported(tmp_path):
+    store = LocalFindingsStore(str(tmp_path))
+    run(store, {'i-01': 'Monitoring is disabled', 'i-02': 'Low CPU utilization: 1.00%'})
+    delta = run(store, {'i-01': 'Low CPU utilization: 3.10%'}, {'vol-01': 'Volume is not attached to any instance.'})
+    assert delta['changed'] == [('Idle Instance', 'i-01')]
+    assert delta['added'] == [('Unattached Volume', 'vol-01')]
+    assert delta['removed'] == [('Idle Instance', 'i-02')]
@@ -0,0 +1,47 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'lambda_src'), os.path.join(ROOT, 'lambda_package')]
+
+from findings_store import (
+    LocalFindingsStore, SnapshotCorrupted, SnapshotNotFound, build_snapshot, load_snapshot, save_snapshot,
+)
+
+
+def sample_snapshot():
+    return build_snapshot(
+        ['i-0b', 'i-0a'], {'i-0a': 'Monitoring is disabled', 'i-0b': 'Low CPU utilization: 1.00%'},
+        ['vol-01'], {'vol-01': 'Volume is not attached to any instance.'},
+    )
+
+
+def test_snapshot_round_trip(tmp_path):
+    store = LocalFindingsStore(str(tmp_path))
+    snapshot = sample_snapshot()
+    snapshot_id = save_snapshot(store, snapshot)
+    assert load_snapshot(store, snapshot_id) == snapshot
+    # Equal findings in any order produce the same content-addressed ID
+    assert save_snapshot(store, sample_snapshot()) == snapshot_id
+
+
+def test_tampered_snapshot_is_rejected(tmp_path):
+    store = LocalFindingsStore(str(tmp_path))
+    snapshot_id = save_snapshot(store, sample_snapshot())
+    path = os.path.join(str(tmp_path), f"{snapshot_id}.json")
+    with open(path, 'rb') as snapshot_file:
+        body = snapshot_file.read()
+    with open(path, 'wb') as snapshot_file:
+        snapshot_file.write(body.replace(b'i-0a', b'i-0c'))
+    with pytest.raises(SnapshotCorrupted):
+        load_snapshot(store, snapshot_id)
+
+
+def test_unknown_and_malformed_ids_are_not_found(tmp_path):
+    store = LocalFindingsStore(str(tmp_path))
+    with pytest.raises(SnapshotNotFound):
+        load_snapshot(store, '0' * 64)
+    with pytest.raises(SnapshotNotFound):
+        load_snapshot(store, '../../etc/passwd')
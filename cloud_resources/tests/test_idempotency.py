@@ -0,0 +1,59 @@
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'lambda_src'), os.path.join(ROOT, 'lambda_package')]
+
+from idempotency import COMPLETED, IN_PROGRESS, LEASE_SECONDS, SQLiteIdempotencyStore, run_once
+
+
+def counting_handler(result):
+    calls = []
+
+    def handler():
+        calls.append(1)
+        return result
+    return handler, calls
+
+
+def test_duplicate_returns_cached_result(tmp_path):
+    store = SQLiteIdempotencyStore(str(tmp_path / 'leases.db'))
+    ok = {"statusCode": 200, "body": json.dumps({"message": "Cleanup executed successfully"})}
+    handler, calls = counting_handler(ok)
+    assert run_once(store, 'snapshot:abc', handler) == ok
+    assert run_once(store, 'snapshot:abc', handler) == ok
+    assert len(calls) == 1
+
+
+def test_server_error_releases_the_lease(tmp_path):
+    store = SQLiteIdempotencyStore(str(tmp_path / 'leases.db'))
+    handler, calls = counting_handler({"statusCode": 500, "body": "{}"})
+    run_once(store, 'snapshot:abc', handler)
+    run_once(store, 'snapshot:abc', handler)
+    assert len(calls) == 2
+
+
+def test_in_progress_duplicate_is_not_run(tmp_path):
+    store = SQLiteIdempotencyStore(str(tmp_path / 'leases.db'))
+    assert store.acquire('snapshot:abc') == (True, None)
+    handler, calls = counting_handler({"statusCode": 200, "body": "{}"})
+    assert run_once(store, 'snapshot:abc', handler)['statusCode'] == 202
+    assert not calls
+
+
+def test_expired_lease_is_taken_over(tmp_path):
+    store = SQLiteIdempotencyStore(str(tmp_path / 'leases.db'))
+    now = 1_700_000_000
+    assert store.acquire('snapshot:abc', now=now) == (True, None)
+    assert store.acquire('snapshot:abc', now=now + LEASE_SECONDS - 1) == (False, {'status': IN_PROGRESS, 'result': None})
+    # The holder died without releasing; once the lease runs out another invocation takes over
+    assert store.acquire('snapshot:abc', now=now + LEASE_SECONDS + 1) == (True, None)
+
+
+def test_completed_result_is_not_taken_over_when_lease_runs_out(tmp_path):
+    store = SQLiteIdempotencyStore(str(tmp_path / 'leases.db'))
+    now = 1_700_000_000
+    store.acquire('snapshot:abc', now=now)
+    store.complete('snapshot:abc', {"statusCode": 200}, now=now)
+    assert store.acquire('snapshot:abc', now=now + LEASE_SECONDS + 1) == (False, {'status': COMPLETED, 'result': {"statusCode": 200}})
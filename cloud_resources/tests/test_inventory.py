@@ -0,0 +1,93 @@
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'lambda_src'), os.path.join(ROOT, 'lambda_package')]
+
+from inventory import INSTANCE, RECONCILE_INTERVAL_SECONDS, InventoryService, LocalEventQueue, SQLiteInventoryTable
+
+
+class FakeEC2:
+    """Just enough of an EC2 client for the inventory: paginated describes with an ID filter."""
+
+    def __init__(self, instances):
+        self.instances = instances
+        self.describes = []
+
+    def get_paginator(self, operation):
+        client = self
+
+        class Paginator:
+            def paginate(self, Filters=()):
+                ids = next((f['Values'] for f in Filters if f['Name'] in ('instance-id', 'volume-id')), None)
+                client.describes.append((operation, ids))
+                if operation == 'describe_volumes':
+                    return [{'Volumes': []}]
+                matching = [i for i in client.instances if ids is None or i['InstanceId'] in ids]
+                return [{'Reservations': [{'Instances': matching}]}]
+        return Paginator()
+
+
+def state_change(instance_id, state='stopped'):
+    return {
+        'detail-type': 'EC2 Instance State-change Notification',
+        'detail': {'instance-id': instance_id, 'state': state},
+    }
+
+
+def make_service(tmp_path, instances):
+    ec2 = FakeEC2(instances)
+    queue = LocalEventQueue()
+    return InventoryService(SQLiteInventoryTable(str(tmp_path / 'inventory.db')), queue, ec2), queue, ec2
+
+
+def running(instance_id):
+    return {'InstanceId': instance_id, 'State': {'Name': 'running'}}
+
+
+def test_event_marks_only_that_instance_dirty(tmp_path):
+    service, queue, ec2 = make_service(tmp_path, [running('i-01'), running('i-02'), running('i-03')])
+    evaluated = []
+
+    def evaluate(instance):
+        evaluated.append(instance['InstanceId'])
+        return 'Monitoring is disabled' if instance['InstanceId'] != 'i-02' else None
+
+    # First run: no reconcile yet, so everything is swept and evaluated
+    assert service.refresh(INSTANCE, evaluate)[0] == ['i-01', 'i-03']
+    assert sorted(evaluated) == ['i-01', 'i-02', 'i-03']
+
+    evaluated.clear()
+    ec2.describes.clear()
+    queue.send(state_change('i-02'))
+    ec2.instances[1] = {'InstanceId': 'i-02', 'State': {'Name': 'stopped'}}
+    idle_instances, reasons = service.refresh(INSTANCE, evaluate)
+    assert evaluated == ['i-02']
+    assert ec2.describes == [('describe_instances', ['i-02'])]
+    assert idle_instances == ['i-01', 'i-03']
+    assert reasons['i-01'] == 'Monitoring is disabled'
+
+
+def test_reconcile_runs_only_when_due(tmp_path):
+    service, _, ec2 = make_service(tmp_path, [running('i-01')])
+    now = int(time.time())
+    assert service.reconcile_if_due(now) is True
+    # Weekly scans stay within the interval and skip the full sweep
+    assert service.reconcile_if_due(now + 7 * 86400) is False
+    assert service.reconcile_if_due(now + RECONCILE_INTERVAL_SECONDS) is True
+    full_sweeps = [describe for describe in ec2.describes if describe[1] is None]
+    assert full_sweeps == [('describe_instances', None), ('describe_volumes', None)] * 2
+
+
+def test_mark_during_evaluation_keeps_the_instance_dirty(tmp_path):
+    service, queue, _ = make_service(tmp_path, [running('i-01')])
+    table = service.table
+
+    def evaluate(instance):
+        # An event lands between the describe and the verdict write
+        table.mark_dirty(INSTANCE, instance['InstanceId'])
+        return None
+
+    service.refresh(INSTANCE, evaluate)
+    assert list(table.dirty_versions(INSTANCE)) == ['i-01']
@@ -0,0 +1,44 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'lambda_src'), os.path.join(ROOT, 'lambda_package')]
+
+import boto3
+from botocore.stub import Stubber
+from log_retention import LOG_RETENTION_DAYS, find_log_groups_without_retention, set_log_retention
+
+GROUP_ARN = 'arn:aws:logs:eu-west-1:111111111111:log-group:/aws/lambda/orders'
+
+
+def logs_session():
+    session = boto3.session.Session(
+        aws_access_key_id='testing', aws_secret_access_key='testing', region_name='eu-west-1',
+    )
+    logs_client = session.client('logs')
+    session.client = lambda *args, **kwargs: logs_client
+    return session, logs_client
+
+
+def test_findings_are_keyed_by_arn():
+    _, logs_client = logs_session()
+    groups = [
+        {'logGroupName': '/aws/lambda/orders', 'logGroupArn': GROUP_ARN, 'storedBytes': 1024 ** 3},
+        {'logGroupName': '/aws/lambda/kept', 'logGroupArn': GROUP_ARN + '-kept', 'retentionInDays': 7},
+    ]
+    with Stubber(logs_client) as stubber:
+        stubber.add_response('describe_log_groups', {'logGroups': groups}, {})
+        findings = find_log_groups_without_retention(logs_client)
+    assert [finding['resource_id'] for finding in findings] == [GROUP_ARN]
+
+
+def test_retention_is_set_by_group_name():
+    session, logs_client = logs_session()
+    name = '/aws/lambda/orders'
+    with Stubber(logs_client) as stubber:
+        stubber.add_response(
+            'describe_log_groups', {'logGroups': [{'logGroupName': name}]}, {'logGroupNamePrefix': name, 'limit': 1},
+        )
+        stubber.add_response('put_retention_policy', {}, {'logGroupName': name, 'retentionInDays': LOG_RETENTION_DAYS})
+        assert set_log_retention(session, [{'resource_id': GROUP_ARN}]) == 1
+        stubber.assert_no_pending_responses()
@@ -0,0 +1,47 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'lambda_src'), os.path.join(ROOT, 'lambda_package')]
+
+import boto3
+import priming
+
+
+@pytest.fixture
+def snapstart(monkeypatch):
+    """Local SnapStart simulation with clean hook lists, clients and credentials."""
+    monkeypatch.setenv('SLACK_WEBHOOK_URL', 'https://hooks.slack.com/services/test')
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'SNAPSHOT_KEY')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'snapshot-secret')
+    monkeypatch.setattr(priming, '_before_snapshot_hooks', [])
+    monkeypatch.setattr(priming, '_after_restore_hooks', [])
+    monkeypatch.setattr(priming, '_clients', {})
+    boto3.setup_default_session()
+    yield
+    boto3.DEFAULT_SESSION = None
+
+
+def test_after_restore_rebuilds_clients_and_credentials(snapstart, monkeypatch):
+    priming.install_priming_hooks('snap-start')
+    priming.run_before_snapshot_hooks()
+    snapshot_clients = dict(priming._clients)
+    assert set(snapshot_clients) == set(priming.PRIMED_CLIENTS)
+    assert snapshot_clients['ec2']._get_credentials().access_key == 'SNAPSHOT_KEY'
+
+    # Restored environments get new credentials; the snapshot's must not be reused
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'RESTORED_KEY')
+    priming.run_after_restore_hooks()
+    for service_name in priming.PRIMED_CLIENTS:
+        client = priming.get_client(service_name)
+        assert client is not snapshot_clients[service_name]
+        assert client._get_credentials().access_key == 'RESTORED_KEY'
+
+
+def test_hooks_are_only_registered_under_snapstart(snapstart):
+    priming.install_priming_hooks('on-demand')
+    assert priming._before_snapshot_hooks == [] and priming._after_restore_hooks == []
+    assert priming._clients == {}
@@ -0,0 +1,45 @@
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'lambda_src'), os.path.join(ROOT, 'lambda_package')]
+
+import boto3
+from botocore.stub import Stubber
+from s3_uploads import STALE_UPLOADS_TYPE, scan_bucket
+
+CUTOFF = datetime(2026, 1, 8, tzinfo=timezone.utc)
+
+
+def s3_client():
+    return boto3.session.Session(
+        aws_access_key_id='testing', aws_secret_access_key='testing', region_name='us-east-1',
+    ).client('s3')
+
+
+def test_bucket_without_uploads():
+    client = s3_client()
+    with Stubber(client) as stubber:
+        # S3 leaves Uploads out of the response when there are none
+        stubber.add_response('list_multipart_uploads', {'Bucket': 'empty'}, {'Bucket': 'empty'})
+        assert scan_bucket(client, 'empty', CUTOFF) is None
+        stubber.assert_no_pending_responses()
+
+
+def test_stale_upload_without_parts():
+    client = s3_client()
+    upload = {'Key': 'backup.tar', 'UploadId': 'upload-1', 'Initiated': CUTOFF - timedelta(days=30)}
+    with Stubber(client) as stubber:
+        stubber.add_response('list_multipart_uploads', {'Bucket': 'backups', 'Uploads': [upload]}, {'Bucket': 'backups'})
+        stubber.add_response(
+            'list_parts', {'Bucket': 'backups', 'Key': 'backup.tar', 'UploadId': 'upload-1'},
+            {'Bucket': 'backups', 'Key': 'backup.tar', 'UploadId': 'upload-1'},
+        )
+        stubber.add_client_error('get_bucket_lifecycle_configuration', 'NoSuchLifecycleConfiguration')
+        finding = scan_bucket(client, 'backups', CUTOFF)
+        stubber.assert_no_pending_responses()
+    assert finding['resource_type'] == STALE_UPLOADS_TYPE
+    assert finding['resource_id'] == 'backups'
+    assert finding['reason'].startswith("1 multipart uploads older than")
+    assert 'monthly_savings' not in finding
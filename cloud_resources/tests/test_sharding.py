@@ -0,0 +1,41 @@
+import fnmatch
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'lambda_src'), os.path.join(ROOT, 'lambda_package')]
+
+from sharding import id_suffix_filter, plan_shards
+from synthetic_estate import generate_estate
+
+
+def shard_counts(resource_ids, filter_name, resource_prefix, shards):
+    counts = []
+    for shard in shards:
+        patterns = id_suffix_filter(filter_name, resource_prefix, shard['id_suffixes'])[0]['Values']
+        counts.append(sum(1 for resource_id in resource_ids if any(fnmatch.fnmatchcase(resource_id, p) for p in patterns)))
+    return counts
+
+
+def assert_balanced(counts, total):
+    # Every resource lands in exactly one shard, and no shard gets far more than an even share
+    assert sum(counts) == total
+    even_share = total / len(counts)
+    assert all(0.8 * even_share <= count <= 1.2 * even_share for count in counts), counts
+
+
+def test_shards_split_synthetic_estate_evenly():
+    estate = generate_estate(instances=2000, seed=0)
+    instance_ids = [instance['InstanceId'] for reservation in estate['reservations'] for instance in reservation['Instances']]
+    volume_ids = [volume['VolumeId'] for volume in estate['volumes']]
+    for id_shards in (2, 3, 4, 8):
+        shards = plan_shards(regions=['us-east-1'], account_roles=[None], id_shards=id_shards)
+        assert len(shards) == id_shards
+        assert_balanced(shard_counts(instance_ids, 'instance-id', 'i', shards), len(instance_ids))
+        assert_balanced(shard_counts(volume_ids, 'volume-id', 'vol', shards), len(volume_ids))
+
+
+def test_single_shard_has_no_id_filter():
+    shards = plan_shards(regions=['us-east-1'], account_roles=[None], id_shards=1)
+    assert [shard['id_suffixes'] for shard in shards] == [None]
+    assert id_suffix_filter('instance-id', 'i', None) == []
@@ -30,3 +30,27 @@ variable "slack_webhook_url" {
   type = string
 
 }
+
+variable "slack_signing_secret" {
+  description = "Slack app signing secret used to verify interaction requests"
+  type        = string
+  sensitive   = true
+}
+
+variable "scan_regions" {
+  description = "Regions covered by a sharded scan"
+  type        = list(string)
+  default     = ["us-east-1"]
+}
+
+variable "scan_account_roles" {
+  description = "Cross-account role ARNs assumed by sharded scan workers"
+  type        = list(string)
+  default     = []
+}
+
+variable "enabled_detectors" {
+  description = "Detectors run by shard workers besides idle instances and unattached volumes, e.g. [\"network\"]"
+  type        = list(string)
+  default     = []
+}